@@ -0,0 +1,232 @@
+"""Lightweight RTSP health prober - OPTIONS over pooled connections."""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Callable
+from ..models import CameraModel
+from ..config import load_config
+from ..events import publish
+
+logger = logging.getLogger(__name__)
+
+PROBE_INTERVAL = 30  # seconds between probe rounds
+PROBE_TIMEOUT = 4  # seconds per probe
+PROBE_CONCURRENCY = 8  # max cameras probed at once
+PROBE_JITTER = 0.25  # fraction of the interval used to spread probes
+DOWN_AFTER_FAILURES = 3  # consecutive failures before a camera is "down"
+
+
+class CameraProber:
+    """Periodically checks every enabled camera with a cheap RTSP OPTIONS.
+
+    Runs its own asyncio loop in a background thread. One TCP connection per
+    camera is kept open and reused between rounds (RTSP allows several
+    requests on the same connection), so a healthy camera costs one small
+    request/response every interval.
+    """
+
+    def __init__(self, interval: int = PROBE_INTERVAL):
+        self._interval = interval
+        self._thread: threading.Thread | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+        self._running = False
+        self._cseq = 0
+        self._lock = threading.Lock()
+        self._states: dict[str, dict] = {}
+        self._conns: dict[str, tuple[asyncio.StreamReader, asyncio.StreamWriter, tuple]] = {}
+        self._subscribers: list[Callable[[str, bool], None]] = []
+
+    def start(self):
+        """Start prober thread."""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run_loop, daemon=True)
+        self._thread.start()
+        logger.info(f"Camera prober started (every {self._interval}s)")
+
+    def stop(self):
+        """Stop prober thread and close pooled connections."""
+        self._running = False
+        if self._loop and self._wake:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        logger.info("Camera prober stopped")
+
+    def subscribe(self, callback: Callable[[str, bool], None]):
+        """Register callback(camera_id, down) for cameras going down or coming back."""
+        self._subscribers.append(callback)
+
+    def probe_now(self):
+        """Start a new probe round immediately."""
+        if self._loop and self._wake:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def is_down(self, camera_id: str) -> bool:
+        """True if the camera failed the last DOWN_AFTER_FAILURES probes."""
+        with self._lock:
+            state = self._states.get(camera_id)
+            return state is not None and state["failures"] >= DOWN_AFTER_FAILURES
+
+    def get_status(self) -> dict:
+        """Get probe state of all cameras."""
+        with self._lock:
+            return {
+                cam_id: dict(state, down=state["failures"] >= DOWN_AFTER_FAILURES)
+                for cam_id, state in self._states.items()
+            }
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._main())
+        except Exception as e:
+            logger.error(f"Prober error: {e}")
+        finally:
+            self._loop.close()
+            self._loop = None
+
+    async def _main(self):
+        self._wake = asyncio.Event()
+        sem = asyncio.Semaphore(PROBE_CONCURRENCY)
+        while self._running:
+            cameras = [c for c in load_config().cameras if c.enabled]
+            self._forget_removed({c.id for c in cameras})
+            await asyncio.gather(*(self._probe_camera(cam, sem) for cam in cameras))
+
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self._interval)
+            except asyncio.TimeoutError:
+                pass
+
+        for cam_id in list(self._conns):
+            self._close_conn(cam_id)
+
+    def _forget_removed(self, camera_ids: set[str]):
+        for cam_id in list(self._conns):
+            if cam_id not in camera_ids:
+                self._close_conn(cam_id)
+        with self._lock:
+            for cam_id in list(self._states):
+                if cam_id not in camera_ids:
+                    del self._states[cam_id]
+
+    async def _probe_camera(self, camera: CameraModel, sem: asyncio.Semaphore):
+        # Spread probes over part of the interval so cameras sharing a
+        # switch or NVR are not hit in the same instant
+        await asyncio.sleep(random.uniform(0, self._interval * PROBE_JITTER))
+        async with sem:
+            started = time.monotonic()
+            error = None
+            try:
+                await asyncio.wait_for(self._options(camera), timeout=PROBE_TIMEOUT)
+            except asyncio.TimeoutError:
+                error = "timeout"
+            except Exception as e:
+                error = str(e) or type(e).__name__
+            latency_ms = round((time.monotonic() - started) * 1000, 1)
+
+        if error:
+            self._close_conn(camera.id)
+        self._record(camera.id, error, latency_ms)
+
+    def _record(self, camera_id: str, error: str | None, latency_ms: float):
+        now = time.time()
+        with self._lock:
+            state = self._states.setdefault(camera_id, {
+                "online": None,
+                "latency_ms": None,
+                "failures": 0,
+                "last_probe": None,
+                "last_ok": None,
+                "last_error": None,
+            })
+            was_down = state["failures"] >= DOWN_AFTER_FAILURES
+            state["last_probe"] = now
+            if error is None:
+                state["online"] = True
+                state["latency_ms"] = latency_ms
+                state["failures"] = 0
+                state["last_ok"] = now
+            else:
+                state["online"] = False
+                state["failures"] += 1
+                state["last_error"] = error
+            is_down = state["failures"] >= DOWN_AFTER_FAILURES
+            failures = state["failures"]
+
+        if is_down and not was_down:
+            logger.warning(f"Camera {camera_id} is down ({failures} failed probes: {error})")
+        elif was_down and not is_down:
+            logger.info(f"Camera {camera_id} is reachable again ({latency_ms} ms)")
+        else:
+            return
+        publish("probe", {"camera_id": camera_id, "down": is_down, "error": error}, key=f"probe:{camera_id}")
+        for callback in self._subscribers:
+            try:
+                callback(camera_id, is_down)
+            except Exception as e:
+                logger.error(f"Prober subscriber error for {camera_id}: {e}")
+
+    async def _options(self, camera: CameraModel):
+        """Send RTSP OPTIONS, reusing the pooled connection when possible."""
+        addr = (camera.ip, camera.port)
+        conn = self._conns.get(camera.id)
+        if conn and conn[2] != addr:
+            self._close_conn(camera.id)
+            conn = None
+
+        if conn:
+            try:
+                await self._request(camera, conn[0], conn[1])
+                return
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # Camera closed the idle connection; reconnect once
+                self._close_conn(camera.id)
+
+        reader, writer = await asyncio.open_connection(camera.ip, camera.port)
+        self._conns[camera.id] = (reader, writer, addr)
+        await self._request(camera, reader, writer)
+
+    async def _request(self, camera: CameraModel, reader: asyncio.StreamReader,
+                       writer: asyncio.StreamWriter):
+        self._cseq += 1
+        writer.write(
+            f"OPTIONS rtsp://{camera.ip}:{camera.port}/ RTSP/1.0\r\n"
+            f"CSeq: {self._cseq}\r\n"
+            f"User-Agent: Sentinela\r\n\r\n".encode()
+        )
+        await writer.drain()
+
+        status = await reader.readline()
+        if not status:
+            raise ConnectionResetError("connection closed")
+        if not status.startswith(b"RTSP/"):
+            raise ValueError(f"not an RTSP response: {status[:40]!r}")
+
+        # Any RTSP status (even 401) proves the server is alive; consume the
+        # headers and body so the connection can be reused
+        length = 0
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionResetError("connection closed")
+            if line in (b"\r\n", b"\n"):
+                break
+            name, _, value = line.decode(errors="replace").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value.strip() or 0)
+        if length:
+            await reader.readexactly(length)
+
+    def _close_conn(self, camera_id: str):
+        conn = self._conns.pop(camera_id, None)
+        if conn:
+            try:
+                conn[1].close()
+            except Exception:
+                pass
@@ -0,0 +1,136 @@
+"""Read-through access to footage that only exists in the cloud."""
+
+import logging
+import os
+import threading
+from pathlib import Path
+import httpx
+from ..config import BASE_DIR
+from .rclone_rc import RcloneDaemon, RcloneError
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = BASE_DIR / "data" / "archive_cache"
+FETCH_CHUNK = 256 * 1024
+
+
+class Download:
+    """A segment being fetched into the cache. Responses read it while it
+    grows instead of asking the remote for the same bytes again."""
+
+    def __init__(self, part: Path):
+        self._lock = threading.Lock()
+        self.path = part  # the .part file, then the cached copy once complete
+        self.size: int | None = None  # from Content-Length; known once headers arrive
+        self.written = 0
+        self.done = False
+        self.error: str | None = None
+
+    def ready(self, end: int) -> bool:
+        """Whether bytes up to end can be read; raises if the fetch failed."""
+        if self.error:
+            raise RuntimeError(self.error)
+        return self.written >= end or self.done
+
+    def read(self, offset: int, length: int) -> bytes:
+        # Under the lock so the .part file is not renamed while it is open
+        with self._lock:
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                return f.read(length)
+
+
+class ArchiveCache:
+    """Size-bounded LRU cache of segments downloaded from the remote.
+
+    Files are keyed by their path relative to the recordings folder. A file's
+    mtime is its last access; the least recently used files are evicted
+    once the cache is over max_bytes. Downloads go through the rclone
+    daemon's --rc-serve endpoint; each file is fetched once, in the
+    background, and requests for it are served from the partial download.
+    """
+
+    def __init__(self, rclone: RcloneDaemon, cache_dir: Path = CACHE_DIR):
+        self._rclone = rclone
+        self._dir = cache_dir
+        self._lock = threading.Lock()
+        self._downloading: dict[str, Download] = {}
+
+    def get(self, rel_path: str) -> Path | None:
+        """Cached copy of a segment, marking it as recently used."""
+        path = self._dir / rel_path
+        if not path.is_file():
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def source(self, fs: str, rel_path: str) -> tuple[str, tuple[str, str]]:
+        """URL and auth to stream a segment straight from the remote."""
+        return self._rclone.serve_url(fs, rel_path)
+
+    def fetch(self, fs: str, rel_path: str, max_bytes: int) -> Download:
+        """Download a segment into the cache in the background, or join the
+        download already running for it."""
+        with self._lock:
+            download = self._downloading.get(rel_path)
+            if download is not None:
+                return download
+            dest = self._dir / rel_path
+            download = self._downloading[rel_path] = Download(dest.with_name(dest.name + ".part"))
+        threading.Thread(
+            target=self._fetch, args=(fs, rel_path, max_bytes, download), daemon=True,
+        ).start()
+        return download
+
+    def _fetch(self, fs: str, rel_path: str, max_bytes: int, download: Download):
+        dest = self._dir / rel_path
+        part = download.path
+        try:
+            url, auth = self.source(fs, rel_path)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            with httpx.stream("GET", url, auth=auth, timeout=60.0) as resp:
+                resp.raise_for_status()
+                with open(part, "wb") as f:
+                    if "content-length" in resp.headers:
+                        download.size = int(resp.headers["content-length"])
+                    for chunk in resp.iter_bytes(FETCH_CHUNK):
+                        f.write(chunk)
+                        f.flush()
+                        download.written += len(chunk)
+            with download._lock:
+                os.replace(part, dest)
+                download.path = dest
+            download.size = download.written
+            download.done = True
+            logger.info(f"Archive cache: fetched {rel_path} ({download.written // 1024**2} MB)")
+            self._evict(max_bytes)
+        except (httpx.HTTPError, RcloneError, OSError) as e:
+            logger.error(f"Archive cache: failed to fetch {rel_path}: {e}")
+            download.error = str(e)[:200]
+            with download._lock:
+                part.unlink(missing_ok=True)
+        finally:
+            with self._lock:
+                self._downloading.pop(rel_path, None)
+
+    def _evict(self, max_bytes: int):
+        files = []
+        for path in self._dir.rglob("*"):
+            if path.is_file() and not path.name.endswith(".part"):
+                st = path.stat()
+                files.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            logger.info(f"Archive cache: evicted {path.relative_to(self._dir).as_posix()}")
+
+    def usage(self) -> int:
+        if not self._dir.exists():
+            return 0
+        return sum(p.stat().st_size for p in self._dir.rglob("*") if p.is_file())
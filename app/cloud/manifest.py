@@ -0,0 +1,114 @@
+"""Local manifest of segments already uploaded to the cloud."""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from ..config import BASE_DIR
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_PATH = BASE_DIR / "data" / "upload_manifest.db"
+
+
+def file_md5(path: Path) -> str:
+    """MD5 of a file (the hash Google Drive and S3 report for uploads)."""
+    h = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class UploadManifest:
+    """SQLite record of every uploaded segment.
+
+    Paths are relative to the recordings folder ("2024-01-31/camera-1/rec_...").
+    Knowing what is already in the cloud lets sync skip listing the remote and
+    lets retention delete old footage without walking it.
+    """
+
+    def __init__(self, path: Path = MANIFEST_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS uploads (
+                path TEXT PRIMARY KEY,
+                camera_id TEXT NOT NULL,
+                date TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                md5 TEXT,
+                uploaded_at REAL NOT NULL,
+                remote_path TEXT NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS uploads_date ON uploads (date)")
+        self._db.commit()
+
+    def record(self, rel_path: str, size: int, md5: str | None, remote_path: str):
+        """Record a successful upload."""
+        date, camera_id = rel_path.split("/")[:2]
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (rel_path, camera_id, date, size, md5, time.time(), remote_path),
+            )
+            self._db.commit()
+
+    def get(self, rel_path: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT path, camera_id, date, size, md5, uploaded_at, remote_path "
+                "FROM uploads WHERE path = ?", (rel_path,),
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("path", "camera_id", "date", "size", "md5", "uploaded_at", "remote_path"), row))
+
+    def is_uploaded(self, rel_path: str, size: int) -> bool:
+        """True if this exact file (same size) is already in the cloud."""
+        entry = self.get(rel_path)
+        return entry is not None and entry["size"] == size
+
+    def uploaded_sizes(self) -> dict[str, int]:
+        """Map of every uploaded path to its size."""
+        with self._lock:
+            return dict(self._db.execute("SELECT path, size FROM uploads"))
+
+    def dates(self) -> list[str]:
+        """All dates with uploaded footage."""
+        with self._lock:
+            rows = self._db.execute("SELECT DISTINCT date FROM uploads ORDER BY date").fetchall()
+        return [r[0] for r in rows]
+
+    def list_date(self, date: str) -> list[dict]:
+        """Uploaded segments of a day (proxies uploaded alongside originals excluded)."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path, camera_id, size FROM uploads "
+                "WHERE date = ? AND path NOT LIKE '%/proxy/%' ORDER BY path", (date,),
+            ).fetchall()
+        return [{"path": r[0], "camera_id": r[1], "size": r[2]} for r in rows]
+
+    def dates_before(self, cutoff_date: str) -> list[str]:
+        """Dates (YYYY-MM-DD) with uploads older than the cutoff."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT DISTINCT date FROM uploads WHERE date < ? ORDER BY date", (cutoff_date,),
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def remove_date(self, date: str) -> int:
+        """Forget all uploads of a day. Returns the number of rows removed."""
+        with self._lock:
+            cur = self._db.execute("DELETE FROM uploads WHERE date = ?", (date,))
+            self._db.commit()
+            return cur.rowcount
+
+    def totals(self) -> dict:
+        with self._lock:
+            count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM uploads").fetchone()
+        return {"files": count, "bytes": size}
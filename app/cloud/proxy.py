@@ -0,0 +1,142 @@
+"""Low-bitrate proxy encoding of finalized segments for cloud upload."""
+
+import logging
+import os
+import queue
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Callable
+from ..config import BASE_DIR
+from ..models import CloudSettings
+
+logger = logging.getLogger(__name__)
+
+PROXY_DIR = ".proxy"  # per-camera folder next to the segments
+
+
+def proxy_path(segment: Path) -> Path:
+    return segment.parent / PROXY_DIR / segment.name
+
+
+class ProxyEncoder:
+    """Encodes segments to a small H.264 proxy, one at a time.
+
+    The CPU budget is one ffmpeg at a time, limited to proxy_threads threads
+    and run at low OS priority, so it never competes with the recorders or
+    the live transcoders. on_done(segment, proxy) is called from the worker
+    thread after each successful encode.
+    """
+
+    def __init__(self, on_done: Callable[[Path, Path], None]):
+        self._on_done = on_done
+        self._queue: queue.Queue = queue.Queue()
+        self._pending: set[Path] = set()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._running = False
+        self._process: subprocess.Popen | None = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._work_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._queue.put(None)
+        proc = self._process
+        if proc and proc.poll() is None:
+            proc.kill()
+
+    def submit(self, segment: Path, cloud: CloudSettings):
+        """Queue a segment for encoding (ignored if already pending)."""
+        with self._lock:
+            if segment in self._pending:
+                return
+            self._pending.add(segment)
+        self._queue.put((segment, cloud))
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _work_loop(self):
+        while self._running:
+            job = self._queue.get()
+            if job is None:
+                break
+            segment, cloud = job
+            try:
+                if segment.exists():
+                    out = self._encode(segment, cloud)
+                    if out:
+                        self._on_done(segment, out)
+            except Exception as e:
+                logger.error(f"Proxy encode error for {segment.name}: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(segment)
+
+    def _encode(self, segment: Path, cloud: CloudSettings) -> Path | None:
+        out = proxy_path(segment)
+        out.parent.mkdir(exist_ok=True)
+        tmp = out.with_name(out.stem + ".tmp.mp4")
+
+        ffmpeg_exe = str(BASE_DIR / "tools" / "ffmpeg" / "ffmpeg.exe")
+        if not Path(ffmpeg_exe).exists():
+            ffmpeg_exe = "ffmpeg"  # Fallback to PATH
+
+        cmd = [
+            ffmpeg_exe,
+            "-hide_banner",
+            "-loglevel", "error",
+            "-y",
+            # proxy_threads bounds the whole pipeline: decoder (input option),
+            # scale filter and encoder (output option below)
+            "-filter_threads", str(cloud.proxy_threads),
+            "-threads", str(cloud.proxy_threads),
+            "-i", str(segment),
+            "-vf", f"scale=-2:{cloud.proxy_height}",
+            "-c:v", "libx264",
+            "-preset", "veryfast",
+            "-b:v", cloud.proxy_bitrate,
+            "-maxrate", cloud.proxy_bitrate,
+            "-bufsize", cloud.proxy_bitrate,
+            "-threads", str(cloud.proxy_threads),
+            "-c:a", "aac",
+            "-b:a", "32k",
+            "-movflags", "+faststart",
+            str(tmp),
+        ]
+
+        kwargs = {}
+        if sys.platform == "win32":
+            kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW | subprocess.BELOW_NORMAL_PRIORITY_CLASS
+        else:
+            kwargs["preexec_fn"] = lambda: os.nice(10)
+
+        self._process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            **kwargs,
+        )
+        _, stderr = self._process.communicate()
+        returncode = self._process.returncode
+        self._process = None
+
+        if returncode != 0:
+            tmp.unlink(missing_ok=True)
+            if self._running:
+                logger.error(f"Proxy encode failed for {segment.name}: {stderr.decode(errors='replace')[:200]}")
+            return None
+
+        os.replace(tmp, out)
+        logger.info(
+            f"Proxy encoded {segment.name}: {segment.stat().st_size // 1024**2} MB -> "
+            f"{out.stat().st_size // 1024**2} MB"
+        )
+        return out
@@ -0,0 +1,149 @@
+"""Persistent queue of finalized segments waiting for cloud upload."""
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from ..config import BASE_DIR
+
+logger = logging.getLogger(__name__)
+
+QUEUE_PATH = BASE_DIR / "data" / "upload_queue.json"
+
+# Priority classes, uploaded in this order
+PRIORITY_EVENT = 0  # footage someone flagged as important
+PRIORITY_RECENT = 1  # segments finalized while running
+PRIORITY_BACKLOG = 2  # found by reconciliation
+
+# Retry backoff in seconds: 30s, 2m, 10m, 30m, then hourly
+RETRY_BACKOFFS = [30, 120, 600, 1800, 3600]
+
+
+class UploadQueue:
+    """Segments to upload, keyed by path relative to the recordings folder.
+
+    Items are ordered by priority (lower first) and then by age, so a backlog
+    drains oldest-first. The state is written to a small JSON file after every
+    change, letting a restart resume without listing the remote.
+    """
+
+    def __init__(self, path: Path = QUEUE_PATH):
+        self._path = path
+        self._lock = threading.Lock()
+        self._items: dict[str, dict] = {}
+        self._load()
+
+    def put(self, rel_path: str, size: int = 0, priority: int = PRIORITY_RECENT,
+            created: float | None = None, remote: str | None = None):
+        """Add a file to the queue, or raise the priority of a queued one.
+
+        remote is the destination relative to the remote folder, if it is
+        not the same as rel_path (e.g. for proxies).
+        """
+        with self._lock:
+            item = self._items.get(rel_path)
+            if item is not None:
+                if priority < item["priority"]:
+                    item["priority"] = priority
+                    self._save()
+                return
+            self._items[rel_path] = {
+                "path": rel_path,
+                "remote": remote or rel_path,
+                "size": size,
+                "priority": priority,
+                "created": created or time.time(),
+                "attempts": 0,
+                "next_attempt": 0,
+                "error": None,
+            }
+            self._save()
+
+    def ready(self, limit: int = 10) -> list[dict]:
+        """Items due for upload, highest priority and oldest first."""
+        now = time.time()
+        with self._lock:
+            due = [dict(i) for i in self._items.values() if i["next_attempt"] <= now]
+        due.sort(key=lambda i: (i["priority"], i["created"]))
+        return due[:limit]
+
+    def prioritize(self, match, priority: int = PRIORITY_EVENT) -> int:
+        """Raise the priority of queued items for which match(item) is true.
+
+        Items bumped this way are also retried right away.
+        """
+        count = 0
+        with self._lock:
+            for item in self._items.values():
+                if item["priority"] > priority and match(item):
+                    item["priority"] = priority
+                    item["next_attempt"] = 0
+                    count += 1
+            if count:
+                self._save()
+        return count
+
+    def done(self, rel_path: str):
+        """Remove an uploaded file from the queue."""
+        with self._lock:
+            if self._items.pop(rel_path, None) is not None:
+                self._save()
+
+    def fail(self, rel_path: str, error: str):
+        """Record a failed attempt and schedule a retry with backoff."""
+        with self._lock:
+            item = self._items.get(rel_path)
+            if item is None:
+                return
+            backoff = RETRY_BACKOFFS[min(item["attempts"], len(RETRY_BACKOFFS) - 1)]
+            item["attempts"] += 1
+            item["next_attempt"] = time.time() + backoff
+            item["error"] = error[:200]
+            self._save()
+        logger.warning(f"Upload failed for {rel_path} (attempt {item['attempts']}, retry in {backoff}s): {error[:200]}")
+
+    def summary(self) -> dict:
+        """Pending count/bytes, age of the oldest item and per-file errors."""
+        now = time.time()
+        with self._lock:
+            items = list(self._items.values())
+        oldest = min((i["created"] for i in items), default=None)
+        return {
+            "files": len(items),
+            "bytes": sum(i["size"] for i in items),
+            "oldest_age": round(now - oldest) if oldest else None,
+            "errors": [
+                {"path": i["path"], "error": i["error"], "attempts": i["attempts"]}
+                for i in items if i["error"]
+            ],
+        }
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _load(self):
+        if not self._path.exists():
+            return
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                items = json.load(f)
+            self._items = {i["path"]: i for i in items}
+            for item in self._items.values():
+                item.setdefault("remote", item["path"])
+            if self._items:
+                logger.info(f"Upload queue restored: {len(self._items)} pending files")
+        except Exception as e:
+            logger.error(f"Error loading upload queue: {e}. Starting empty.")
+
+    def _save(self):
+        # Write to a temp file and rename so a crash never leaves half a file
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self._path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(list(self._items.values()), f)
+            os.replace(tmp, self._path)
+        except Exception as e:
+            logger.error(f"Error saving upload queue: {e}")
@@ -0,0 +1,205 @@
+"""Long-lived rclone daemon driven over its remote-control (rc) HTTP API."""
+
+import json
+import logging
+import secrets
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class RcloneError(Exception):
+    """An rc call failed or the daemon is not reachable."""
+
+
+class RcloneDaemon:
+    """Runs one `rclone rcd` and talks to it over localhost.
+
+    The daemon keeps its connections to the remote open between transfers, so
+    uploading a segment is one HTTP call instead of a new rclone process.
+    Long operations run as rc jobs that can be polled and cancelled.
+    """
+
+    def __init__(self, exe: Path):
+        self._exe = exe
+        self._process: subprocess.Popen | None = None
+        self._client: httpx.Client | None = None
+        self._base_url: str | None = None
+        self._auth: tuple[str, str] | None = None
+        self._lock = threading.Lock()
+        self._jobs: set[int] = set()
+        self._bwlimit: str | None = None  # re-applied whenever the daemon (re)starts
+        self.errors: deque[dict] = deque(maxlen=50)  # recent per-file errors from the JSON log
+
+    def is_running(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def ensure_running(self):
+        """Start the daemon if it is not running and wait until it answers."""
+        with self._lock:
+            if self.is_running():
+                return
+            if not self._exe.exists():
+                raise RcloneError("rclone nao encontrado. Execute setup.bat.")
+            self._start()
+
+    def _start(self):
+        port = _free_port()
+        password = secrets.token_urlsafe(16)
+        cmd = [
+            str(self._exe), "rcd",
+            "--rc-addr", f"127.0.0.1:{port}",
+            "--rc-user", "sentinela",
+            "--rc-pass", password,
+            "--rc-serve",  # GET /[remote:path]/file streams objects, with Range
+            "--log-level", "NOTICE",
+            "--use-json-log",
+        ]
+
+        creationflags = 0
+        if sys.platform == "win32":
+            creationflags = subprocess.CREATE_NO_WINDOW
+
+        self._process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            creationflags=creationflags,
+        )
+        threading.Thread(target=self._read_log, args=(self._process,), daemon=True).start()
+        if self._client:
+            self._client.close()
+        self._base_url = f"http://127.0.0.1:{port}"
+        self._auth = ("sentinela", password)
+        self._client = httpx.Client(base_url=self._base_url, auth=self._auth, timeout=30.0)
+        self._jobs.clear()
+
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            try:
+                self._client.post("/rc/noop", json={})
+                logger.info(f"rclone daemon started (PID: {self._process.pid}, port {port})")
+                if self._bwlimit is not None:
+                    self._client.post("/core/bwlimit", json={"rate": self._bwlimit})
+                return
+            except httpx.TransportError:
+                if self._process.poll() is not None:
+                    break
+                time.sleep(0.2)
+        self.stop()
+        raise RcloneError("rclone rcd nao iniciou")
+
+    def _read_log(self, process: subprocess.Popen):
+        """Collect errors about individual files from rclone's JSON log."""
+        for raw in iter(process.stderr.readline, b""):
+            try:
+                entry = json.loads(raw)
+            except ValueError:
+                continue
+            if entry.get("level") not in ("error", "critical"):
+                continue
+            logger.warning(f"rclone: {entry.get('object', '')}: {entry.get('msg', '')}")
+            if entry.get("object"):
+                self.errors.append({
+                    "path": entry["object"],
+                    "error": entry.get("msg", "")[:200],
+                    "time": entry.get("time"),
+                })
+
+    def stop(self):
+        """Stop the daemon."""
+        if self.is_running():
+            try:
+                self._client.post("/core/quit", json={}, timeout=2.0)
+                self._process.wait(timeout=5)
+            except Exception:
+                self._process.terminate()
+                try:
+                    self._process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    self._process.kill()
+            logger.info("rclone daemon stopped")
+        self._process = None
+        self._jobs.clear()
+
+    def call(self, method: str, **params) -> dict:
+        """Call an rc method and return its JSON result."""
+        self.ensure_running()
+        try:
+            resp = self._client.post(f"/{method}", json=params)
+        except httpx.HTTPError as e:
+            raise RcloneError(f"{method}: {e}") from e
+        try:
+            data = resp.json()
+        except ValueError:
+            data = {}
+        if resp.status_code != 200:
+            raise RcloneError(data.get("error") or f"{method}: HTTP {resp.status_code}")
+        return data
+
+    def set_bwlimit(self, rate: str):
+        """Limit transfers (core/bwlimit), now and after any restart."""
+        self._bwlimit = rate
+        self.call("core/bwlimit", rate=rate)
+
+    def run_job(self, method: str, timeout: float, on_poll=None, **params) -> dict:
+        """Run an rc method as an async job and wait for it to finish.
+
+        on_poll, if given, is called about once a second while waiting.
+        """
+        jobid = self.call(method, _async=True, **params)["jobid"]
+        self._jobs.add(jobid)
+        try:
+            deadline = time.time() + timeout
+            while True:
+                status = self.call("job/status", jobid=jobid)
+                if status.get("finished"):
+                    if not status.get("success"):
+                        raise RcloneError(status.get("error") or "job failed")
+                    return status
+                if time.time() > deadline:
+                    self.stop_job(jobid)
+                    raise RcloneError(f"timeout ({int(timeout)}s)")
+                if on_poll:
+                    on_poll()
+                time.sleep(1)
+        finally:
+            self._jobs.discard(jobid)
+
+    def stop_job(self, jobid: int):
+        try:
+            self.call("job/stop", jobid=jobid)
+        except RcloneError as e:
+            logger.debug(f"job/stop {jobid}: {e}")
+
+    def cancel_all(self):
+        """Cancel every job started through run_job()."""
+        for jobid in list(self._jobs):
+            self.stop_job(jobid)
+
+    def serve_url(self, fs: str, remote: str) -> tuple[str, tuple[str, str]]:
+        """URL and basic auth to stream a remote object over --rc-serve."""
+        self.ensure_running()
+        return f"{self._base_url}/[{fs}]/{remote}", self._auth
+
+    def stats(self) -> dict:
+        """Global transfer stats (core/stats), or {} if the daemon is not running."""
+        if not self.is_running():
+            return {}
+        try:
+            return self.call("core/stats")
+        except RcloneError:
+            return {}
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
@@ -0,0 +1,254 @@
+"""Direct multipart upload of segments to S3-compatible storage."""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_EXCEPTION, wait
+from pathlib import Path
+from ..config import BASE_DIR
+from ..models import CloudSettings
+from .rclone_rc import RcloneDaemon, RcloneError
+
+try:
+    import boto3
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import BotoCoreError, ClientError
+except ImportError:
+    boto3 = None
+
+logger = logging.getLogger(__name__)
+
+STATE_PATH = BASE_DIR / "data" / "s3_uploads.json"
+MIN_PART_SIZE = 5 * 1024**2  # S3 minimum for every part but the last
+MAX_PARTS = 10000
+
+
+class S3UploadError(Exception):
+    """A direct S3 upload failed (it can be resumed on the next attempt)."""
+
+
+def available() -> bool:
+    return boto3 is not None
+
+
+class S3Uploader:
+    """Uploads a file with S3 multipart upload, parts in parallel.
+
+    Credentials and endpoint are read from the rclone remote, so both
+    backends write the same objects and playback through rclone keeps
+    working. At most s3_concurrency parts are read into memory at a time.
+    The upload id and size of every unfinished upload are kept in
+    STATE_PATH; a retry lists the parts the server already has and only
+    sends the missing ones. bwlimit (bytes/s, None = unlimited) paces the
+    parts like rclone's core/bwlimit does for the other backend.
+    """
+
+    def __init__(self, rclone: RcloneDaemon, state_path: Path = STATE_PATH):
+        self._rclone = rclone
+        self._state_path = state_path
+        self._lock = threading.Lock()
+        self._state: dict[str, dict] = self._load()
+        self._client = None
+        self._client_key: tuple | None = None
+        self._cancelled = threading.Event()
+        self._next_send = 0.0
+        self.bwlimit: float | None = None
+
+    def _load(self) -> dict:
+        try:
+            with open(self._state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        self._state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._state_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._state, f)
+        os.replace(tmp, self._state_path)
+
+    def _get_client(self, cloud: CloudSettings):
+        try:
+            remote = self._rclone.call("config/get", name=cloud.remote_name)
+        except RcloneError as e:
+            raise S3UploadError(f"remote {cloud.remote_name}: {e}") from e
+        if remote.get("type") != "s3":
+            raise S3UploadError(f"remote {cloud.remote_name} nao e S3")
+
+        key = (
+            remote.get("endpoint") or None,
+            remote.get("region") or None,
+            remote.get("access_key_id") or None,
+            remote.get("secret_access_key") or None,
+            cloud.s3_concurrency,
+        )
+        if self._client is None or key != self._client_key:
+            endpoint, region, access_key, secret_key, concurrency = key
+            if str(remote.get("env_auth")).lower() == "true":
+                access_key = secret_key = None  # default AWS credential chain
+            if endpoint and "://" not in endpoint:
+                endpoint = f"https://{endpoint}"
+            self._client = boto3.client(
+                "s3",
+                endpoint_url=endpoint,
+                region_name=region,
+                aws_access_key_id=access_key,
+                aws_secret_access_key=secret_key,
+                config=BotoConfig(
+                    max_pool_connections=concurrency + 1,
+                    retries={"max_attempts": 3, "mode": "standard"},
+                ),
+            )
+            self._client_key = key
+        return self._client
+
+    @staticmethod
+    def _location(cloud: CloudSettings, rel_path: str) -> tuple[str, str]:
+        """Bucket and key, laid out like rclone's remote:bucket/path."""
+        bucket, _, prefix = cloud.remote_path.strip("/").partition("/")
+        return bucket, f"{prefix}/{rel_path}" if prefix else rel_path
+
+    def cancel(self):
+        """Stop uploads in progress after their current parts."""
+        self._cancelled.set()
+
+    def upload(self, local: Path, rel_path: str, cloud: CloudSettings, on_poll=None):
+        """Upload local to rel_path under the remote. Raises S3UploadError.
+
+        on_poll, if given, is called about once a second during multipart uploads.
+        """
+        if boto3 is None:
+            raise S3UploadError("boto3 nao instalado")
+        self._cancelled.clear()
+        client = self._get_client(cloud)
+        bucket, key = self._location(cloud, rel_path)
+        st = local.stat()
+        part_size = max(cloud.s3_part_size_mb * 1024**2, MIN_PART_SIZE,
+                        math.ceil(st.st_size / MAX_PARTS))
+
+        try:
+            if st.st_size <= part_size:
+                with open(local, "rb") as f:
+                    data = f.read()
+                self._throttle(len(data))
+                client.put_object(Bucket=bucket, Key=key, Body=data)
+                return
+            self._upload_multipart(client, local, rel_path, bucket, key, st, part_size,
+                                   cloud.s3_concurrency, on_poll)
+        except (BotoCoreError, ClientError) as e:
+            raise S3UploadError(str(e)) from e
+
+    def _upload_multipart(self, client, local: Path, rel_path: str, bucket: str, key: str,
+                          st: os.stat_result, part_size: int, concurrency: int, on_poll):
+        state = self._resume_state(client, rel_path, bucket, key, st)
+        done = self._uploaded_parts(client, state) if state else None
+        if done is None:
+            upload_id = client.create_multipart_upload(Bucket=bucket, Key=key)["UploadId"]
+            state = {"upload_id": upload_id, "bucket": bucket, "key": key, "size": st.st_size,
+                     "mtime": st.st_mtime, "part_size": part_size}
+            with self._lock:
+                self._state[rel_path] = state
+                self._save()
+            done = {}
+        else:
+            part_size = state["part_size"]
+            logger.info(f"Resuming S3 upload of {rel_path} ({len(done)} parts already sent)")
+
+        upload_id = state["upload_id"]
+        part_count = math.ceil(st.st_size / part_size)
+        todo = [n for n in range(1, part_count + 1) if n not in done]
+
+        def send(number: int) -> tuple[int, str]:
+            if self._cancelled.is_set():
+                raise S3UploadError("cancelado")
+            with open(local, "rb") as f:
+                f.seek((number - 1) * part_size)
+                data = f.read(part_size)
+            self._throttle(len(data))
+            resp = client.upload_part(Bucket=bucket, Key=key, UploadId=upload_id,
+                                      PartNumber=number, Body=data)
+            return number, resp["ETag"]
+
+        # Workers read their own part, so memory stays at concurrency x part_size
+        with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+            futures = [pool.submit(send, n) for n in todo]
+            pending = futures
+            while pending:
+                finished, pending = wait(pending, timeout=1, return_when=FIRST_EXCEPTION)
+                failed = next((f for f in finished if f.exception()), None)
+                if failed:
+                    self._cancelled.set()  # let queued parts fail fast
+                    raise failed.exception()
+                if on_poll and pending:
+                    on_poll()
+            for future in futures:
+                number, etag = future.result()
+                done[number] = etag
+
+        client.complete_multipart_upload(
+            Bucket=bucket, Key=key, UploadId=upload_id,
+            MultipartUpload={"Parts": [{"PartNumber": n, "ETag": done[n]} for n in sorted(done)]},
+        )
+        with self._lock:
+            self._state.pop(rel_path, None)
+            self._save()
+
+    def _resume_state(self, client, rel_path: str, bucket: str, key: str,
+                      st: os.stat_result) -> dict | None:
+        """The saved upload for rel_path, if it is still valid for this file."""
+        with self._lock:
+            state = self._state.get(rel_path)
+        if state is None:
+            return None
+        if (state["bucket"], state["key"], state["size"], state["mtime"]) == (bucket, key, st.st_size, st.st_mtime):
+            return state
+        self.discard(rel_path, client)
+        return None
+
+    def _uploaded_parts(self, client, state: dict) -> dict[int, str] | None:
+        """Parts the server already has, or None if the upload expired."""
+        parts = {}
+        kwargs = {"Bucket": state["bucket"], "Key": state["key"], "UploadId": state["upload_id"]}
+        while True:
+            try:
+                resp = client.list_parts(**kwargs)
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") != "NoSuchUpload":
+                    raise
+                return None
+            for part in resp.get("Parts", []):
+                parts[part["PartNumber"]] = part["ETag"]
+            if not resp.get("IsTruncated"):
+                return parts
+            kwargs["PartNumberMarker"] = resp["NextPartNumberMarker"]
+
+    def discard(self, rel_path: str, client=None):
+        """Abort the unfinished upload of rel_path, if any."""
+        with self._lock:
+            state = self._state.pop(rel_path, None)
+            if state is None:
+                return
+            self._save()
+        client = client or self._client
+        if client is None:
+            return
+        try:
+            client.abort_multipart_upload(Bucket=state["bucket"], Key=state["key"], UploadId=state["upload_id"])
+        except (BotoCoreError, ClientError) as e:
+            logger.debug(f"abort_multipart_upload {rel_path}: {e}")
+
+    def _throttle(self, size: int):
+        """Delay sending size bytes so the average rate stays under bwlimit."""
+        rate = self.bwlimit
+        if not rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_send)
+            self._next_send = start + size / rate
+        if start > now:
+            time.sleep(start - now)
@@ -0,0 +1,111 @@
+"""Time-of-day windows and bandwidth limits for cloud uploads."""
+
+import re
+from datetime import datetime, timedelta, time as dtime
+from ..models import CloudSettings
+
+_HHMM_RE = re.compile(r"^\s*(\d{1,2}):(\d{2})\s*$")
+_RATE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([bkmgBKMG]?)\s*$")
+_RATE_UNITS = {"": 1024, "b": 1, "k": 1024, "m": 1024**2, "g": 1024**3}
+
+
+def parse_hhmm(value: str) -> dtime:
+    """Time of day from "HH:MM" ("24:00" is midnight). Raises ValueError otherwise."""
+    match = _HHMM_RE.match(value)
+    if not match:
+        raise ValueError(f"Horario invalido: {value!r} (use HH:MM)")
+    hours, minutes = int(match[1]), int(match[2])
+    if minutes > 59 or hours > 24 or (hours == 24 and minutes):
+        raise ValueError(f"Horario invalido: {value!r} (use HH:MM)")
+    return dtime(hours % 24, minutes)
+
+
+def in_window(start: str, end: str, moment: datetime) -> bool:
+    """True if moment's time of day is in [start, end). Windows may wrap midnight."""
+    t = moment.time()
+    s, e = parse_hhmm(start), parse_hhmm(end)
+    if s == e:
+        return True
+    if s < e:
+        return s <= t < e
+    return t >= s or t < e
+
+
+def overlaps_window(start: str, end: str, seg_start: datetime, duration: float) -> bool:
+    """True if any part of a segment falls inside a daily [start, end) window."""
+    seg_end = seg_start + timedelta(seconds=max(duration, 1) - 1)
+    if in_window(start, end, seg_start) or in_window(start, end, seg_end):
+        return True
+    # Window shorter than the segment, starting in the middle of it
+    s = parse_hhmm(start)
+    for day in (seg_start.date(), seg_end.date()):
+        window_start = datetime.combine(day, s)
+        if seg_start <= window_start <= seg_end:
+            return True
+    return False
+
+
+def matches_sync_rules(cloud: CloudSettings, camera_id: str, seg_start: datetime | None,
+                       duration: float) -> bool:
+    """Whether a segment should be uploaded under cloud.sync_rules.
+
+    No rules means everything is uploaded. Segments with an unknown start
+    time are uploaded rather than silently dropped.
+    """
+    if not cloud.sync_rules or seg_start is None:
+        return True
+    for rule in cloud.sync_rules:
+        if rule.cameras and camera_id not in rule.cameras:
+            continue
+        if overlaps_window(rule.start, rule.end, seg_start, duration):
+            return True
+    return False
+
+
+def sync_rule_errors(cloud: CloudSettings, camera_ids: set[str]) -> list[str]:
+    """Problems with cloud.sync_rules: times parse_hhmm rejects and unknown cameras."""
+    errors = []
+    for i, rule in enumerate(cloud.sync_rules, 1):
+        for value in (rule.start, rule.end):
+            try:
+                parse_hhmm(value)
+            except ValueError as e:
+                errors.append(f"Regra {i}: {e}")
+        unknown = [cam for cam in rule.cameras if cam not in camera_ids]
+        if unknown:
+            errors.append(f"Regra {i}: camera desconhecida: {', '.join(unknown)}")
+    return errors
+
+
+def parse_rate(rate: str) -> float | None:
+    """Bytes/s for an rclone rate ("512k", "5M"); None means unlimited."""
+    if not rate or rate.strip().lower() in ("0", "off"):
+        return None
+    m = _RATE_RE.match(rate)
+    if not m:
+        return None
+    return float(m.group(1)) * _RATE_UNITS[m.group(2).lower()]
+
+
+def current_bandwidth_limit(cloud: CloudSettings, moment: datetime | None = None,
+                            remote_viewers: int = 0) -> str:
+    """Bandwidth limit to apply now.
+
+    The first matching schedule window wins, falling back to bandwidth_limit.
+    While someone watches live over the internet, the stricter of that and
+    viewer_bandwidth_limit is used so uploads don't starve the stream.
+    """
+    moment = moment or datetime.now()
+    limit = cloud.bandwidth_limit
+    for window in cloud.bandwidth_schedule:
+        if in_window(window.start, window.end, moment):
+            limit = window.limit
+            break
+
+    if remote_viewers and cloud.viewer_bandwidth_limit:
+        viewer = parse_rate(cloud.viewer_bandwidth_limit)
+        current = parse_rate(limit)
+        if viewer is not None and (current is None or viewer < current):
+            limit = cloud.viewer_bandwidth_limit
+
+    return limit if parse_rate(limit) is not None else "off"
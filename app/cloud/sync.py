@@ -7,25 +7,66 @@ import logging
 import threading
 import time
 from pathlib import Path
-from datetime import datetime
-from ..models import CloudSettings, CloudProvider
+from typing import Callable
+from datetime import datetime, timedelta
+from ..models import CloudSettings, CloudProvider, ProxyMode, UploadBackend
 from ..config import load_config, BASE_DIR
+from ..events import publish
+from .queue import UploadQueue, PRIORITY_EVENT, PRIORITY_RECENT, PRIORITY_BACKLOG
+from .manifest import UploadManifest, file_md5
+from .rclone_rc import RcloneDaemon, RcloneError
+from .schedule import current_bandwidth_limit, matches_sync_rules, parse_rate
+from .proxy import ProxyEncoder, proxy_path, PROXY_DIR
+from .archive import ArchiveCache
+from . import s3
+from ..recording.segments import segment_start
 
 logger = logging.getLogger(__name__)
 
 RCLONE_EXE = BASE_DIR / "tools" / "rclone" / "rclone.exe"
 
+UPLOAD_BATCH = 5  # files uploaded per queue pass
+PRUNE_INTERVAL = 6 * 3600  # seconds between cloud retention runs
+BWLIMIT_CHECK_INTERVAL = 15  # seconds between bandwidth schedule/viewer checks
+
 
 class CloudSyncManager:
-    """Manages periodic cloud sync via rclone."""
+    """Uploads finalized segments to the cloud via a long-lived rclone daemon.
+
+    Segments are queued as the recorder closes them and uploaded one by one
+    shortly after. Every upload is recorded in the manifest, so the periodic
+    reconciliation only walks the local folder to find files that were
+    missed, and retention deletes expired days without listing their files.
+    """
 
-    def __init__(self):
+    def __init__(self, mediamtx=None):
+        self._mediamtx = mediamtx  # MediaMTXManager, to detect remote live viewers
         self._thread: threading.Thread | None = None
         self._running = False
         self._syncing = False
         self._last_sync: str | None = None
         self._last_error: str | None = None
-        self._next_sync: float = 0
+        self._full_sync_requested = False
+        self._next_reconcile: float = 0
+        self._next_prune: float = 0
+        self._queue = UploadQueue()
+        self._manifest = UploadManifest()
+        self._proxy = ProxyEncoder(self._proxy_done)
+        self._proxy_meta: dict[Path, tuple[int, float | None]] = {}  # segment -> (priority, created)
+        self._rclone = RcloneDaemon(RCLONE_EXE)
+        self.archive = ArchiveCache(self._rclone)
+        self._s3 = s3.S3Uploader(self._rclone)
+        self._bwlimit: str | None = None
+        self._bwlimit_checked: float = 0
+        self._remote_viewers = 0
+        self._event_windows: list[tuple[str | None, datetime, datetime]] = []
+        self._prune_subscribers: list[Callable[[str], None]] = []
+
+        # Counters since startup, for status and metrics
+        self._uploaded_files = 0
+        self._uploaded_bytes = 0
+        self._upload_seconds = 0.0
+        self._failed_uploads = 0
         
         # Setup state
         self._setup_thread: threading.Thread | None = None
@@ -41,96 +82,423 @@ class CloudSyncManager:
         self._running = True
         self._thread = threading.Thread(target=self._sync_loop, daemon=True)
         self._thread.start()
+        self._proxy.start()
         logger.info("Cloud sync started")
 
     def stop(self):
-        """Stop sync thread."""
+        """Stop sync thread and the rclone daemon."""
         self._running = False
+        self._proxy.stop()
+        self._s3.cancel()
+        self._rclone.cancel_all()
+        self._rclone.stop()
         logger.info("Cloud sync stopped")
 
+    def cancel(self):
+        """Cancel the transfers in progress (they are retried later)."""
+        self._full_sync_requested = False
+        self._s3.cancel()
+        self._rclone.cancel_all()
+
+    @property
+    def manifest(self) -> UploadManifest:
+        return self._manifest
+
     def sync_now(self):
-        """Trigger immediate sync."""
-        self._next_sync = 0
+        """Trigger an immediate reconciliation of the recordings folder."""
+        self._full_sync_requested = True
+
+    def subscribe_pruned(self, callback: Callable[[str], None]):
+        """Register a callback for days purged from the remote by retention."""
+        self._prune_subscribers.append(callback)
+
+    def enqueue_segment(self, segment):
+        """Queue a finalized segment for upload. Called by the SegmentTracker."""
+        config = load_config()
+        if not config.cloud.enabled:
+            return
+        rec_path = BASE_DIR / config.recording.recordings_path
+        rel_path = segment.path.relative_to(rec_path).as_posix()
+        if self._manifest.is_uploaded(rel_path, segment.size):
+            return
+        if not matches_sync_rules(config.cloud, segment.camera_id, segment.start, segment.duration):
+            return
+        created = segment.start.timestamp() if segment.start else None
+        priority = PRIORITY_RECENT
+        if segment.start and self._in_event_window(segment.camera_id, segment.start, segment.duration):
+            priority = PRIORITY_EVENT
+        self._submit(config, segment.path, rel_path, segment.size, priority, created)
+
+    def _submit(self, config, local: Path, rel_path: str, size: int, priority: int,
+                created: float | None):
+        """Queue a segment, sending it through the proxy encoder if configured."""
+        camera_id = rel_path.split("/")[1]
+        mode = config.cloud.proxy_cameras.get(camera_id, ProxyMode.OFF)
+        if mode == ProxyMode.OFF:
+            self._queue.put(rel_path, size, priority=priority, created=created)
+            return
+
+        if mode == ProxyMode.FIRST:
+            self._queue.put(rel_path, size, priority=PRIORITY_BACKLOG, created=created)
+            proxy_remote = self._proxy_remote(rel_path)
+            if self._manifest.get(proxy_remote):
+                return
+
+        self._proxy_meta[local] = (priority, created)
+        if proxy_path(local).exists():
+            # Encoded before a restart but not uploaded yet
+            self._proxy_done(local, proxy_path(local))
+        else:
+            self._proxy.submit(local, config.cloud)
+
+    def _proxy_remote(self, rel_path: str) -> str:
+        date, camera_id, name = rel_path.split("/")
+        return f"{date}/{camera_id}/proxy/{name}"
+
+    def _proxy_done(self, segment: Path, proxy: Path):
+        """Queue a finished proxy. Called by the ProxyEncoder."""
+        config = load_config()
+        rec_path = BASE_DIR / config.recording.recordings_path
+        rel_path = segment.relative_to(rec_path).as_posix()
+        priority, created = self._proxy_meta.pop(segment, (PRIORITY_RECENT, None))
+        mode = config.cloud.proxy_cameras.get(rel_path.split("/")[1], ProxyMode.OFF)
+        proxy_rel = proxy.relative_to(rec_path).as_posix()
+
+        if mode == ProxyMode.REPLACE:
+            # Stands in for the original: same remote path, original's size
+            # in the manifest so reconciliation treats the segment as uploaded
+            self._queue.put(proxy_rel, segment.stat().st_size, priority=priority,
+                            created=created, remote=rel_path)
+        else:
+            self._queue.put(proxy_rel, proxy.stat().st_size, priority=priority,
+                            created=created, remote=self._proxy_remote(rel_path))
+
+    def prioritize(self, camera_id: str | None, start: datetime, end: datetime) -> int:
+        """Upload footage of a camera (None = all) in [start, end) before anything else.
+
+        Queued segments are bumped now; segments still being recorded are
+        bumped when they finalize. Returns the number of queued files bumped.
+        Aware times (an ISO "Z" or offset) are taken in local time, like
+        segment names.
+        """
+        start, end = _naive_local(start), _naive_local(end)
+        self._event_windows = [
+            w for w in self._event_windows if w[2] > datetime.now() - timedelta(days=1)
+        ]
+        self._event_windows.append((camera_id, start, end))
+        segment_duration = load_config().recording.segment_duration
+
+        def match(item: dict) -> bool:
+            parts = item["path"].split("/")
+            date, cam_id = parts[:2]
+            seg_start = segment_start(Path(date, cam_id, parts[-1]))
+            if seg_start is None or (camera_id and cam_id != camera_id):
+                return False
+            return seg_start < end and seg_start + timedelta(seconds=segment_duration) > start
+
+        return self._queue.prioritize(match)
+
+    def _in_event_window(self, camera_id: str, start: datetime, duration: float) -> bool:
+        end = start + timedelta(seconds=duration)
+        return any(
+            (cam is None or cam == camera_id) and start < w_end and end > w_start
+            for cam, w_start, w_end in self._event_windows
+        )
 
     def _sync_loop(self):
-        """Background loop that syncs periodically."""
+        """Background loop that drains the upload queue."""
         while self._running:
             config = load_config()
             if not config.cloud.enabled:
                 time.sleep(30)
                 continue
 
-            interval = config.cloud.sync_interval_minutes * 60
+            # Retention may delete folders under the scans and uploads at
+            # any time; a failed pass must not end the thread
+            try:
+                if self._full_sync_requested or time.time() >= self._next_reconcile:
+                    self._full_sync_requested = False
+                    self._reconcile(config)
+                    self._next_reconcile = time.time() + config.cloud.sync_interval_minutes * 60
 
-            if time.time() >= self._next_sync:
-                self._do_sync(config.cloud)
-                self._next_sync = time.time() + interval
+                self._drain_queue(config)
+
+                if time.time() >= self._next_prune:
+                    self._prune_remote(config.cloud)
+                    self._next_prune = time.time() + PRUNE_INTERVAL
+            except Exception as e:
+                self._last_error = str(e)[:200]
+                logger.error(f"Cloud sync error: {e}")
 
             time.sleep(10)
 
-    def _do_sync(self, cloud: CloudSettings):
-        """Execute rclone copy."""
+    def _drain_queue(self, config):
+        """Upload the queued files that are due."""
         if not RCLONE_EXE.exists():
-            self._last_error = "rclone nao encontrado. Execute setup.bat."
-            logger.error(self._last_error)
             return
-
-        config = load_config()
         rec_path = BASE_DIR / config.recording.recordings_path
 
-        if not rec_path.exists():
-            return
+        for item in self._queue.ready(UPLOAD_BATCH):
+            if not self._running:
+                break
+            local = rec_path / item["path"]
+            if not local.exists():
+                logger.info(f"Dropping {item['path']} from upload queue: file no longer exists")
+                self._queue.done(item["path"])
+                self._s3.discard(item["remote"])
+                continue
 
-        self._syncing = True
-        self._last_error = None
+            self._syncing = True
+            started = time.monotonic()
+            try:
+                error = self._upload_file(local, item["remote"], config.cloud)
+            finally:
+                self._syncing = False
+                self._upload_seconds += time.monotonic() - started
+
+            if error:
+                self._last_error = error
+                self._failed_uploads += 1
+                self._queue.fail(item["path"], error)
+            else:
+                self._uploaded_files += 1
+                self._uploaded_bytes += local.stat().st_size
+                remote = f"{config.cloud.remote_name}:{config.cloud.remote_path}/{item['remote']}"
+                self._manifest.record(item["remote"], item["size"], file_md5(local), remote)
+                self._queue.done(item["path"])
+                if f"/{PROXY_DIR}/" in item["path"]:
+                    local.unlink(missing_ok=True)
+                self._last_sync = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                self._last_error = None
+            self._publish_progress()
 
-        remote = f"{cloud.remote_name}:{cloud.remote_path}"
+    def _publish_progress(self):
+        """Push queue and transfer progress to the browser."""
+        publish("cloud", self._progress(self._queue.summary()))
 
-        cmd = [
-            str(RCLONE_EXE),
-            "copy",
-            str(rec_path),
-            remote,
-            "--min-age", "2m",
-            "--bwlimit", cloud.bandwidth_limit,
-            "--log-level", "INFO",
-            "--stats", "0",
-        ]
+    def _on_transfer_poll(self, cloud: CloudSettings):
+        self._update_bwlimit(cloud)
+        self._publish_progress()
 
-        creationflags = 0
-        if sys.platform == "win32":
-            creationflags = subprocess.CREATE_NO_WINDOW
+    def _update_bwlimit(self, cloud: CloudSettings):
+        """Apply the scheduled/viewer-adjusted bandwidth limit if it changed.
 
+        Also called while a transfer runs; core/bwlimit affects transfers in
+        progress, so a viewer connecting mid-upload is throttled within seconds.
+        """
+        if time.time() - self._bwlimit_checked < BWLIMIT_CHECK_INTERVAL:
+            return
+        self._bwlimit_checked = time.time()
+        self._remote_viewers = self._mediamtx.count_remote_viewers() if self._mediamtx else 0
+        limit = current_bandwidth_limit(cloud, remote_viewers=self._remote_viewers)
+        # The daemon re-applies the last limit itself when it restarts
+        if limit != self._bwlimit:
+            self._rclone.set_bwlimit(limit)
+            self._s3.bwlimit = parse_rate(limit)
+            logger.info(f"Cloud upload bandwidth limit: {limit} ({self._remote_viewers} remote viewers)")
+            self._bwlimit = limit
+
+    def _backend(self, cloud: CloudSettings) -> UploadBackend:
+        """Uploader for the provider; direct S3 falls back to rclone without boto3."""
+        backend = cloud.upload_backends.get(cloud.provider, UploadBackend.RCLONE)
+        if backend == UploadBackend.S3 and cloud.provider == CloudProvider.S3:
+            if s3.available():
+                return backend
+            logger.warning("Direct S3 upload needs boto3 (pip install boto3); using rclone")
+        return UploadBackend.RCLONE
+
+    def _upload_file(self, local: Path, rel_path: str, cloud: CloudSettings) -> str | None:
+        """Upload one file. Returns an error message or None."""
         try:
-            logger.info(f"Cloud sync starting: {rec_path} -> {remote}")
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=3600,
-                creationflags=creationflags,
+            if not self._rclone.is_running():
+                self._bwlimit_checked = 0
+            self._update_bwlimit(cloud)
+            if self._backend(cloud) == UploadBackend.S3:
+                self._s3.upload(local, rel_path, cloud, on_poll=lambda: self._on_transfer_poll(cloud))
+                logger.info(f"Uploaded {rel_path} (S3 multipart)")
+                return None
+            self._rclone.run_job(
+                "operations/copyfile",
+                timeout=1800,
+                on_poll=lambda: self._on_transfer_poll(cloud),
+                srcFs=str(local.parent),
+                srcRemote=local.name,
+                dstFs=f"{cloud.remote_name}:{cloud.remote_path}",
+                dstRemote=rel_path,
             )
-            if result.returncode == 0:
-                self._last_sync = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                logger.info(f"Cloud sync complete at {self._last_sync}")
-            else:
-                self._last_error = result.stderr[:200] if result.stderr else "Unknown error"
-                logger.error(f"Cloud sync failed: {self._last_error}")
-        except subprocess.TimeoutExpired:
-            self._last_error = "Sync timeout (1h)"
-            logger.error(self._last_error)
+            logger.info(f"Uploaded {rel_path}")
+            return None
+        except (RcloneError, s3.S3UploadError) as e:
+            return str(e)[:200]
         except Exception as e:
-            self._last_error = str(e)
-            logger.error(f"Cloud sync error: {e}")
-        finally:
-            self._syncing = False
+            logger.error(f"Upload of {rel_path} failed: {e}")
+            return str(e)[:200]
 
-    def get_status(self) -> dict:
+    def _not_uploaded(self, config):
+        """Yield (path, rel_path, size, mtime) of finished local segments
+        missing from the manifest. Only the local folder is walked."""
+        rec_path = BASE_DIR / config.recording.recordings_path
+        if not rec_path.exists():
+            return
+
+        uploaded = self._manifest.uploaded_sizes()
+        cutoff = time.time() - 120  # skip segments still being written
+        for day_dir in sorted(rec_path.iterdir()):
+            if not day_dir.is_dir() or len(day_dir.name) != 10:
+                continue
+            for cam_dir in day_dir.iterdir():
+                if not cam_dir.is_dir():
+                    continue
+                for entry in os.scandir(cam_dir):
+                    if not entry.name.endswith(".mp4"):
+                        continue
+                    st = entry.stat()
+                    if st.st_mtime > cutoff:
+                        continue
+                    rel_path = f"{day_dir.name}/{cam_dir.name}/{entry.name}"
+                    if uploaded.get(rel_path) == st.st_size:
+                        continue
+                    yield Path(entry.path), rel_path, st.st_size, st.st_mtime
+
+    def _reconcile(self, config):
+        """Queue finished local segments that are missing from the manifest."""
+        duration = config.recording.segment_duration
+        queued = 0
+        for path, rel_path, size, mtime in self._not_uploaded(config):
+            if not matches_sync_rules(config.cloud, rel_path.split("/")[1], segment_start(path), duration):
+                continue
+            self._submit(config, path, rel_path, size, PRIORITY_BACKLOG, mtime)
+            queued += 1
+
+        if queued:
+            logger.info(f"Cloud sync: {queued} local segments not in manifest queued for upload")
+
+    def dry_run(self, cloud: CloudSettings | None = None) -> dict:
+        """Report what the sync rules would upload from the local backlog.
+
+        cloud defaults to the saved settings; pass other settings to preview
+        rules before saving them.
+        """
+        config = load_config()
+        cloud = cloud or config.cloud
+        duration = config.recording.segment_duration
+        report = {"files": 0, "bytes": 0, "skipped_files": 0, "skipped_bytes": 0, "cameras": {}}
+        for path, rel_path, size, _ in self._not_uploaded(config):
+            camera_id = rel_path.split("/")[1]
+            cam = report["cameras"].setdefault(camera_id, {"files": 0, "bytes": 0})
+            if matches_sync_rules(cloud, camera_id, segment_start(path), duration):
+                report["files"] += 1
+                report["bytes"] += size
+                cam["files"] += 1
+                cam["bytes"] += size
+            else:
+                report["skipped_files"] += 1
+                report["skipped_bytes"] += size
+        return report
+
+    def _prune_remote(self, cloud: CloudSettings):
+        """Delete remote day folders older than cloud_retention_days.
+
+        Each expired day is removed with a single operations/purge call.
+        """
+        if not cloud.cloud_retention_days or not RCLONE_EXE.exists():
+            return
+
+        cutoff = (datetime.now() - timedelta(days=cloud.cloud_retention_days)).strftime("%Y-%m-%d")
+        remote = f"{cloud.remote_name}:{cloud.remote_path}"
+        expired = set(self._manifest.dates_before(cutoff))
+
+        # Day folders uploaded before the manifest existed: one shallow listing
+        try:
+            listing = self._rclone.call("operations/list", fs=remote, remote="", opt={"dirsOnly": True})
+            for item in listing.get("list") or []:
+                name = item.get("Name", "")
+                if len(name) == 10 and name[4] == "-" and name < cutoff:
+                    expired.add(name)
+        except RcloneError as e:
+            logger.warning(f"Cloud retention: could not list {remote}: {e}")
+
+        for date in sorted(expired):
+            if not self._running:
+                break
+            try:
+                self._rclone.call("operations/purge", fs=remote, remote=date)
+            except RcloneError as e:
+                if "not found" not in str(e).lower():
+                    logger.error(f"Cloud retention: failed to delete {date}: {e}")
+                    continue
+            removed = self._manifest.remove_date(date)
+            logger.info(f"Cloud retention: deleted {date} from {remote} ({removed} files in manifest)")
+            for callback in self._prune_subscribers:
+                try:
+                    callback(date)
+                except Exception as e:
+                    logger.error(f"Cloud retention: subscriber failed for {date}: {e}")
+
+    def _progress(self, queue: dict) -> dict:
+        """Queue and transfer progress (no disk or database access)."""
+        transfer = self._transfer_stats()
         return {
             "running": self._running,
             "syncing": self._syncing,
             "last_sync": self._last_sync,
             "error": self._last_error,
+            "pending": queue["files"],
+            "pending_bytes": queue["bytes"],
+            "oldest_pending_age": queue["oldest_age"],
+            "proxy_pending": self._proxy.pending(),
+            "session": {
+                "files": self._uploaded_files,
+                "bytes": self._uploaded_bytes,
+                "failed": self._failed_uploads,
+                "avg_speed": round(self._uploaded_bytes / self._upload_seconds) if self._upload_seconds else 0,
+            },
+            "speed": transfer["speed"] if transfer else 0,
+            "transfer": transfer,
+        }
+
+    def get_status(self) -> dict:
+        queue = self._queue.summary()
+        return {
+            **self._progress(queue),
+            "uploaded": self._manifest.totals(),
+            "bandwidth_limit": self._bwlimit,
+            "remote_viewers": self._remote_viewers,
+            "errors": queue["errors"] + list(self._rclone.errors),
+        }
+
+    def metrics(self) -> str:
+        """Status as Prometheus text exposition."""
+        status = self.get_status()
+        values = {
+            "sentinela_cloud_pending_files": status["pending"],
+            "sentinela_cloud_pending_bytes": status["pending_bytes"],
+            "sentinela_cloud_oldest_pending_seconds": status["oldest_pending_age"] or 0,
+            "sentinela_cloud_proxy_pending_files": status["proxy_pending"],
+            "sentinela_cloud_uploaded_files_total": status["session"]["files"],
+            "sentinela_cloud_uploaded_bytes_total": status["session"]["bytes"],
+            "sentinela_cloud_upload_failures_total": status["session"]["failed"],
+            "sentinela_cloud_speed_bytes": status["speed"],
+            "sentinela_cloud_avg_speed_bytes": status["session"]["avg_speed"],
+            "sentinela_cloud_manifest_files": status["uploaded"]["files"],
+            "sentinela_cloud_manifest_bytes": status["uploaded"]["bytes"],
+            "sentinela_cloud_remote_viewers": status["remote_viewers"],
+            "sentinela_cloud_syncing": int(status["syncing"]),
+        }
+        return "".join(f"{name} {value}\n" for name, value in values.items())
+
+    def _transfer_stats(self) -> dict | None:
+        """Live stats from the rclone daemon while something is uploading."""
+        if not self._syncing:
+            return None
+        stats = self._rclone.stats()
+        if not stats:
+            return None
+        return {
+            "bytes": stats.get("bytes", 0),
+            "total_bytes": stats.get("totalBytes", 0),
+            "speed": round(stats.get("speed", 0)),
+            "eta": stats.get("eta"),
         }
 
     def is_configured(self) -> bool:
@@ -139,13 +507,10 @@ class CloudSyncManager:
             return False
         config = load_config()
         try:
-            result = subprocess.run(
-                [str(RCLONE_EXE), "listremotes"],
-                capture_output=True, text=True, timeout=10,
-                creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0,
-            )
-        except Exception:
+            remotes = self._rclone.call("config/listremotes").get("remotes") or []
+        except RcloneError:
             return False
+        return config.cloud.remote_name in remotes
 
     def start_setup(self, cloud: CloudSettings):
         """Start the async setup process."""
@@ -242,6 +607,8 @@ class CloudSyncManager:
             
             if retcode == 0:
                 self._setup_status = "success"
+                # The daemon loaded the old rclone.conf; restart it on next use
+                self._rclone.stop()
             else:
                 self._setup_status = "error"
                 self._setup_error = "Falha no processo rclone"
@@ -253,6 +620,10 @@ class CloudSyncManager:
             self._setup_process = None
 
 
+def _naive_local(moment: datetime) -> datetime:
+    return moment.astimezone().replace(tzinfo=None) if moment.tzinfo else moment
+
+
 async def setup_rclone_remote(cloud: CloudSettings) -> dict:
     """Launch rclone config for the provider."""
     import asyncio
@@ -3,22 +3,42 @@
 import yaml
 import os
 import logging
+import threading
 from pathlib import Path
 from .models import AppConfig, CameraModel
+from .events import publish
 
 logger = logging.getLogger(__name__)
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 CONFIG_PATH = BASE_DIR / "config.yaml"
 
+# Parsed config keyed by the file's (mtime, size); every subsystem loads
+# the config on each pass, and parsing YAML is far slower than a stat()
+_cache_lock = threading.Lock()
+_cache: tuple[tuple[int, int], AppConfig] | None = None
+
+
+def _file_key() -> tuple[int, int]:
+    st = CONFIG_PATH.stat()
+    return st.st_mtime_ns, st.st_size
+
 
 def load_config() -> AppConfig:
-    """Load configuration from config.yaml, creating defaults if missing."""
+    """Load configuration from config.yaml, creating defaults if missing.
+
+    Returns a private copy; callers may modify it and pass it to save_config().
+    """
+    global _cache
     if CONFIG_PATH.exists():
         try:
-            with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-                data = yaml.safe_load(f) or {}
-            return AppConfig(**data)
+            with _cache_lock:
+                key = _file_key()
+                if _cache is None or _cache[0] != key:
+                    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+                        data = yaml.safe_load(f) or {}
+                    _cache = (key, AppConfig(**data))
+                return _cache[1].model_copy(deep=True)
         except Exception as e:
             logger.error(f"Error loading config: {e}. Using defaults.")
             return AppConfig()
@@ -30,10 +50,15 @@ def load_config() -> AppConfig:
 
 def save_config(config: AppConfig) -> None:
     """Save configuration to config.yaml."""
+    global _cache
     try:
         data = config.model_dump(mode="json")
-        with open(CONFIG_PATH, "w", encoding="utf-8") as f:
-            yaml.dump(data, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+        tmp = CONFIG_PATH.with_suffix(".tmp")
+        with _cache_lock:
+            with open(tmp, "w", encoding="utf-8") as f:
+                yaml.dump(data, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+            os.replace(tmp, CONFIG_PATH)
+            _cache = (_file_key(), config.model_copy(deep=True))
         logger.info("Config saved.")
     except Exception as e:
         logger.error(f"Error saving config: {e}")
@@ -68,6 +93,10 @@ def update_camera(config: AppConfig, camera_id: str, updates: dict) -> AppConfig
             cam_data = cam.model_dump()
             cam_data.update({k: v for k, v in updates.items() if v is not None})
             config.cameras[i] = CameraModel(**cam_data)
+            updated = config.cameras[i]
+            if updated.status != cam.status or updated.enabled != cam.enabled:
+                publish("camera", {"camera_id": camera_id, "status": updated.status.value,
+                                   "enabled": updated.enabled}, key=f"camera:{camera_id}")
             break
     save_config(config)
     return config
@@ -0,0 +1,120 @@
+"""Server-sent events: subsystems publish, /api/events streams to browsers."""
+
+import asyncio
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+COALESCE_DELAY = 0.25  # seconds; events published meanwhile share one flush
+CLIENT_QUEUE = 64  # chunks a slow client may lag behind before it is dropped
+KEEPALIVE = 15  # seconds between comments on an idle stream
+
+
+class EventBroadcaster:
+    """Fan-out of events to any number of SSE clients.
+
+    publish() may be called from any thread. Events are coalesced by key
+    (a newer event replaces a pending one with the same key) and flushed
+    on the event loop every COALESCE_DELAY, where each one is serialized
+    once and the same bytes are queued to every client. The latest
+    retained event per key is replayed to new clients, so a page gets the
+    current state as soon as it connects.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._pending: dict[str, tuple[str, dict, bool]] = {}
+        self._flush_scheduled = False
+        self._retained: dict[str, bytes] = {}
+        self._clients: set[asyncio.Queue] = set()
+        self._closed = False
+
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        """Start delivering on this loop (called at app startup)."""
+        self._loop = loop
+
+    def publish(self, event: str, data: dict, key: str | None = None, retain: bool = True):
+        key = key or event
+        with self._lock:
+            self._pending[key] = (event, data, retain)
+            if self._flush_scheduled or self._loop is None:
+                return
+            self._flush_scheduled = True
+        try:
+            self._loop.call_soon_threadsafe(self._loop.call_later, COALESCE_DELAY, self._flush)
+        except RuntimeError:  # loop closed during shutdown
+            pass
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flush_scheduled = False
+        for key, (event, data, retain) in pending.items():
+            chunk = f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n".encode()
+            if retain:
+                self._retained[key] = chunk
+            for queue in list(self._clients):
+                try:
+                    queue.put_nowait(chunk)
+                except asyncio.QueueFull:
+                    # Too far behind: disconnect; the browser reconnects and gets a replay
+                    self._clients.discard(queue)
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait(None)
+
+    def close(self):
+        """End every client stream (thread-safe). Called when the server is
+        stopping: uvicorn waits for open responses before running the
+        lifespan shutdown, and an SSE stream would otherwise never end."""
+        self._closed = True
+        if self._loop is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._end_streams)
+        except RuntimeError:  # loop already closed
+            pass
+
+    def _end_streams(self):
+        for queue in list(self._clients):
+            self._clients.discard(queue)
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    async def stream(self, is_disconnected):
+        """Chunks for one client until it disconnects."""
+        if self._closed:
+            return
+        queue: asyncio.Queue = asyncio.Queue(maxsize=CLIENT_QUEUE)
+        self._clients.add(queue)
+        try:
+            yield b"retry: 3000\n\n"
+            for chunk in list(self._retained.values()):
+                yield chunk
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE)
+                except asyncio.TimeoutError:
+                    if await is_disconnected():
+                        break
+                    chunk = b": keepalive\n\n"
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            self._clients.discard(queue)
+
+
+broadcaster = EventBroadcaster()
+
+
+def publish(event: str, data: dict, key: str | None = None, retain: bool = True):
+    """Send an event to every connected browser (thread-safe)."""
+    broadcaster.publish(event, data, key, retain)
@@ -2,6 +2,7 @@
 
 from pydantic import BaseModel, Field
 from typing import Optional
+from datetime import datetime
 from enum import Enum
 
 
@@ -52,10 +53,20 @@ class CameraUpdate(BaseModel):
     enabled: Optional[bool] = None
 
 
+class RecordingFormat(str, Enum):
+    MP4 = "mp4"  # classic faststart MP4, rewritten when each segment closes
+    FMP4 = "fmp4"  # fragmented (opt-in): playable while written and after a crash, written once
+
+
 class RecordingSettings(BaseModel):
     segment_duration: int = Field(default=1800, description="Duration in seconds (default 30 min)")
     retention_days: int = Field(default=7, description="Days to keep recordings")
     recordings_path: str = "recordings"
+    offload_uploaded: bool = Field(default=False, description="Evict cloud-confirmed segments first; keep un-uploaded ones")
+    stall_timeout: int = Field(default=60, description="Restart a recorder that writes nothing for this many seconds (0 = off)")
+    format: RecordingFormat = Field(default=RecordingFormat.MP4, description="Container of new segments")
+    hls_cache_mb: int = Field(default=2048, description="Disk used by segments remuxed for HLS playback")
+    thumbnail_cache_mb: int = Field(default=512, description="Disk used by scrubbing thumbnails (0 = off)")
 
 
 class CloudProvider(str, Enum):
@@ -66,13 +77,54 @@ class CloudProvider(str, Enum):
     NONE = "none"
 
 
+class ProxyMode(str, Enum):
+    OFF = "off"  # upload the original segment
+    REPLACE = "replace"  # upload only a low-bitrate proxy
+    FIRST = "first"  # upload the proxy first, the original later as backlog
+
+
+class UploadBackend(str, Enum):
+    RCLONE = "rclone"  # rclone daemon, any provider
+    S3 = "s3"  # direct multipart upload (S3-compatible providers, needs boto3)
+
+
+class BandwidthWindow(BaseModel):
+    start: str = "18:00"  # HH:MM, may wrap midnight
+    end: str = "23:00"
+    limit: str = "1M"  # rclone rate, "0" = unlimited
+
+
+class SyncRule(BaseModel):
+    cameras: list[str] = []  # camera IDs, empty = all cameras
+    start: str = "00:00"  # HH:MM, may wrap midnight
+    end: str = "00:00"  # same as start = all day
+
+
 class CloudSettings(BaseModel):
     provider: CloudProvider = CloudProvider.NONE
     enabled: bool = False
     sync_interval_minutes: int = 60
     bandwidth_limit: str = "5M"
+    bandwidth_schedule: list[BandwidthWindow] = []
+    viewer_bandwidth_limit: str = Field(default="512k", description="Limit while live viewers are remote (empty = no change)")
+    sync_rules: list[SyncRule] = Field(default=[], description="Upload only matching footage (empty = everything)")
     remote_name: str = "sentinela"
     remote_path: str = "Sentinela"
+    cloud_retention_days: int = Field(default=0, description="Days to keep footage in the cloud (0 = forever)")
+    archive_cache_mb: int = Field(default=2048, description="Local cache for footage played back from the cloud")
+    proxy_cameras: dict[str, ProxyMode] = Field(default={}, description="Camera ID -> proxy upload mode")
+    proxy_height: int = 360
+    proxy_bitrate: str = "300k"
+    proxy_threads: int = Field(default=1, description="ffmpeg threads for proxy encoding (CPU budget)")
+    upload_backends: dict[CloudProvider, UploadBackend] = Field(default={}, description="Provider -> uploader (default rclone)")
+    s3_part_size_mb: int = Field(default=8, description="Multipart part size for direct S3 uploads")
+    s3_concurrency: int = Field(default=4, description="Parts uploaded in parallel (memory = parts x part size)")
+
+
+class CloudPrioritize(BaseModel):
+    camera_id: Optional[str] = None  # None = all cameras
+    start: datetime
+    end: datetime
 
 
 class TunnelMode(str, Enum):
@@ -129,3 +181,4 @@ class SystemStatus(BaseModel):
     tunnel_active: bool = False
     tunnel_url: Optional[str] = None
     uptime_seconds: int = 0
+    age_seconds: float = 0  # how old the sampled values are
@@ -0,0 +1,136 @@
+"""Clip export: recordings cut to a time range, streamed as fragmented MP4."""
+
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from ..config import BASE_DIR
+
+logger = logging.getLogger(__name__)
+
+MAX_EXPORTS = 2  # concurrent exports; each one reads the recordings disk at full speed
+MAX_EXPORT_SECONDS = 24 * 3600
+CHUNK_SIZE = 256 * 1024
+
+_slots = threading.BoundedSemaphore(MAX_EXPORTS)
+# Reads block on the ffmpeg pipe for as long as a download lasts; on their own
+# pool (one worker per slot) they never hold up the API's run_blocking executor
+_pipe_pool = ThreadPoolExecutor(max_workers=MAX_EXPORTS, thread_name_prefix="export")
+
+
+class ExportBusy(Exception):
+    pass
+
+
+def concat_list(items: list[dict], start: float, end: float, paths: list[Path]) -> str:
+    """ffconcat script playing index rows (start, duration) trimmed to [start, end).
+
+    With stream copy ffmpeg can only cut on keyframes, so the clip begins
+    at the keyframe at or before `start`.
+    """
+    lines = ["ffconcat version 1.0"]
+    for item, path in zip(items, paths):
+        # file: URL, since a relative name would resolve against pipe:
+        escaped = path.resolve().as_posix().replace("'", "'\\''")
+        lines.append(f"file 'file:{escaped}'")
+        if start > item["start"]:
+            lines.append(f"inpoint {start - item['start']:.3f}")
+        if end < item["start"] + item["duration"]:
+            lines.append(f"outpoint {end - item['start']:.3f}")
+    return "\n".join(lines) + "\n"
+
+
+class ClipExport:
+    """One running export: ffmpeg reads the concat script from stdin and
+    writes fragmented MP4 to stdout, so nothing touches the disk but the
+    source segments. Holds one of MAX_EXPORTS slots until closed.
+    """
+
+    def __init__(self, script: str):
+        if not _slots.acquire(blocking=False):
+            raise ExportBusy()
+        try:
+            self._process = self._spawn()
+        except Exception:
+            _slots.release()
+            raise
+        self._closed = False
+        self.error: str | None = None
+        threading.Thread(target=self._feed, args=(script,), daemon=True).start()
+        self._stderr_thread = threading.Thread(target=self._read_stderr, daemon=True)
+        self._stderr_thread.start()
+
+    def _spawn(self) -> subprocess.Popen:
+        ffmpeg_exe = str(BASE_DIR / "tools" / "ffmpeg" / "ffmpeg.exe")
+        if not Path(ffmpeg_exe).exists():
+            ffmpeg_exe = "ffmpeg"  # Fallback to PATH
+
+        cmd = [
+            ffmpeg_exe,
+            "-hide_banner",
+            "-loglevel", "error",
+            "-f", "concat",
+            "-safe", "0",
+            "-protocol_whitelist", "file,pipe",
+            "-i", "pipe:0",
+            "-map", "0:v:0",
+            "-map", "0:a:0?",
+            "-c", "copy",
+            "-avoid_negative_ts", "make_zero",
+            "-f", "mp4",
+            "-movflags", "frag_keyframe+empty_moov+default_base_moof",
+            "pipe:1",
+        ]
+
+        kwargs = {}
+        if sys.platform == "win32":
+            kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW | subprocess.BELOW_NORMAL_PRIORITY_CLASS
+        else:
+            kwargs["preexec_fn"] = lambda: os.nice(10)
+
+        return subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            **kwargs,
+        )
+
+    def _feed(self, script: str):
+        try:
+            self._process.stdin.write(script.encode())
+            self._process.stdin.close()
+        except OSError:
+            pass  # ffmpeg already gone
+
+    def _read_stderr(self):
+        for line in self._process.stderr:
+            self.error = line.decode(errors="replace").strip()
+            logger.warning(f"Export: {self.error}")
+
+    def read(self) -> bytes:
+        """Next chunk of the clip, b"" at the end."""
+        return self._process.stdout.read1(CHUNK_SIZE)
+
+    async def read_async(self) -> bytes:
+        """read() on the export pool."""
+        return await asyncio.get_running_loop().run_in_executor(_pipe_pool, self.read)
+
+    async def close_async(self):
+        """close() on the export pool."""
+        await asyncio.get_running_loop().run_in_executor(_pipe_pool, self.close)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._process.poll() is None:
+            self._process.kill()  # client went away mid-download
+        self._process.wait()
+        self._stderr_thread.join(timeout=1)
+        self._process.stdout.close()
+        _slots.release()
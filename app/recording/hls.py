@@ -0,0 +1,254 @@
+"""HLS VOD playback across recording segments."""
+
+import logging
+import math
+import os
+import shutil
+import subprocess
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+from ..config import BASE_DIR
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = BASE_DIR / "data" / "hls_cache"
+CHUNK_SECONDS = 10  # playlist granularity; each chunk is the whole GOPs starting in it
+REMUX_WORKERS = 2
+MAX_SEGMENTS = 200  # recordings per playlist, about two days of 15 min segments
+MEDIA_URL = "/api/hls/media"
+
+
+class HlsCache:
+    """HLS VOD playback across recordings, remuxed (stream copy, no
+    re-encode) to fragmented MP4 on demand.
+
+    Playlists come from index metadata alone: every recording is listed
+    as CHUNK_SECONDS chunks (<rel_path>/<n>.m4s, after its init.mp4), with
+    EXT-X-DISCONTINUITY between recordings, so the browser scrubs across
+    segment boundaries. A recording is remuxed the first time one of its
+    chunks is fetched, into one fragment per GOP; chunk n is then the
+    contiguous fragments starting in [n, n + 1) * CHUNK_SECONDS.
+
+    Remuxes run niced on a small pool, once per recording; the cache is an
+    LRU (directory mtime = last use) bounded by recording.hls_cache_mb.
+    """
+
+    def __init__(self, cache_dir: Path = CACHE_DIR):
+        self._dir = cache_dir
+        self._lock = threading.Lock()
+        self._remuxing: dict[str, Future] = {}
+        self._pool = ThreadPoolExecutor(max_workers=REMUX_WORKERS, thread_name_prefix="hls")
+
+    def playlist(self, items: list[dict], source: Callable[[str], Path | None],
+                 start: float | None, end: float | None) -> str:
+        """VOD playlist for index rows (path, start, duration), trimmed to [start, end).
+
+        source(rel_path) returns a readable copy of a recording, or None if
+        it is not available locally; those are left out as a gap.
+        """
+        lines = []
+        for item in items[:MAX_SEGMENTS]:
+            count = max(1, math.ceil(item["duration"] / CHUNK_SECONDS))
+            chunks = []
+            for n in range(count):
+                t = item["start"] + n * CHUNK_SECONDS
+                duration = min(CHUNK_SECONDS, item["duration"] - n * CHUNK_SECONDS)
+                if (start is None or t + duration > start) and (end is None or t < end):
+                    chunks.append((n, t, max(duration, 0.1)))
+            if not chunks or source(item["path"]) is None:
+                continue
+            url = f"{MEDIA_URL}/{item['path']}"
+            if lines:
+                lines.append("#EXT-X-DISCONTINUITY")
+            lines.append(f'#EXT-X-MAP:URI="{url}/init.mp4"')
+            began = datetime.fromtimestamp(chunks[0][1]).astimezone()
+            lines.append(f"#EXT-X-PROGRAM-DATE-TIME:{began.isoformat(timespec='milliseconds')}")
+            for n, _, duration in chunks:
+                lines += [f"#EXTINF:{duration:.3f},", f"{url}/{n}.m4s"]
+
+        header = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:7",
+            f"#EXT-X-TARGETDURATION:{CHUNK_SECONDS}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+            "#EXT-X-PLAYLIST-TYPE:VOD",
+            "#EXT-X-INDEPENDENT-SEGMENTS",
+        ]
+        return "\n".join(header + lines + ["#EXT-X-ENDLIST", ""])
+
+    def chunk(self, rel_path: str, name: str, source: Callable[[str], Path | None],
+              max_bytes: int) -> bytes | None:
+        """Bytes of init.mp4 or <n>.m4s of a recording, remuxing it first if
+        needed (blocking). None if the recording or the chunk doesn't exist."""
+        future = self._prepare(rel_path, source)
+        if future is None:
+            return None
+        init, fragments = future.result()
+        self._evict(max_bytes, keep=self._dir / rel_path)
+
+        if name == "init.mp4":
+            byterange = _byterange(init)
+        else:
+            try:
+                n = int(name.removesuffix(".m4s"))
+            except ValueError:
+                return None
+            byterange = _chunk_range(fragments, n)
+        if byterange is None:
+            return None
+        offset, length = byterange
+        with open(self._dir / rel_path / "index.m4s", "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def _prepare(self, rel_path: str, source: Callable[[str], Path | None]) -> Future | None:
+        """Future for (init byterange, [(duration, byterange)]) of a recording."""
+        out = self._dir / rel_path
+        if (out / "index.m3u8").is_file():
+            try:
+                os.utime(out)
+            except OSError:
+                pass
+            done = Future()
+            done.set_result(_parse_playlist(out / "index.m3u8"))
+            return done
+        with self._lock:
+            future = self._remuxing.get(rel_path)
+            if future is not None:
+                return future
+            src = source(rel_path)
+            if src is None:
+                return None
+            future = self._pool.submit(self._remux, rel_path, src, out)
+            self._remuxing[rel_path] = future
+        # Outside the lock: a future that is already done runs the callback here
+        future.add_done_callback(lambda _: self._forget(rel_path))
+        return future
+
+    def _forget(self, rel_path: str):
+        with self._lock:
+            self._remuxing.pop(rel_path, None)
+
+    def _remux(self, rel_path: str, src: Path, out: Path):
+        tmp = out.with_name(out.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+
+        ffmpeg_exe = str(BASE_DIR / "tools" / "ffmpeg" / "ffmpeg.exe")
+        if not Path(ffmpeg_exe).exists():
+            ffmpeg_exe = "ffmpeg"  # Fallback to PATH
+
+        cmd = [
+            ffmpeg_exe,
+            "-hide_banner",
+            "-loglevel", "error",
+            "-nostdin",
+            "-i", str(src),
+            "-map", "0:v:0",
+            "-map", "0:a:0?",
+            "-c", "copy",
+            "-f", "hls",
+            "-hls_time", "1",  # a fragment per GOP (cut at the first keyframe after 1 s)
+            "-hls_playlist_type", "vod",
+            "-hls_segment_type", "fmp4",
+            "-hls_flags", "single_file",
+            str(tmp / "index.m3u8"),
+        ]
+
+        kwargs = {}
+        if sys.platform == "win32":
+            kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW | subprocess.BELOW_NORMAL_PRIORITY_CLASS
+        else:
+            kwargs["preexec_fn"] = lambda: os.nice(10)
+
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, **kwargs)
+        if result.returncode != 0:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise RuntimeError(result.stderr.decode(errors="replace")[:200])
+        shutil.rmtree(out, ignore_errors=True)
+        os.replace(tmp, out)
+        logger.debug(f"HLS: remuxed {rel_path}")
+        return _parse_playlist(out / "index.m3u8")
+
+    def _evict(self, max_bytes: int, keep: Path):
+        """Drop least recently used remuxes until the cache, including the
+        one being served (keep), fits max_bytes."""
+        entries = []
+        total = 0
+        for playlist in self._dir.rglob("index.m3u8"):
+            directory = playlist.parent
+            if directory.name.endswith(".tmp"):
+                continue
+            size = sum(f.stat().st_size for f in directory.iterdir() if f.is_file())
+            total += size
+            if directory != keep:
+                entries.append((directory.stat().st_mtime, size, directory))
+        for _, size, directory in sorted(entries):
+            if total <= max_bytes:
+                break
+            shutil.rmtree(directory, ignore_errors=True)
+            total -= size
+            logger.info(f"HLS cache: evicted {directory.relative_to(self._dir).as_posix()}")
+
+    def usage(self) -> int:
+        if not self._dir.exists():
+            return 0
+        return sum(p.stat().st_size for p in self._dir.rglob("*") if p.is_file())
+
+
+def _parse_playlist(path: Path) -> tuple[str, list[tuple[float, str]]]:
+    """Init byterange and (duration, byterange) fragments of an ffmpeg
+    single_file fMP4 playlist."""
+    init = ""
+    fragments = []
+    duration = None
+    for line in path.read_text().splitlines():
+        if line.startswith("#EXT-X-MAP:"):
+            init = line.split('BYTERANGE="', 1)[1].rstrip('"')
+        elif line.startswith("#EXTINF:"):
+            duration = float(line[8:].split(",", 1)[0])
+        elif line.startswith("#EXT-X-BYTERANGE:") and duration is not None:
+            fragments.append((duration, line[17:]))
+            duration = None
+    return init, fragments
+
+
+def _byterange(value: str) -> tuple[int, int] | None:
+    """(offset, length) of an HLS "length@offset" byte range."""
+    length, _, offset = value.partition("@")
+    if not length or not offset:
+        return None
+    return int(offset), int(length)
+
+
+def _chunk_range(fragments: list[tuple[float, str]], n: int) -> tuple[int, int] | None:
+    """(offset, length) of the fragments starting in chunk n's time window.
+
+    Fragments are contiguous in the single-file remux, so the chunk is one
+    byte range. A window with no fragment start (GOP longer than
+    CHUNK_SECONDS) repeats the fragment covering it; the player replaces
+    the overlapping frames.
+    """
+    window_start, window_end = n * CHUNK_SECONDS, (n + 1) * CHUNK_SECONDS
+    t = 0.0
+    first = last = covering = None
+    for duration, byterange in fragments:
+        if window_start <= t < window_end:
+            first = first or byterange
+            last = byterange
+        elif t < window_start:
+            covering = byterange
+        t += duration
+    if first is None:
+        if covering is None or t <= window_start:
+            return None
+        first = last = covering
+    start = _byterange(first)
+    end = _byterange(last)
+    if start is None or end is None:
+        return None
+    return start[0], end[0] + end[1] - start[0]
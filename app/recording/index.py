@@ -0,0 +1,349 @@
+"""SQLite index of recording segments for fast time-range queries."""
+
+import base64
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from ..config import load_config, BASE_DIR
+from .segments import Segment, segment_start
+
+logger = logging.getLogger(__name__)
+
+INDEX_PATH = BASE_DIR / "data" / "segments.db"
+MAX_PAGE = 500
+GAP_TOLERANCE = 2.0  # seconds between segments that still count as continuous
+
+
+def encode_cursor(start: float, path: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([start, path]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[float, str]:
+    try:
+        start, path = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(start), str(path)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def day_bounds(date: str) -> tuple[float, float]:
+    """Local midnight to midnight of a YYYY-MM-DD day, as timestamps."""
+    day = datetime.strptime(date, "%Y-%m-%d")
+    return day.timestamp(), (day + timedelta(days=1)).timestamp()
+
+
+def merge_intervals(intervals: list[list[float]]) -> list[list[float]]:
+    """Sort and merge [start, end] intervals closer than GAP_TOLERANCE."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + GAP_TOLERANCE:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def find_gaps(intervals: list[list[float]], start: float, end: float) -> list[list[float]]:
+    """The parts of [start, end] not covered by the (merged) intervals."""
+    gaps = []
+    cursor = start
+    for s, e in intervals:
+        if s - cursor > GAP_TOLERANCE:
+            gaps.append([cursor, min(s, end)])
+        cursor = max(cursor, e)
+        if cursor >= end:
+            break
+    if end - cursor > GAP_TOLERANCE:
+        gaps.append([cursor, end])
+    return gaps
+
+
+class SegmentIndex:
+    """Start, duration and size of every segment, local or archived.
+
+    Paths are relative to the recordings folder ("2024-01-31/camera-1/rec_...").
+    Finished segments are added as the SegmentTracker reports them; sync()
+    reconciles with the disk, rescanning only camera folders whose mtime
+    changed, so it stays cheap on months of footage. Segments deleted
+    locally but still in the cloud manifest are kept as archived.
+
+    Per-camera daily coverage is cached: new segments are merged into the
+    cached intervals, and a rescan of a folder drops its days from the cache.
+    """
+
+    def __init__(self, path: Path = INDEX_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._manifest_imported = False
+        self._coverage: dict[tuple[str, str], list[list[float]]] = {}  # (camera, date) -> intervals
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS segments (
+                path TEXT PRIMARY KEY,
+                camera_id TEXT NOT NULL,
+                date TEXT NOT NULL,
+                start REAL NOT NULL,
+                duration REAL NOT NULL,
+                size INTEGER NOT NULL,
+                archived INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS dirs (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS segments_start ON segments (start, path)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS segments_camera ON segments (camera_id, start)")
+        self._db.commit()
+
+    def add(self, segment: Segment):
+        """Record a finished segment (SegmentTracker subscriber)."""
+        if segment.start is None:
+            return
+        rel_path = f"{segment.date}/{segment.camera_id}/{segment.path.name}"
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO segments VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (rel_path, segment.camera_id, segment.date, segment.start.timestamp(),
+                 segment.duration, segment.size),
+            )
+            self._db.commit()
+            start = segment.start.timestamp()
+            end = start + segment.duration
+            for (camera_id, date), intervals in self._coverage.items():
+                if camera_id != segment.camera_id:
+                    continue
+                day_start, day_end = day_bounds(date)
+                if start < day_end and end > day_start:
+                    intervals.append([max(start, day_start), min(end, day_end)])
+                    intervals[:] = merge_intervals(intervals)
+
+    # ─── Reconciliation ───────────────────────────────────────────────
+
+    def sync(self, manifest=None):
+        """Bring the index in line with the recordings folder."""
+        config = load_config()
+        rec_path = BASE_DIR / config.recording.recordings_path
+        segment_duration = config.recording.segment_duration
+        with self._sync_lock:
+            with self._lock:
+                known = dict(self._db.execute("SELECT path, mtime_ns FROM dirs"))
+            seen = set()
+            changed = 0
+            for day in _subdirs(rec_path):
+                if len(day.name) != 10:
+                    continue
+                for cam in _subdirs(Path(day.path)):
+                    key = f"{day.name}/{cam.name}"
+                    seen.add(key)
+                    mtime_ns = cam.stat().st_mtime_ns
+                    if known.get(key) != mtime_ns:
+                        self._sync_dir(key, Path(cam.path), mtime_ns, segment_duration, manifest)
+                        changed += 1
+            for key in known.keys() - seen:
+                self._drop_dir(key, manifest)
+                changed += 1
+            if manifest is not None and not self._manifest_imported:
+                self._import_manifest(manifest, segment_duration)
+                self._manifest_imported = True
+        if changed:
+            logger.debug(f"Segment index: rescanned {changed} camera folders")
+
+    def _sync_dir(self, key: str, directory: Path, mtime_ns: int, segment_duration: int, manifest):
+        date, camera_id = key.split("/")
+        local = {}
+        for entry in os.scandir(directory):
+            if entry.name.endswith(".mp4") and entry.is_file():
+                try:
+                    local[entry.name] = entry.stat()
+                except OSError:
+                    continue
+        with self._lock:
+            indexed = {
+                row[0].rsplit("/", 1)[-1]: (row[1], row[2])
+                for row in self._db.execute(
+                    "SELECT path, size, archived FROM segments WHERE date = ? AND camera_id = ?",
+                    (date, camera_id),
+                )
+            }
+        rows = []
+        for name, st in local.items():
+            if indexed.get(name) == (st.st_size, 0):
+                continue
+            path = directory / name
+            start = segment_start(path)
+            if start is None:
+                continue
+            # Unknown duration: the file was last written when it was closed
+            duration = st.st_mtime - start.timestamp()
+            if not 0 < duration <= segment_duration * 2:
+                duration = segment_duration
+            rows.append((f"{key}/{name}", camera_id, date, start.timestamp(), duration, st.st_size))
+        gone = [f"{key}/{name}" for name in indexed.keys() - local.keys() if not indexed[name][1]]
+        self._write(rows, gone, manifest)
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?)", (key, mtime_ns))
+            self._db.commit()
+
+    def _drop_dir(self, key: str, manifest):
+        date, camera_id = key.split("/")
+        with self._lock:
+            gone = [r[0] for r in self._db.execute(
+                "SELECT path FROM segments WHERE date = ? AND camera_id = ? AND archived = 0",
+                (date, camera_id),
+            )]
+        self._write([], gone, manifest)
+        with self._lock:
+            self._db.execute("DELETE FROM dirs WHERE path = ?", (key,))
+            self._db.commit()
+
+    def _write(self, rows: list[tuple], gone: list[str], manifest):
+        """Insert local segments; mark vanished ones archived or drop them."""
+        archived = {p for p in gone if manifest is not None and manifest.get(p)}
+        deleted = [p for p in gone if p not in archived]
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO segments VALUES (?, ?, ?, ?, ?, ?, 0)", rows)
+            self._db.executemany("UPDATE segments SET archived = 1 WHERE path = ?", [(p,) for p in archived])
+            self._db.executemany("DELETE FROM segments WHERE path = ?", [(p,) for p in deleted])
+            self._db.commit()
+            for path in deleted + [row[0] for row in rows]:
+                self._invalidate(*path.split("/")[:2])
+
+    def remove_archived(self, date: str):
+        """Drop a day's cloud-only segments once cloud retention purged them
+        (CloudSyncManager prune subscriber)."""
+        with self._lock:
+            cameras = [r[0] for r in self._db.execute(
+                "SELECT DISTINCT camera_id FROM segments WHERE date = ? AND archived = 1", (date,),
+            )]
+            removed = self._db.execute("DELETE FROM segments WHERE date = ? AND archived = 1", (date,)).rowcount
+            self._db.commit()
+            for camera_id in cameras:
+                self._invalidate(date, camera_id)
+        if removed:
+            logger.debug(f"Segment index: dropped {removed} archived segments of {date}")
+
+    def _invalidate(self, date: str, camera_id: str):
+        """Drop cached coverage of a day, and of the next (segments cross midnight)."""
+        self._coverage.pop((camera_id, date), None)
+        next_day = (datetime.strptime(date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        self._coverage.pop((camera_id, next_day), None)
+
+    def _import_manifest(self, manifest, segment_duration: int):
+        """Add cloud-only segments uploaded before the index existed."""
+        rows = []
+        for rel_path, size in manifest.uploaded_sizes().items():
+            parts = rel_path.split("/")
+            if len(parts) != 3:
+                continue  # proxies
+            start = segment_start(Path(rel_path))
+            if start is None:
+                continue
+            rows.append((rel_path, parts[1], parts[0], start.timestamp(), segment_duration, size))
+        with self._lock:
+            self._db.executemany("INSERT OR IGNORE INTO segments VALUES (?, ?, ?, ?, ?, ?, 1)", rows)
+            self._db.commit()
+            self._coverage.clear()
+
+    # ─── Queries ──────────────────────────────────────────────────────
+
+    def query(self, cameras: list[str] | None = None, start: float | None = None,
+              end: float | None = None, min_duration: float = 0, cursor: str | None = None,
+              limit: int = 100, descending: bool = False) -> dict:
+        """Segments overlapping [start, end), in time order, one page at a time.
+
+        Pages are keyed on (start, path), so a cursor stays valid while new
+        segments are added. "total" is only counted for the first page.
+        """
+        where, params = [], []
+        if cameras:
+            where.append(f"camera_id IN ({','.join('?' * len(cameras))})")
+            params += cameras
+        if start is not None:
+            where.append("start + duration > ?")
+            params.append(start)
+        if end is not None:
+            where.append("start < ?")
+            params.append(end)
+        if min_duration:
+            where.append("duration >= ?")
+            params.append(min_duration)
+        filters = list(where), list(params)
+        if cursor:
+            where.append("(start, path) < (?, ?)" if descending else "(start, path) > (?, ?)")
+            params += decode_cursor(cursor)
+
+        limit = max(1, min(limit, MAX_PAGE))
+        order = "DESC" if descending else "ASC"
+        sql = "SELECT path, camera_id, date, start, duration, size, archived FROM segments"
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+        with self._lock:
+            rows = self._db.execute(
+                f"{sql}{clause} ORDER BY start {order}, path {order} LIMIT ?", (*params, limit + 1),
+            ).fetchall()
+            total = None
+            if not cursor:
+                count_clause = f" WHERE {' AND '.join(filters[0])}" if filters[0] else ""
+                total = self._db.execute(f"SELECT COUNT(*) FROM segments{count_clause}", filters[1]).fetchone()[0]
+
+        items = [
+            {"path": r[0], "camera_id": r[1], "date": r[2], "start": r[3],
+             "duration": round(r[4], 1), "size": r[5], "archived": bool(r[6])}
+            for r in rows[:limit]
+        ]
+        next_cursor = encode_cursor(rows[limit - 1][3], rows[limit - 1][0]) if len(rows) > limit else None
+        return {"items": items, "next_cursor": next_cursor, "total": total}
+
+    def get(self, path: str) -> dict | None:
+        """One segment by its path relative to the recordings folder."""
+        with self._lock:
+            r = self._db.execute(
+                "SELECT path, camera_id, date, start, duration, size, archived FROM segments WHERE path = ?",
+                (path,),
+            ).fetchone()
+        if r is None:
+            return None
+        return {"path": r[0], "camera_id": r[1], "date": r[2], "start": r[3],
+                "duration": round(r[4], 1), "size": r[5], "archived": bool(r[6])}
+
+
+    def cameras_on(self, date: str) -> list[str]:
+        """Cameras with footage overlapping a day."""
+        day_start, day_end = day_bounds(date)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT DISTINCT camera_id FROM segments "
+                "WHERE start < ? AND start > ? AND start + duration > ? ORDER BY camera_id",
+                (day_end, day_start - 86400, day_start),
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def coverage(self, camera_id: str, date: str) -> list[list[float]]:
+        """Merged [start, end] intervals recorded by a camera on a day."""
+        key = (camera_id, date)
+        with self._lock:
+            intervals = self._coverage.get(key)
+            if intervals is None:
+                day_start, day_end = day_bounds(date)
+                rows = self._db.execute(
+                    "SELECT start, start + duration FROM segments "
+                    "WHERE camera_id = ? AND start < ? AND start > ? AND start + duration > ?",
+                    (camera_id, day_end, day_start - 86400, day_start),
+                ).fetchall()
+                intervals = merge_intervals([[max(s, day_start), min(e, day_end)] for s, e in rows])
+                self._coverage[key] = intervals
+            return [list(i) for i in intervals]
+
+
+def _subdirs(path: Path) -> list[os.DirEntry]:
+    try:
+        return sorted((e for e in os.scandir(path) if e.is_dir()), key=lambda e: e.name)
+    except FileNotFoundError:
+        return []
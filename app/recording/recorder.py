@@ -4,23 +4,56 @@ import subprocess
 import sys
 import os
 import logging
+import threading
 import time
+from collections import deque
 from pathlib import Path
 from datetime import datetime
-from ..models import CameraModel, CameraStatus
+from ..models import CameraModel, CameraStatus, RecordingFormat
 from ..cameras.rtsp import build_rtsp_url_from_camera
 from ..config import load_config, update_camera, BASE_DIR
+from ..events import publish
+from .segments import SegmentTracker, remove_stale_lists
 
 logger = logging.getLogger(__name__)
 
+# mp4 muxer options per recording format. The segment muxer only hands
+# them on through -segment_format_options; a plain -movflags never reaches it.
+SEGMENT_FORMAT_OPTIONS = {
+    # moov up front, then a moof+mdat fragment per keyframe, each flushed to
+    # disk as it completes: the open segment is playable up to its last
+    # fragment (even after a crash) and nothing is rewritten when it closes
+    RecordingFormat.FMP4: "movflags=+frag_keyframe+empty_moov+default_base_moof:flush_packets=1",
+    # moov written at the end, then moved to the front (a second full write)
+    RecordingFormat.MP4: "movflags=+faststart",
+}
+
 
 class RecorderManager:
     """Manages one FFmpeg process per camera."""
 
-    def __init__(self):
+    def __init__(self, prober=None):
         self._processes: dict[str, subprocess.Popen] = {}
         self._start_times: dict[str, float] = {}
         self._fail_counts: dict[str, int] = {}
+        self._output_dirs: dict[str, Path] = {}
+        # camera -> last time ffmpeg reported progress or the segment grew
+        self._activity: dict[str, float] = {}
+        self._sizes: dict[str, tuple[str, int]] = {}  # camera -> (current segment, size)
+        self._written: dict[str, int] = {}  # camera -> bytes seen written since startup
+        self._sample_lock = threading.Lock()
+        self._restarts = 0
+        self._stderr: dict[str, deque] = {}  # camera -> last ffmpeg messages
+        self._stalls: dict[str, int] = {}
+        self._prober = prober  # CameraProber, used to skip cameras known to be down
+        # The watchdog's recorder and day_rollover jobs and the API all start
+        # and stop recorders; unserialized they could spawn two ffmpeg for a camera
+        self._lock = threading.RLock()
+        removed = remove_stale_lists(BASE_DIR / load_config().recording.recordings_path)
+        if removed:
+            logger.info(f"Removed {removed} stale segment lists")
+        self.segments = SegmentTracker()
+        self.segments.start()
 
     def _get_output_path(self, camera_id: str) -> Path:
         config = load_config()
@@ -31,100 +64,173 @@ class RecorderManager:
 
     def start_camera(self, camera: CameraModel):
         """Start recording for a camera."""
-        if camera.id in self._processes:
-            proc = self._processes[camera.id]
-            if proc.poll() is None:
-                logger.info(f"Camera {camera.id} already recording.")
-                return
-
-        # For H.265 cameras being transcoded, record from MediaMTX (already H.264)
-        needs_transcode = (
-            camera.codec == "h265"
-            or camera.brand in ("icsee", "xmeye")
-        )
-
-        if needs_transcode:
-            # Record the transcoded H.264 stream from MediaMTX
-            rtsp_url = f"rtsp://127.0.0.1:8554/{camera.id}"
-        else:
-            rtsp_url = build_rtsp_url_from_camera(camera)
-
-        output_dir = self._get_output_path(camera.id)
-        config = load_config()
-        segment_time = config.recording.segment_duration
-
-        output_pattern = str(output_dir / "rec_%H-%M-%S.mp4")
-
-        # Use local ffmpeg binary
-        ffmpeg_exe = str(BASE_DIR / "tools" / "ffmpeg" / "ffmpeg.exe")
-        if not Path(ffmpeg_exe).exists():
-            ffmpeg_exe = "ffmpeg"  # Fallback to PATH
-
-        cmd = [
-            ffmpeg_exe,
-            "-hide_banner",
-            "-loglevel", "warning",
-            "-rtsp_transport", "tcp",
-            "-timeout", "5000000",
-            "-i", rtsp_url,
-            "-c", "copy",
-            "-f", "segment",
-            "-segment_time", str(segment_time),
-            "-segment_format", "mp4",
-            "-strftime", "1",
-            "-reset_timestamps", "1",
-            "-movflags", "+faststart",
-            output_pattern,
-        ]
-
-        creationflags = 0
-        if sys.platform == "win32":
-            creationflags = subprocess.CREATE_NO_WINDOW
-
-        try:
-            proc = subprocess.Popen(
-                cmd,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.PIPE,
-                creationflags=creationflags,
+        with self._lock:
+            if camera.id in self._processes:
+                proc = self._processes[camera.id]
+                if proc.poll() is None:
+                    logger.info(f"Camera {camera.id} already recording.")
+                    return
+
+            # For H.265 cameras being transcoded, record from MediaMTX (already H.264)
+            needs_transcode = (
+                camera.codec == "h265"
+                or camera.brand in ("icsee", "xmeye")
             )
-            self._processes[camera.id] = proc
-            self._start_times[camera.id] = time.time()
-            self._fail_counts[camera.id] = 0
 
-            # Update status
-            config = load_config()
-            update_camera(config, camera.id, {"status": CameraStatus.RECORDING.value})
+            if needs_transcode:
+                # Record the transcoded H.264 stream from MediaMTX
+                rtsp_url = f"rtsp://127.0.0.1:8554/{camera.id}"
+            else:
+                rtsp_url = build_rtsp_url_from_camera(camera)
 
-            logger.info(f"Recording started: {camera.name} ({camera.id}) -> {output_dir}")
-        except FileNotFoundError:
-            logger.error("FFmpeg not found. Install FFmpeg and add to PATH.")
-            config = load_config()
-            update_camera(config, camera.id, {"status": CameraStatus.ERROR.value})
-        except Exception as e:
-            logger.error(f"Failed to start recording for {camera.id}: {e}")
+            output_dir = self._get_output_path(camera.id)
             config = load_config()
-            update_camera(config, camera.id, {"status": CameraStatus.ERROR.value})
+            segment_time = config.recording.segment_duration
+
+            output_pattern = str(output_dir / "rec_%H-%M-%S.mp4")
+            # ffmpeg truncates the list on open, so each process gets its own
+            segment_list = output_dir / f".segments-{int(time.time())}.csv"
+
+            # Use local ffmpeg binary
+            ffmpeg_exe = str(BASE_DIR / "tools" / "ffmpeg" / "ffmpeg.exe")
+            if not Path(ffmpeg_exe).exists():
+                ffmpeg_exe = "ffmpeg"  # Fallback to PATH
+
+            cmd = [
+                ffmpeg_exe,
+                "-hide_banner",
+                "-loglevel", "warning",
+                "-nostats",
+                "-progress", "pipe:1",  # key=value progress blocks, about one per second
+                "-rtsp_transport", "tcp",
+                "-timeout", "5000000",
+                "-i", rtsp_url,
+                "-c", "copy",
+                "-f", "segment",
+                "-segment_time", str(segment_time),
+                "-segment_format", "mp4",
+                "-strftime", "1",
+                "-reset_timestamps", "1",
+                "-segment_format_options", SEGMENT_FORMAT_OPTIONS[config.recording.format],
+                "-segment_list", str(segment_list),
+                "-segment_list_type", "csv",
+                output_pattern,
+            ]
+
+            creationflags = 0
+            if sys.platform == "win32":
+                creationflags = subprocess.CREATE_NO_WINDOW
+
+            try:
+                proc = subprocess.Popen(
+                    cmd,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    creationflags=creationflags,
+                )
+                self._processes[camera.id] = proc
+                self._start_times[camera.id] = time.time()
+                self._fail_counts[camera.id] = 0
+                self._output_dirs[camera.id] = output_dir
+                self._activity[camera.id] = time.time()
+                self._stderr[camera.id] = deque(maxlen=20)
+                threading.Thread(target=self._read_progress, args=(camera.id, proc), daemon=True).start()
+                threading.Thread(target=self._read_stderr, args=(camera.id, proc), daemon=True).start()
+                self.segments.watch(camera.id, segment_list)
+
+                # Update status
+                config = load_config()
+                update_camera(config, camera.id, {"status": CameraStatus.RECORDING.value})
+
+                logger.info(f"Recording started: {camera.name} ({camera.id}) -> {output_dir}")
+            except FileNotFoundError:
+                logger.error("FFmpeg not found. Install FFmpeg and add to PATH.")
+                config = load_config()
+                update_camera(config, camera.id, {"status": CameraStatus.ERROR.value})
+            except Exception as e:
+                logger.error(f"Failed to start recording for {camera.id}: {e}")
+                config = load_config()
+                update_camera(config, camera.id, {"status": CameraStatus.ERROR.value})
+
+    def _read_progress(self, camera_id: str, proc: subprocess.Popen):
+        """Follow ffmpeg's -progress output; advancing out_time means data is flowing."""
+        last_out_time = None
+        for raw in iter(proc.stdout.readline, b""):
+            key, _, value = raw.decode(errors="replace").strip().partition("=")
+            if key == "out_time_us" and value != last_out_time and value != "N/A":
+                last_out_time = value
+                if self._processes.get(camera_id) is proc:
+                    self._activity[camera_id] = time.time()
+
+    def _read_stderr(self, camera_id: str, proc: subprocess.Popen):
+        """Drain ffmpeg's stderr (a full pipe would block it) keeping the last lines."""
+        lines = self._stderr[camera_id]
+        for raw in iter(proc.stderr.readline, b""):
+            line = raw.decode(errors="replace").strip()
+            if line:
+                lines.append(line)
+
+    def _last_activity(self, camera_id: str) -> float:
+        """Latest progress report, also sampling the size of the newest segment."""
+        output_dir = self._output_dirs.get(camera_id)
+        if output_dir is not None:
+            try:
+                newest = max(
+                    (e for e in os.scandir(output_dir) if e.name.endswith(".mp4")),
+                    key=lambda e: e.name,
+                    default=None,
+                )
+                if newest is not None:
+                    sample = (newest.name, newest.stat().st_size)
+                    with self._sample_lock:
+                        prev = self._sizes.get(camera_id)
+                        if prev != sample:
+                            grown = sample[1] - prev[1] if prev and prev[0] == sample[0] else sample[1]
+                            self._written[camera_id] = self._written.get(camera_id, 0) + max(grown, 0)
+                            self._sizes[camera_id] = sample
+                            self._activity[camera_id] = time.time()
+            except OSError:
+                pass
+        return self._activity.get(camera_id, 0)
+
+    def _is_stalled(self, camera_id: str, timeout: int) -> bool:
+        return bool(timeout) and time.time() - self._last_activity(camera_id) > timeout
+
+    def bytes_written(self) -> dict[str, int]:
+        """Bytes written per recording camera since startup (sampled now)."""
+        for camera_id in list(self._output_dirs):
+            self._last_activity(camera_id)
+        with self._sample_lock:
+            return dict(self._written)
+
+    def restart_count(self) -> int:
+        """Recorder restarts (crashes and stalls) since startup."""
+        return self._restarts
 
     def stop_camera(self, camera_id: str):
         """Stop recording for a camera."""
-        proc = self._processes.pop(camera_id, None)
-        self._start_times.pop(camera_id, None)
-        if proc and proc.poll() is None:
-            proc.terminate()
-            try:
-                proc.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                proc.kill()
-            logger.info(f"Recording stopped: {camera_id}")
+        with self._lock:
+            proc = self._processes.pop(camera_id, None)
+            self._start_times.pop(camera_id, None)
+            self._output_dirs.pop(camera_id, None)
+            if proc and proc.poll() is None:
+                proc.terminate()
+                try:
+                    proc.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                logger.info(f"Recording stopped: {camera_id}")
+            self.segments.unwatch(camera_id)
 
-        config = load_config()
-        update_camera(config, camera_id, {"status": CameraStatus.OFFLINE.value})
+            config = load_config()
+            update_camera(config, camera_id, {"status": CameraStatus.OFFLINE.value})
 
     def stop_all(self):
         """Stop all recordings."""
-        for cam_id in list(self._processes.keys()):
-            self.stop_camera(cam_id)
+        with self._lock:
+            for cam_id in list(self._processes.keys()):
+                self.stop_camera(cam_id)
+            self.segments.stop()
 
     def is_recording(self, camera_id: str) -> bool:
         """Check if a camera is recording."""
@@ -140,35 +246,68 @@ class RecorderManager:
                 "recording": alive,
                 "pid": proc.pid if alive else None,
                 "uptime": time.time() - self._start_times.get(cam_id, time.time()),
+                "idle": round(time.time() - self._activity.get(cam_id, time.time())),
+                "stalls": self._stalls.get(cam_id, 0),
+                "last_error": self._stderr[cam_id][-1] if self._stderr.get(cam_id) else None,
             }
         return status
 
     def check_and_restart(self):
         """Check for dead processes and restart them. Called by watchdog."""
-        config = load_config()
-        for camera in config.cameras:
-            if not camera.enabled:
-                continue
-
-            proc = self._processes.get(camera.id)
-            if proc is None or proc.poll() is not None:
-                # Process died or never started
-                fail_count = self._fail_counts.get(camera.id, 0)
-                # Exponential backoff: 5, 10, 30, 60, 300 seconds
-                backoffs = [5, 10, 30, 60, 300]
-                backoff = backoffs[min(fail_count, len(backoffs) - 1)]
-                last_start = self._start_times.get(camera.id, 0)
-
-                if time.time() - last_start >= backoff:
-                    self._fail_counts[camera.id] = fail_count + 1
-                    logger.warning(f"Restarting recording for {camera.id} (attempt {fail_count + 1})")
-                    self.start_camera(camera)
+        with self._lock:
+            config = load_config()
+            for camera in config.cameras:
+                if not camera.enabled:
+                    continue
+
+                proc = self._processes.get(camera.id)
+                if proc is not None and proc.poll() is None and self._is_stalled(camera.id, config.recording.stall_timeout):
+                    # ffmpeg alive but nothing written: frozen camera or stalled RTSP
+                    logger.warning(
+                        f"Recording for {camera.id} stalled (no data for {config.recording.stall_timeout}s), restarting"
+                    )
+                    self._stalls[camera.id] = self._stalls.get(camera.id, 0) + 1
+                    publish("recorder", {"camera_id": camera.id, "event": "stalled"},
+                            key=f"recorder:{camera.id}:stalled", retain=False)
+                    proc.kill()
+                    proc.wait()
+
+                if proc is None or proc.poll() is not None:
+
+                    # Don't respawn ffmpeg against a camera the prober says is down;
+                    # start over from the shortest backoff once it answers again
+                    if self._prober and self._prober.is_down(camera.id):
+                        self._fail_counts[camera.id] = 0
+                        if camera.status != CameraStatus.OFFLINE:
+                            update_camera(config, camera.id, {"status": CameraStatus.OFFLINE.value})
+                        continue
+
+                    # Process died or never started
+                    fail_count = self._fail_counts.get(camera.id, 0)
+                    # Exponential backoff: 5, 10, 30, 60, 300 seconds
+                    backoffs = [5, 10, 30, 60, 300]
+                    backoff = backoffs[min(fail_count, len(backoffs) - 1)]
+                    last_start = self._start_times.get(camera.id, 0)
+
+                    if time.time() - last_start >= backoff:
+                        self._fail_counts[camera.id] = fail_count + 1
+                        last_error = self._stderr[camera.id][-1] if self._stderr.get(camera.id) else None
+                        if last_error:
+                            logger.warning(f"Recorder {camera.id} exited: {last_error}")
+                        if proc is not None:
+                            self._restarts += 1
+                            publish("recorder", {"camera_id": camera.id, "event": "restarting",
+                                                 "attempt": fail_count + 1, "error": last_error},
+                                    key=f"recorder:{camera.id}:restarting", retain=False)
+                        logger.warning(f"Restarting recording for {camera.id} (attempt {fail_count + 1})")
+                        self.start_camera(camera)
 
     def day_rollover(self):
         """Restart all recordings for new day folder. Called at midnight."""
-        logger.info("Day rollover: restarting all recordings")
-        config = load_config()
-        for camera in config.cameras:
-            if camera.enabled and self.is_recording(camera.id):
-                self.stop_camera(camera.id)
-                self.start_camera(camera)
+        with self._lock:
+            logger.info("Day rollover: restarting all recordings")
+            config = load_config()
+            for camera in config.cameras:
+                if camera.enabled and self.is_recording(camera.id):
+                    self.stop_camera(camera.id)
+                    self.start_camera(camera)
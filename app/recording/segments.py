@@ -0,0 +1,163 @@
+"""Finalized segment tracking via ffmpeg's segment list."""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 5  # seconds
+LIST_GLOB = ".segments-*.csv"
+
+
+@dataclass
+class Segment:
+    """A recording segment that ffmpeg has finished writing."""
+    camera_id: str
+    path: Path
+    start: datetime | None
+    duration: float
+    size: int
+
+    @property
+    def date(self) -> str:
+        return self.path.parent.parent.name
+
+
+def remove_stale_lists(rec_path: Path) -> int:
+    """Delete segment lists left by recorders that never unwatched (a crash).
+
+    Run before any recorder starts. Segments they still listed are picked
+    up by the index and cloud reconciliation, which scan the folders.
+    """
+    removed = 0
+    for list_path in rec_path.glob(f"*/*/{LIST_GLOB}"):
+        removed += _remove_list(list_path)
+    return removed
+
+
+def _remove_list(list_path: Path) -> bool:
+    try:
+        list_path.unlink(missing_ok=True)
+        return True
+    except OSError as e:  # still open on Windows; the next startup sweep gets it
+        logger.debug(f"Could not delete segment list {list_path}: {e}")
+        return False
+
+
+def segment_start(path: Path) -> datetime | None:
+    """Wall-clock start of a segment from its day folder and rec_%H-%M-%S name."""
+    try:
+        return datetime.strptime(f"{path.parent.parent.name} {path.stem}", "%Y-%m-%d rec_%H-%M-%S")
+    except ValueError:
+        return None
+
+
+class SegmentTracker:
+    """Tails the CSV segment lists written by the recorders.
+
+    ffmpeg appends "filename,start,end" to the list each time it closes a
+    segment, so a new line means the file is complete. Subscribers are called
+    from the tracker thread with a Segment.
+    """
+
+    def __init__(self):
+        self._thread: threading.Thread | None = None
+        self._running = False
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()  # serializes reads so no line is dispatched twice
+        self._lists: dict[str, tuple[Path, int]] = {}  # camera_id -> (list path, offset)
+        self._subscribers: list[Callable[[Segment], None]] = []
+
+    def start(self):
+        """Start tracker thread."""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._poll_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop tracker thread."""
+        self._running = False
+
+    def subscribe(self, callback: Callable[[Segment], None]):
+        """Register a callback for finalized segments."""
+        self._subscribers.append(callback)
+
+    def watch(self, camera_id: str, list_path: Path):
+        """Follow a new segment list for a camera, flushing the previous one."""
+        self.unwatch(camera_id)
+        with self._lock:
+            self._lists[camera_id] = (list_path, 0)
+
+    def unwatch(self, camera_id: str):
+        """Read what is left of a camera's segment list, stop following it
+        and delete it (its ffmpeg has exited)."""
+        with self._read_lock:
+            with self._lock:
+                entry = self._lists.pop(camera_id, None)
+            if entry:
+                self._read_new(camera_id, *entry)
+                _remove_list(entry[0])
+
+    def poll(self):
+        """Check all segment lists for newly finalized segments."""
+        with self._read_lock:
+            with self._lock:
+                entries = list(self._lists.items())
+            for camera_id, (list_path, offset) in entries:
+                new_offset = self._read_new(camera_id, list_path, offset)
+                with self._lock:
+                    if camera_id in self._lists:
+                        self._lists[camera_id] = (list_path, new_offset)
+
+    def _poll_loop(self):
+        while self._running:
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Segment tracker error: {e}")
+            time.sleep(POLL_INTERVAL)
+
+    def _read_new(self, camera_id: str, list_path: Path, offset: int) -> int:
+        try:
+            with open(list_path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return offset
+
+        # Only consume complete lines; ffmpeg may be mid-write
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].decode(errors="replace").splitlines():
+            segment = self._parse(camera_id, list_path.parent, line)
+            if segment:
+                self._dispatch(segment)
+        return offset + end
+
+    def _parse(self, camera_id: str, directory: Path, line: str) -> Segment | None:
+        try:
+            name, start, end = line.rsplit(",", 2)
+            path = directory / name.strip('"')
+            return Segment(
+                camera_id=camera_id,
+                path=path,
+                start=segment_start(path),
+                duration=max(float(end) - float(start), 0.0),
+                size=path.stat().st_size,
+            )
+        except (ValueError, OSError) as e:
+            logger.debug(f"Skipping segment list entry {line!r}: {e}")
+            return None
+
+    def _dispatch(self, segment: Segment):
+        for callback in self._subscribers:
+            try:
+                callback(segment)
+            except Exception as e:
+                logger.error(f"Segment subscriber error for {segment.path.name}: {e}")
@@ -8,6 +8,8 @@ from ..config import load_config, BASE_DIR
 
 logger = logging.getLogger(__name__)
 
+CRITICAL_FREE_GB = 1.0  # below this, even un-uploaded footage is deleted
+
 
 def get_recordings_path() -> Path:
     config = load_config()
@@ -25,8 +27,70 @@ def get_recordings_size_bytes() -> int:
     return total
 
 
-def cleanup_old_recordings():
-    """Delete recordings older than retention_days."""
+def _offload_active(config, manifest) -> bool:
+    return config.recording.offload_uploaded and config.cloud.enabled and manifest is not None
+
+
+def _uploaded_segments(config, manifest, rec_path: Path) -> list[Path]:
+    """Local segments whose full-resolution copy is in the cloud, oldest first."""
+    from ..models import ProxyMode
+
+    # Cameras uploading only a proxy have no full copy in the cloud
+    proxy_only = {
+        cam_id for cam_id, mode in config.cloud.proxy_cameras.items()
+        if mode == ProxyMode.REPLACE
+    }
+    segments = []
+    for rel_path, size in manifest.uploaded_sizes().items():
+        parts = rel_path.split("/")
+        if len(parts) != 3 or parts[1] in proxy_only:
+            continue
+        path = rec_path / rel_path
+        try:
+            if path.stat().st_size == size:
+                segments.append(path)
+        except OSError:
+            continue
+    segments.sort(key=lambda p: (p.parent.parent.name, p.name))
+    return segments
+
+
+def _never_uploaded(config, path: Path) -> bool:
+    """Segments the cloud will never hold a full copy of: cameras uploading
+    only a proxy, and footage outside cloud.sync_rules."""
+    from ..cloud.schedule import matches_sync_rules
+    from ..models import ProxyMode
+    from .segments import segment_start
+
+    camera_id = path.parent.name
+    if config.cloud.proxy_cameras.get(camera_id) == ProxyMode.REPLACE:
+        return True
+    return not matches_sync_rules(config.cloud, camera_id, segment_start(path),
+                                  config.recording.segment_duration)
+
+
+def _delete_uploaded_in(day_dir: Path, uploaded: set[Path], config) -> int:
+    """Delete the segments of a day folder that are in the cloud or never
+    will be, and the folder if empty."""
+    deleted = 0
+    for path in sorted(day_dir.rglob("*.mp4")):
+        segment = path.parent.parent == day_dir  # not a pending proxy in .proxy/
+        if path in uploaded or (segment and _never_uploaded(config, path)):
+            path.unlink(missing_ok=True)
+            deleted += 1
+    if not any(day_dir.rglob("*.mp4")):
+        shutil.rmtree(day_dir, ignore_errors=True)
+    return deleted
+
+
+def cleanup_old_recordings(manifest=None):
+    """Delete recordings older than retention_days.
+
+    In offload mode (recording.offload_uploaded) segments are only deleted
+    once confirmed in the cloud; un-uploaded ones are kept until they are
+    synced, unless the sync rules or a proxy-only camera mean they never
+    will be.
+    """
     config = load_config()
     rec_path = get_recordings_path()
     if not rec_path.exists():
@@ -36,8 +100,17 @@ def cleanup_old_recordings():
     cutoff_str = cutoff.strftime("%Y-%m-%d")
     deleted = 0
 
+    offload = _offload_active(config, manifest)
+    uploaded = set(_uploaded_segments(config, manifest, rec_path)) if offload else set()
+
     for day_dir in sorted(rec_path.iterdir()):
         if day_dir.is_dir() and day_dir.name < cutoff_str:
+            if offload:
+                count = _delete_uploaded_in(day_dir, uploaded, config)
+                if count:
+                    deleted += 1
+                    logger.info(f"Deleted {count} old recordings from {day_dir.name} (uploaded or not synced)")
+                continue
             try:
                 shutil.rmtree(day_dir)
                 deleted += 1
@@ -49,8 +122,13 @@ def cleanup_old_recordings():
         logger.info(f"Cleanup: deleted {deleted} old day folders")
 
 
-def cleanup_if_disk_low(min_free_gb: float = 5.0):
-    """Delete oldest recordings if disk space is low."""
+def cleanup_if_disk_low(min_free_gb: float = 5.0, manifest=None):
+    """Delete oldest recordings if disk space is low.
+
+    In offload mode, segments already in the cloud are evicted first and
+    un-uploaded ones are only touched below CRITICAL_FREE_GB, so recording
+    never stops for lack of space.
+    """
     import psutil
     rec_path = get_recordings_path()
     if not rec_path.exists():
@@ -64,6 +142,26 @@ def cleanup_if_disk_low(min_free_gb: float = 5.0):
 
     logger.warning(f"Disk space low: {free_gb:.1f} GB free. Cleaning up...")
 
+    config = load_config()
+    if _offload_active(config, manifest):
+        evicted = 0
+        for path in _uploaded_segments(config, manifest, rec_path):
+            if free_gb >= min_free_gb:
+                break
+            try:
+                size = path.stat().st_size
+                path.unlink()
+                free_gb += size / (1024**3)
+                evicted += 1
+            except OSError as e:
+                logger.error(f"Failed to delete {path}: {e}")
+        if evicted:
+            logger.info(f"Offload cleanup: evicted {evicted} uploaded segments ({free_gb:.1f} GB free)")
+        if free_gb >= CRITICAL_FREE_GB:
+            return
+        logger.error(f"Disk critically low ({free_gb:.1f} GB): deleting un-uploaded recordings")
+        min_free_gb = CRITICAL_FREE_GB
+
     # Delete oldest day folders first
     day_dirs = sorted(d for d in rec_path.iterdir() if d.is_dir())
     for day_dir in day_dirs:
@@ -0,0 +1,183 @@
+"""Keyframe thumbnail sprite sheets with a WebVTT index, for scrubbing recordings."""
+
+import logging
+import math
+import os
+import re
+import subprocess
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from ..config import load_config, BASE_DIR
+from .segments import Segment
+
+logger = logging.getLogger(__name__)
+
+THUMB_DIR = ".thumbs"  # inside each day/camera folder, so retention removes them with the footage
+INTERVAL = 10  # seconds of footage per thumbnail
+MAX_THUMBS = 720  # per segment; longer segments get a thumbnail every duration/MAX_THUMBS
+WIDTH, HEIGHT = 160, 90
+COLUMNS = 10
+THUMB_WORKERS = 1
+
+_PTS_RE = re.compile(r"Parsed_showinfo.*? pts_time:\s*(-?[\d.]+)")
+
+
+class ThumbnailCache:
+    """One sprite sheet (JPEG grid of WIDTH x HEIGHT tiles) and one WebVTT
+    file per segment, mapping each INTERVAL of footage to its tile.
+
+    ffmpeg decodes only the keyframes (-skip_frame nokey) on a single
+    thread, niced, on a pool of THUMB_WORKERS, so a sheet costs a fraction
+    of playing the segment. Cues follow the timestamps of the keyframes
+    actually picked (showinfo), not the nominal grid. Sheets are made as segments are finalized and
+    on first request for older ones; the oldest footage loses its sheets
+    first once recording.thumbnail_cache_mb is exceeded.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: dict[str, Future] = {}
+        self._pool = ThreadPoolExecutor(max_workers=THUMB_WORKERS, thread_name_prefix="thumbs")
+
+    def add(self, segment: Segment):
+        """Tracker subscriber: queue the sheet of a finalized segment."""
+        if load_config().recording.thumbnail_cache_mb <= 0:
+            return
+        self.prepare(f"{segment.date}/{segment.camera_id}/{segment.path.name}", segment.path, segment.duration)
+
+    def files(self, rel_path: str) -> tuple[Path, Path]:
+        """(WebVTT, sprite sheet) paths of a recording, which may not exist yet."""
+        date, camera_id, name = rel_path.split("/")
+        directory = _recordings_path() / date / camera_id / THUMB_DIR
+        stem = Path(name).stem
+        return directory / f"{stem}.vtt", directory / f"{stem}.jpg"
+
+    def prepare(self, rel_path: str, src: Path, duration: float) -> Future:
+        """Future for the WebVTT path of a recording, made if missing."""
+        vtt, _ = self.files(rel_path)
+        with self._lock:
+            future = self._pending.get(rel_path)
+            if future is not None:
+                return future
+            if vtt.is_file():
+                future = Future()
+                future.set_result(vtt)
+                return future
+            future = self._pool.submit(self._generate, rel_path, src, duration)
+            self._pending[rel_path] = future
+        # Outside the lock: a future that is already done runs the callback here
+        future.add_done_callback(lambda f: self._finished(rel_path, f))
+        return future
+
+    def _finished(self, rel_path: str, future: Future):
+        with self._lock:
+            self._pending.pop(rel_path, None)
+        if isinstance(future.exception(), FileNotFoundError):
+            logger.debug(f"Thumbnails skipped for {rel_path}: footage deleted")
+        elif future.exception() is not None:
+            logger.warning(f"Thumbnails failed for {rel_path}: {future.exception()}")
+
+    def _generate(self, rel_path: str, src: Path, duration: float) -> Path:
+        vtt, sprite = self.files(rel_path)
+        # Not parents=True: footage deleted meanwhile must not get its folders back
+        vtt.parent.mkdir(exist_ok=True)
+        step = max(INTERVAL, duration / MAX_THUMBS)
+        count = max(1, math.ceil(duration / step))
+        rows = math.ceil(count / COLUMNS)
+
+        ffmpeg_exe = str(BASE_DIR / "tools" / "ffmpeg" / "ffmpeg.exe")
+        if not Path(ffmpeg_exe).exists():
+            ffmpeg_exe = "ffmpeg"  # Fallback to PATH
+
+        tmp = sprite.with_name(sprite.stem + ".tmp.jpg")
+        cmd = [
+            ffmpeg_exe,
+            "-hide_banner",
+            "-loglevel", "info",  # showinfo logs each tile's timestamp at info
+            "-nostdin",
+            "-threads", "1",
+            "-skip_frame", "nokey",  # decode keyframes only
+            "-i", str(src),
+            "-map", "0:v:0",
+            "-vf", (
+                # tile i = first keyframe at or after i * step
+                f"select=gte(t\\,selected_n*{step:.3f}),"
+                "showinfo,"
+                f"scale={WIDTH}:{HEIGHT}:force_original_aspect_ratio=decrease,"
+                f"pad={WIDTH}:{HEIGHT}:(ow-iw)/2:(oh-ih)/2,"
+                f"tile={COLUMNS}x{rows}"
+            ),
+            "-fps_mode", "passthrough",
+            "-frames:v", "1",
+            "-q:v", "5",
+            "-y",
+            str(tmp),
+        ]
+
+        kwargs = {}
+        if sys.platform == "win32":
+            kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW | subprocess.BELOW_NORMAL_PRIORITY_CLASS
+        else:
+            kwargs["preexec_fn"] = lambda: os.nice(10)
+
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, **kwargs)
+        stderr = result.stderr.decode(errors="replace")
+        times = [float(t) for t in _PTS_RE.findall(stderr)][:rows * COLUMNS]
+        if result.returncode != 0 or not tmp.is_file() or not times:
+            tmp.unlink(missing_ok=True)
+            errors = [line for line in stderr.splitlines() if "Parsed_showinfo" not in line]
+            raise RuntimeError("\n".join(errors)[-200:] or "no output")
+        os.replace(tmp, sprite)
+
+        # The WebVTT file goes last: its presence means the sheet is complete.
+        # Tile i shows from its keyframe until the next tile's (the first from 0).
+        times[0] = 0.0
+        ends = times[1:] + [duration if duration > times[-1] else times[-1] + step]
+        cues = ["WEBVTT", ""]
+        for i, (start, end) in enumerate(zip(times, ends)):
+            x, y = i % COLUMNS * WIDTH, i // COLUMNS * HEIGHT
+            cues += [
+                f"{_vtt_time(start)} --> {_vtt_time(max(end, start))}",
+                f"{sprite.name}#xywh={x},{y},{WIDTH},{HEIGHT}",
+                "",
+            ]
+        tmp = vtt.with_name(vtt.stem + ".tmp.vtt")
+        tmp.write_text("\n".join(cues))
+        os.replace(tmp, vtt)
+        logger.debug(f"Thumbnails: {rel_path} ({len(times)} tiles)")
+
+        self._evict(load_config().recording.thumbnail_cache_mb * 1024**2, keep=vtt.parent / vtt.stem)
+        return vtt
+
+    def _evict(self, max_bytes: int, keep: Path):
+        """Delete sheets of the oldest footage until the cache fits max_bytes."""
+        sheets = []
+        for directory in _recordings_path().glob(f"*/*/{THUMB_DIR}"):
+            date = directory.parent.parent.name
+            for entry in os.scandir(directory):
+                if entry.name.endswith(".vtt") and ".tmp." not in entry.name:
+                    base = directory / entry.name[:-4]
+                    size = sum(p.stat().st_size for p in (base.with_suffix(".vtt"), base.with_suffix(".jpg"))
+                               if p.exists())
+                    sheets.append(((date, entry.name), size, base))
+        total = sum(size for _, size, _ in sheets)
+        for _, size, base in sorted(sheets):
+            if total <= max_bytes:
+                break
+            if base == keep:
+                continue
+            base.with_suffix(".vtt").unlink(missing_ok=True)
+            base.with_suffix(".jpg").unlink(missing_ok=True)
+            total -= size
+            logger.info(f"Thumbnail cache: evicted {base.relative_to(_recordings_path()).as_posix()}")
+
+
+def _recordings_path() -> Path:
+    return BASE_DIR / load_config().recording.recordings_path
+
+
+def _vtt_time(seconds: float) -> str:
+    ms = round(seconds * 1000)
+    return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d}.{ms % 1000:03d}"
@@ -7,7 +7,6 @@ import sys
 from pathlib import Path
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from .config import load_config, save_config, BASE_DIR
 
@@ -26,6 +25,9 @@ async def lifespan(app: FastAPI):
     config = load_config()
     logger.info("Sentinela starting...")
 
+    from .events import broadcaster
+    broadcaster.attach(asyncio.get_running_loop())
+
     # Ensure directories exist
     (BASE_DIR / config.recording.recordings_path).mkdir(exist_ok=True)
     (BASE_DIR / "logs").mkdir(exist_ok=True)
@@ -42,10 +44,20 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"MediaMTX not available: {e}")
 
+    # Start camera health prober
+    prober = None
+    try:
+        from .cameras.prober import CameraProber
+        prober = CameraProber()
+        prober.start()
+        _app_state["prober"] = prober
+    except Exception as e:
+        logger.warning(f"Camera prober not available: {e}")
+
     # Start recorder AFTER MediaMTX (so transcoded streams are available)
     try:
         from .recording.recorder import RecorderManager
-        recorder = RecorderManager()
+        recorder = RecorderManager(prober=prober)
         _app_state["recorder"] = recorder
 
         # Give transcoders a moment to start publishing
@@ -62,14 +74,45 @@ async def lifespan(app: FastAPI):
     # Start cloud sync
     try:
         from .cloud.sync import CloudSyncManager
-        cloud_sync = CloudSyncManager()
+        cloud_sync = CloudSyncManager(mediamtx=_app_state.get("mediamtx"))
         if config.cloud.enabled:
             cloud_sync.start()
         _app_state["cloud_sync"] = cloud_sync
+        if "recorder" in _app_state:
+            _app_state["recorder"].segments.subscribe(cloud_sync.enqueue_segment)
         logger.info("Cloud sync ready.")
     except Exception as e:
         logger.warning(f"Cloud sync not available: {e}")
 
+    # Recordings index (backfilled by the watchdog's segment_index job)
+    try:
+        from .recording.index import SegmentIndex
+        index = SegmentIndex()
+        _app_state["index"] = index
+        if "recorder" in _app_state:
+            _app_state["recorder"].segments.subscribe(index.add)
+        if "cloud_sync" in _app_state:
+            _app_state["cloud_sync"].subscribe_pruned(index.remove_archived)
+    except Exception as e:
+        logger.warning(f"Recordings index not available: {e}")
+
+    # HLS playback cache
+    try:
+        from .recording.hls import HlsCache
+        _app_state["hls"] = HlsCache()
+    except Exception as e:
+        logger.warning(f"HLS playback not available: {e}")
+
+    # Scrubbing thumbnails, made as segments are finalized
+    try:
+        from .recording.thumbnails import ThumbnailCache
+        thumbnails = ThumbnailCache()
+        _app_state["thumbnails"] = thumbnails
+        if "recorder" in _app_state:
+            _app_state["recorder"].segments.subscribe(thumbnails.add)
+    except Exception as e:
+        logger.warning(f"Thumbnails not available: {e}")
+
     # Start tunnel
     try:
         from .tunnel.cloudflare import TunnelManager
@@ -86,16 +129,45 @@ async def lifespan(app: FastAPI):
         from .watchdog.health import WatchdogManager
         watchdog = WatchdogManager(_app_state)
         watchdog.start()
+        watchdog.trigger("segment_index")
         _app_state["watchdog"] = watchdog
+        if "prober" in _app_state:
+            _app_state["prober"].subscribe(watchdog.on_camera_state)
         logger.info("Watchdog started.")
     except Exception as e:
         logger.warning(f"Watchdog not available: {e}")
 
+    # Start status sampler
+    try:
+        from .watchdog.status import StatusSampler
+        from .web.api_routes import START_TIME
+        status = StatusSampler(_app_state, START_TIME)
+        status.start()
+        _app_state["status"] = status
+    except Exception as e:
+        logger.warning(f"Status sampler not available: {e}")
+
+    # Start metrics history
+    try:
+        from .watchdog.metrics import MetricsCollector
+        metrics = MetricsCollector(_app_state)
+        metrics.start()
+        _app_state["metrics"] = metrics
+        if "status" in _app_state:
+            _app_state["status"].subscribe(metrics.record)
+    except Exception as e:
+        logger.warning(f"Metrics history not available: {e}")
+
     logger.info(f"Sentinela running on http://0.0.0.0:{config.system.web_port}")
     yield
 
     # Shutdown
     logger.info("Sentinela shutting down...")
+    broadcaster.close()
+    if "status" in _app_state:
+        _app_state["status"].stop()
+    if "metrics" in _app_state:
+        _app_state["metrics"].stop()
     if "watchdog" in _app_state:
         _app_state["watchdog"].stop()
     if "tunnel" in _app_state:
@@ -104,21 +176,28 @@ async def lifespan(app: FastAPI):
         _app_state["cloud_sync"].stop()
     if "recorder" in _app_state:
         _app_state["recorder"].stop_all()
+    if "prober" in _app_state:
+        _app_state["prober"].stop()
     if "mediamtx" in _app_state:
         _app_state["mediamtx"].stop()
     logger.info("Sentinela stopped.")
 
 
 def create_app() -> FastAPI:
+    from .web.caching import CachedStaticFiles, CompressionMiddleware, static_url
     app = FastAPI(title="Sentinela", version="1.0.0", lifespan=lifespan)
 
     # Templates
     templates_dir = BASE_DIR / "templates"
     app.state.templates = Jinja2Templates(directory=str(templates_dir))
+    app.state.templates.env.globals["static_url"] = static_url
 
-    # Static files
+    # Static files (content-hashed URLs are cached as immutable)
     static_dir = BASE_DIR / "static"
-    app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
+    app.mount("/static", CachedStaticFiles(directory=str(static_dir)), name="static")
+
+    # gzip/brotli for JSON, HTML, CSS and JS
+    app.add_middleware(CompressionMiddleware)
 
     # Serve recordings for playback
     rec_dir = BASE_DIR / "recordings"
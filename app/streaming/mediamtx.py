@@ -4,12 +4,14 @@ import subprocess
 import sys
 import os
 import logging
+import threading
 import time
 import yaml
 from pathlib import Path
 from ..models import CameraModel
 from ..cameras.rtsp import build_rtsp_url_from_camera
 from ..config import load_config, BASE_DIR
+from ..events import publish
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +28,12 @@ class MediaMTXManager:
         self._process: subprocess.Popen | None = None
         self._cameras: dict[str, CameraModel] = {}
         self._transcoders: dict[str, subprocess.Popen] = {}
+        # API jobs and the watchdog may restart MediaMTX at the same time
+        self._lock = threading.RLock()
+        # WebRTC sessions opened through the /api/whep proxy by remote
+        # clients; MediaMTX only sees the proxy's loopback address for them
+        self._proxied_remote: set[str] = set()
+        self._viewers_lock = threading.Lock()
 
     def _needs_transcode(self, camera: CameraModel) -> bool:
         """Check if camera needs H.265 -> H.264 transcoding."""
@@ -149,53 +157,58 @@ class MediaMTXManager:
 
     def start(self):
         """Start MediaMTX process and all transcoders."""
-        if not MEDIAMTX_EXE.exists():
-            logger.warning(f"MediaMTX not found at {MEDIAMTX_EXE}. Run setup.bat to download.")
-            return
+        with self._lock:
+            if self.is_running():
+                return  # started by someone else while we waited for the lock
+            if not MEDIAMTX_EXE.exists():
+                logger.warning(f"MediaMTX not found at {MEDIAMTX_EXE}. Run setup.bat to download.")
+                return
 
-        self._generate_config()
+            self._generate_config()
 
-        creationflags = 0
-        if sys.platform == "win32":
-            creationflags = subprocess.CREATE_NO_WINDOW
+            creationflags = 0
+            if sys.platform == "win32":
+                creationflags = subprocess.CREATE_NO_WINDOW
 
-        try:
-            self._process = subprocess.Popen(
-                [str(MEDIAMTX_EXE), str(MEDIAMTX_CONFIG)],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.PIPE,
-                cwd=str(MEDIAMTX_DIR),
-                creationflags=creationflags,
-            )
-            logger.info(f"MediaMTX started (PID: {self._process.pid})")
+            try:
+                self._process = subprocess.Popen(
+                    [str(MEDIAMTX_EXE), str(MEDIAMTX_CONFIG)],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                    cwd=str(MEDIAMTX_DIR),
+                    creationflags=creationflags,
+                )
+                logger.info(f"MediaMTX started (PID: {self._process.pid})")
 
-            # Wait for MediaMTX to be ready
-            time.sleep(2)
+                # Wait for MediaMTX to be ready
+                time.sleep(2)
 
-            # Start all transcoders
-            self._start_all_transcoders()
+                # Start all transcoders
+                self._start_all_transcoders()
 
-        except Exception as e:
-            logger.error(f"Failed to start MediaMTX: {e}")
+            except Exception as e:
+                logger.error(f"Failed to start MediaMTX: {e}")
 
     def stop(self):
         """Stop MediaMTX process and all transcoders."""
-        self._stop_all_transcoders()
-
-        if self._process and self._process.poll() is None:
-            self._process.terminate()
-            try:
-                self._process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                self._process.kill()
-            logger.info("MediaMTX stopped.")
-        self._process = None
+        with self._lock:
+            self._stop_all_transcoders()
+
+            if self._process and self._process.poll() is None:
+                self._process.terminate()
+                try:
+                    self._process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    self._process.kill()
+                logger.info("MediaMTX stopped.")
+            self._process = None
 
     def restart(self):
         """Restart MediaMTX with updated config."""
-        self.stop()
-        time.sleep(1)
-        self.start()
+        with self._lock:
+            self.stop()
+            time.sleep(1)
+            self.start()
 
     def is_running(self) -> bool:
         return self._process is not None and self._process.poll() is None
@@ -207,26 +220,88 @@ class MediaMTXManager:
 
     def add_camera(self, camera: CameraModel):
         """Add a single camera and restart if running."""
-        self._cameras[camera.id] = camera
-        if self.is_running():
-            self.restart()
+        with self._lock:
+            self._cameras[camera.id] = camera
+            if self.is_running():
+                self.restart()
 
     def remove_camera(self, camera_id: str):
         """Remove a camera and restart if running."""
-        self._cameras.pop(camera_id, None)
-        self._stop_transcoder(camera_id)
-        if self.is_running():
-            self.restart()
+        with self._lock:
+            self._cameras.pop(camera_id, None)
+            self._stop_transcoder(camera_id)
+            if self.is_running():
+                self.restart()
 
     def check_transcoders(self):
         """Check if any transcoder died and restart it."""
-        for cam_id, camera in self._cameras.items():
-            if not self._needs_transcode(camera):
+        with self._lock:
+            for cam_id, camera in self._cameras.items():
+                if not self._needs_transcode(camera):
+                    continue
+                proc = self._transcoders.get(cam_id)
+                if proc is None or proc.poll() is not None:
+                    logger.warning(f"Transcoder for {cam_id} died, restarting...")
+                    publish("transcoder", {"camera_id": cam_id, "event": "restarting"},
+                            key=f"transcoder:{cam_id}", retain=False)
+                    self._start_transcoder(cam_id, camera)
+
+    def _webrtc_sessions(self) -> list[dict] | None:
+        """MediaMTX's WebRTC sessions, None if the API is unreachable."""
+        import httpx
+
+        if not self.is_running():
+            return None
+        config = load_config()
+        url = f"http://127.0.0.1:{config.system.mediamtx_api_port}/v3/webrtcsessions/list"
+        try:
+            return httpx.get(url, timeout=2.0).json().get("items") or []
+        except Exception as e:
+            logger.debug(f"MediaMTX session list failed: {e}")
+            return None
+
+    def proxied_session_ids(self, path: str) -> set[str]:
+        """IDs of the sessions on a path that come from this machine (the WHEP proxy)."""
+        import ipaddress
+
+        ids = set()
+        for session in self._webrtc_sessions() or []:
+            if session.get("path") != path:
                 continue
-            proc = self._transcoders.get(cam_id)
-            if proc is None or proc.poll() is not None:
-                logger.warning(f"Transcoder for {cam_id} died, restarting...")
-                self._start_transcoder(cam_id, camera)
+            host = session.get("remoteAddr", "").rsplit(":", 1)[0].strip("[]")
+            try:
+                if ipaddress.ip_address(host).is_loopback:
+                    ids.add(session.get("id"))
+            except ValueError:
+                continue
+        return ids
+
+    def add_remote_viewers(self, session_ids: set[str]):
+        """Count proxied sessions as remote until MediaMTX closes them."""
+        with self._viewers_lock:
+            self._proxied_remote |= session_ids
+
+    def count_remote_viewers(self) -> int:
+        """Count WebRTC sessions from outside the local network, direct or
+        through the WHEP proxy."""
+        import ipaddress
+
+        items = self._webrtc_sessions()
+        if items is None:
+            return 0
+
+        live = {session.get("id") for session in items}
+        with self._viewers_lock:
+            self._proxied_remote &= live  # sessions that ended
+            count = len(self._proxied_remote)
+        for session in items:
+            host = session.get("remoteAddr", "").rsplit(":", 1)[0].strip("[]")
+            try:
+                if not ipaddress.ip_address(host).is_private:
+                    count += 1
+            except ValueError:
+                continue
+        return count
 
     def get_webrtc_url(self, camera_id: str, request_host: str = "localhost") -> str:
         """Get WebRTC URL for a camera, adjusted for the requesting host."""
@@ -9,6 +9,7 @@ import threading
 import time
 from pathlib import Path
 from ..config import load_config, save_config, BASE_DIR
+from ..events import publish
 
 logger = logging.getLogger(__name__)
 
@@ -90,6 +91,7 @@ class TunnelManager:
                 if url_match:
                     self.public_url = url_match.group(1)
                     logger.info(f"Tunnel active: {self.public_url}")
+                    self._publish_state()
 
                     # Save URL to config
                     config = load_config()
@@ -102,6 +104,7 @@ class TunnelManager:
                     if url_match and 'trycloudflare' not in line:
                         self.public_url = url_match.group(1)
                         logger.info(f"Tunnel active: {self.public_url}")
+                        self._publish_state()
 
             self._process.wait()
         except Exception as e:
@@ -109,6 +112,7 @@ class TunnelManager:
         finally:
             self._running = False
             self.public_url = None
+            self._publish_state()
 
     def stop(self):
         """Stop cloudflared process."""
@@ -123,6 +127,10 @@ class TunnelManager:
         self.public_url = None
         self.mode = "disabled"
         logger.info("Tunnel stopped.")
+        self._publish_state()
+
+    def _publish_state(self):
+        publish("tunnel", {"active": self.is_running(), "url": self.public_url, "mode": self.mode})
 
     def is_running(self) -> bool:
         return self._running and self._process is not None and self._process.poll() is None
@@ -1,50 +1,62 @@
 """Watchdog - health checks, auto-recovery, and day rollover."""
 
 import logging
-import threading
-import time
 from datetime import datetime
+from .scheduler import JobScheduler
 
 logger = logging.getLogger(__name__)
 
 
 class WatchdogManager:
-    """Monitors all subsystems and auto-recovers on failure."""
+    """Monitors all subsystems and auto-recovers on failure.
+
+    Each check is a scheduler job with its own interval: liveness checks
+    run every few seconds, the disk scans rarely, and a slow scan never
+    holds up crash recovery.
+    """
 
     def __init__(self, app_state: dict):
         self._state = app_state
-        self._thread: threading.Thread | None = None
         self._running = False
         self._last_day: str = datetime.now().strftime("%Y-%m-%d")
-        self._check_interval = 30  # seconds
+        self._scheduler = JobScheduler()
+        # name, check, interval (s), timeout (s)
+        for name, func, interval, timeout in (
+            ("day_rollover", self._check_day_rollover, 10, 60),
+            ("recorder", self._check_recorder, 10, 60),
+            ("mediamtx", self._check_mediamtx, 15, 60),
+            ("tunnel", self._check_tunnel, 30, 60),
+            ("disk_space", self._check_disk_space, 60, 600),
+            ("retention", self._check_retention, 3600, 1800),
+            ("segment_index", self._sync_index, 300, 600),
+        ):
+            self._scheduler.add(name, func, interval, timeout=timeout, initial_delay=min(interval / 2, 30))
 
     def start(self):
-        """Start watchdog thread."""
+        """Start the watchdog jobs."""
         if self._running:
             return
         self._running = True
-        self._thread = threading.Thread(target=self._watch_loop, daemon=True)
-        self._thread.start()
-        logger.info("Watchdog started (checking every 30s)")
+        self._scheduler.start()
+        logger.info("Watchdog started")
 
     def stop(self):
         """Stop watchdog."""
         self._running = False
+        self._scheduler.stop()
         logger.info("Watchdog stopped")
 
-    def _watch_loop(self):
-        """Main watchdog loop."""
-        while self._running:
-            try:
-                self._check_day_rollover()
-                self._check_recorder()
-                self._check_mediamtx()
-                self._check_tunnel()
-                self._check_disk()
-            except Exception as e:
-                logger.error(f"Watchdog error: {e}")
+    def trigger(self, job: str) -> bool:
+        """Run a check now instead of waiting for its interval."""
+        return self._scheduler.trigger(job)
+
+    def on_camera_state(self, camera_id: str, down: bool):
+        """Prober callback: restart a recording as soon as its camera is back."""
+        if not down:
+            self.trigger("recorder")
 
-            time.sleep(self._check_interval)
+    def get_jobs(self) -> list[dict]:
+        return self._scheduler.get_status()
 
     def _check_day_rollover(self):
         """Restart recordings at midnight for new day folder."""
@@ -83,8 +95,23 @@ class WatchdogManager:
                 logger.warning("Tunnel is down. Restarting...")
                 tunnel.restart()
 
-    def _check_disk(self):
-        """Check disk space and cleanup if needed."""
-        from ..recording.storage import cleanup_old_recordings, cleanup_if_disk_low
-        cleanup_old_recordings()
-        cleanup_if_disk_low()
+    def _manifest(self):
+        cloud_sync = self._state.get("cloud_sync")
+        return cloud_sync.manifest if cloud_sync else None
+
+    def _check_disk_space(self):
+        """Free space if the disk is running low."""
+        from ..recording.storage import cleanup_if_disk_low
+        cleanup_if_disk_low(manifest=self._manifest())
+
+    def _check_retention(self):
+        """Delete recordings older than the retention period."""
+        from ..recording.storage import cleanup_old_recordings
+        cleanup_old_recordings(self._manifest())
+        self.trigger("segment_index")
+
+    def _sync_index(self):
+        """Pick up segments the tracker missed and drop deleted ones."""
+        index = self._state.get("index")
+        if index:
+            index.sync(self._manifest())
@@ -0,0 +1,193 @@
+"""In-memory metrics history: fixed-size ring buffers with rollups."""
+
+import logging
+import math
+import os
+import pickle
+import threading
+import time
+from array import array
+from ..config import BASE_DIR
+from ..models import SystemStatus
+from .status import SAMPLE_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+METRICS_PATH = BASE_DIR / "data" / "metrics.bin"
+PERSIST_INTERVAL = 300  # seconds between writes to disk
+
+# name -> (step in seconds, slots): 1 h of raw samples, 1 day of minutes, 30 days of hours
+RESOLUTIONS = {
+    "raw": (SAMPLE_INTERVAL, 3600 // SAMPLE_INTERVAL),
+    "minute": (60, 1440),
+    "hour": (3600, 720),
+}
+RANGES = {"hour": "raw", "day": "minute", "month": "hour"}
+COUNTERS = {"restarts"}  # events per sample: buckets hold their sum, not their mean
+
+
+class Ring:
+    """Time-aligned ring of float32 values.
+
+    Slot i holds bucket b where b = t // step and i = b % slots, so writing
+    needs no head pointer and stale slots are recognised by their bucket.
+    """
+
+    def __init__(self, step: int, slots: int):
+        self.step = step
+        self.slots = slots
+        self.buckets = array("q", [-1]) * slots
+        self.values = array("f", [math.nan]) * slots
+
+    def put(self, bucket: int, value: float):
+        i = bucket % self.slots
+        self.buckets[i] = bucket
+        self.values[i] = value
+
+    def points(self, now: float) -> list[list]:
+        """[timestamp, value] pairs still inside the ring, oldest first."""
+        last = int(now // self.step)
+        out = []
+        for bucket in range(last - self.slots + 1, last + 1):
+            i = bucket % self.slots
+            if self.buckets[i] == bucket and not math.isnan(self.values[i]):
+                out.append([bucket * self.step, round(self.values[i], 2)])
+        return out
+
+
+class Series:
+    """One metric at every resolution. Coarser rings get the mean of the
+    samples in each of their buckets (the sum for counters), updated as
+    samples arrive."""
+
+    def __init__(self, counter: bool = False):
+        self.counter = counter
+        self.rings = {name: Ring(step, slots) for name, (step, slots) in RESOLUTIONS.items()}
+        self._sums = {name: [-1, 0.0, 0] for name in RESOLUTIONS}  # bucket, sum, count
+
+    def add(self, t: float, value: float):
+        for name, ring in self.rings.items():
+            bucket = int(t // ring.step)
+            acc = self._sums[name]
+            if acc[0] != bucket:
+                acc[:] = [bucket, 0.0, 0]
+            acc[1] += value
+            acc[2] += 1
+            ring.put(bucket, acc[1] if self.counter else acc[1] / acc[2])
+
+
+class MetricsStore:
+    """Named series; thread-safe, persisted with the raw arrays' bytes."""
+
+    def __init__(self, path=METRICS_PATH):
+        self._path = path
+        self._lock = threading.Lock()
+        self._series: dict[str, Series] = {}
+
+    def add(self, name: str, value: float, t: float | None = None):
+        t = t or time.time()
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                series = self._series[name] = Series(counter=name in COUNTERS)
+            series.add(t, value)
+
+    def names(self) -> list[str]:
+        with self._lock:
+            return sorted(self._series)
+
+    def history(self, range_: str = "hour", names: list[str] | None = None) -> dict:
+        resolution = RANGES[range_]
+        now = time.time()
+        with self._lock:
+            selected = {n: s for n, s in self._series.items() if not names or n in names}
+            return {
+                "range": range_,
+                "step": RESOLUTIONS[resolution][0],
+                "series": {n: s.rings[resolution].points(now) for n, s in selected.items()},
+            }
+
+    def save(self):
+        """Write the minute and hour rings (raw samples are not worth keeping)."""
+        with self._lock:
+            data = {
+                name: {
+                    res: (ring.buckets.tobytes(), ring.values.tobytes())
+                    for res, ring in series.rings.items() if res != "raw"
+                }
+                for name, series in self._series.items()
+            }
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self._path.with_suffix(".tmp")
+            with open(tmp, "wb") as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path)
+        except OSError as e:
+            logger.warning(f"Could not save metrics history: {e}")
+
+    def load(self):
+        try:
+            with open(self._path, "rb") as f:
+                data = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable metrics history: {e}")
+            return
+        with self._lock:
+            for name, rings in data.items():
+                series = self._series.setdefault(name, Series(counter=name in COUNTERS))
+                for res, (buckets, values) in rings.items():
+                    ring = series.rings.get(res)
+                    if ring is None or len(buckets) != ring.buckets.itemsize * ring.slots:
+                        continue  # resolution changed since it was saved
+                    ring.buckets = array("q")
+                    ring.buckets.frombytes(buckets)
+                    ring.values = array("f")
+                    ring.values.frombytes(values)
+
+
+class MetricsCollector:
+    """Records system and recorder metrics from each StatusSampler sample,
+    so psutil is read once per SAMPLE_INTERVAL for both."""
+
+    def __init__(self, app_state: dict, store: MetricsStore | None = None):
+        self._state = app_state
+        self.store = store or MetricsStore()
+        self._written: dict[str, tuple[float, int]] = {}  # camera -> (time, bytes written)
+        self._restarts: int | None = None
+        self._next_persist = 0.0
+
+    def start(self):
+        self.store.load()
+        self._next_persist = time.time() + PERSIST_INTERVAL
+        logger.info(f"Metrics history started (every {SAMPLE_INTERVAL}s)")
+
+    def stop(self):
+        self.store.save()
+
+    def record(self, status: SystemStatus, now: float):
+        """StatusSampler subscriber."""
+        self.store.add("cpu", status.cpu_percent, now)
+        self.store.add("ram", status.ram_percent, now)
+        if status.disk_total_gb:
+            self.store.add("disk", status.disk_used_gb / status.disk_total_gb * 100, now)
+
+        recorder = self._state.get("recorder")
+        if recorder is not None:
+            # The recorder counts restarts since startup; store how many happened this sample
+            restarts = recorder.restart_count()
+            if self._restarts is not None:
+                self.store.add("restarts", max(0, restarts - self._restarts), now)
+            self._restarts = restarts
+            for camera_id, written in recorder.bytes_written().items():
+                prev = self._written.get(camera_id)
+                self._written[camera_id] = (now, written)
+                if prev and written >= prev[1] and now > prev[0]:
+                    kbps = (written - prev[1]) * 8 / 1000 / (now - prev[0])
+                    self.store.add(f"bitrate:{camera_id}", kbps, now)
+
+        if now >= self._next_persist:
+            self.store.save()
+            self._next_persist = now + PERSIST_INTERVAL
@@ -0,0 +1,166 @@
+"""Periodic job scheduler for the watchdog."""
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Job:
+    name: str
+    func: Callable[[], None]
+    interval: float  # seconds between runs
+    jitter: float = 0.1  # fraction of interval added/removed at random
+    timeout: float | None = None  # seconds before a run is reported as hung
+    next_run: float = 0.0
+    running_since: float | None = None
+    timed_out: bool = False
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0
+    timeouts: int = 0
+    last_run: float | None = None
+    last_duration: float = 0.0
+    max_duration: float = 0.0
+    total_duration: float = 0.0
+    last_error: str | None = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def schedule_next(self, now: float):
+        spread = self.interval * self.jitter
+        self.next_run = now + self.interval + random.uniform(-spread, spread)
+
+
+class JobScheduler:
+    """Runs registered jobs on their own intervals on a small thread pool.
+
+    Every job gets its own worker, so a slow job (a disk scan) never
+    delays a cheap one (a process liveness check). A job that is still
+    running when it comes due again is skipped rather than stacked.
+    Python threads cannot be killed, so a timeout only marks the run as
+    hung in the metrics and logs; skip-if-running keeps it from piling up.
+    """
+
+    def __init__(self):
+        self._jobs: dict[str, Job] = {}
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._pool: ThreadPoolExecutor | None = None
+        self._running = False
+
+    def add(self, name: str, func: Callable[[], None], interval: float,
+            jitter: float = 0.1, timeout: float | None = None, initial_delay: float = 0.0):
+        job = Job(name, func, interval, jitter, timeout)
+        job.next_run = time.monotonic() + initial_delay
+        with self._cond:
+            self._jobs[name] = job
+            self._cond.notify()
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._pool = ThreadPoolExecutor(max_workers=max(len(self._jobs), 1), thread_name_prefix="watchdog")
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def trigger(self, name: str) -> bool:
+        """Run a job as soon as possible (no-op if it is already running)."""
+        with self._cond:
+            job = self._jobs.get(name)
+            if job is None:
+                return False
+            job.next_run = 0.0
+            self._cond.notify()
+        return True
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                now = time.monotonic()
+                due = [job for job in self._jobs.values() if job.next_run <= now]
+                for job in due:
+                    job.schedule_next(now)
+                    self._dispatch(job, now)
+                self._check_timeouts(now)
+                next_run = min((job.next_run for job in self._jobs.values()), default=now + 60)
+                self._cond.wait(timeout=min(max(next_run - now, 0.05), 5))
+
+    def _dispatch(self, job: Job, now: float):
+        with job._lock:
+            if job.running_since is not None:
+                job.skipped += 1
+                return
+            job.running_since = now
+            job.timed_out = False
+        self._pool.submit(self._run, job)
+
+    def _run(self, job: Job):
+        started = time.monotonic()
+        error = None
+        try:
+            job.func()
+        except Exception as e:
+            error = str(e)
+            logger.error(f"Watchdog job {job.name} failed: {e}")
+        duration = time.monotonic() - started
+        with job._lock:
+            job.running_since = None
+            job.runs += 1
+            job.last_run = time.time()
+            job.last_duration = duration
+            job.max_duration = max(job.max_duration, duration)
+            job.total_duration += duration
+            if error:
+                job.failures += 1
+            job.last_error = error
+        if job.timed_out:
+            logger.info(f"Watchdog job {job.name} finished after {duration:.0f}s")
+
+    def _check_timeouts(self, now: float):
+        for job in self._jobs.values():
+            with job._lock:
+                if (job.timeout and job.running_since is not None and not job.timed_out
+                        and now - job.running_since > job.timeout):
+                    job.timed_out = True
+                    job.timeouts += 1
+                    logger.warning(f"Watchdog job {job.name} running for more than {job.timeout:.0f}s")
+
+    def get_status(self) -> list[dict]:
+        now = time.monotonic()
+        status = []
+        for job in self._jobs.values():
+            with job._lock:
+                status.append({
+                    "name": job.name,
+                    "interval": job.interval,
+                    "timeout": job.timeout,
+                    "running": job.running_since is not None,
+                    "running_for": round(now - job.running_since, 1) if job.running_since is not None else None,
+                    "next_run_in": round(max(job.next_run - now, 0), 1),
+                    "runs": job.runs,
+                    "failures": job.failures,
+                    "skipped": job.skipped,
+                    "timeouts": job.timeouts,
+                    "last_run": job.last_run,
+                    "last_duration": round(job.last_duration, 3),
+                    "avg_duration": round(job.total_duration / job.runs, 3) if job.runs else 0,
+                    "max_duration": round(job.max_duration, 3),
+                    "last_error": job.last_error,
+                })
+        return status
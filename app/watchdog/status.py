@@ -0,0 +1,118 @@
+"""Background sampler behind /api/status."""
+
+import logging
+import threading
+import time
+from typing import Callable
+from ..config import load_config, BASE_DIR
+from ..events import publish
+from ..models import CameraStatus, SystemStatus
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL = 5  # seconds between system samples
+RECORDINGS_SIZE_INTERVAL = 60  # walking the recordings tree is the expensive part
+PUBLISH_INTERVAL = 60  # push an unchanged status this often (keeps uptime fresh)
+
+
+class StatusSampler:
+    """Keeps a ready-made SystemStatus so the endpoint never does I/O.
+
+    CPU, RAM, disk, camera counts and tunnel state are refreshed every
+    SAMPLE_INTERVAL seconds; the recordings folder size (a full tree walk)
+    only every RECORDINGS_SIZE_INTERVAL.
+    """
+
+    def __init__(self, app_state: dict, start_time: float):
+        self._state = app_state
+        self._start_time = start_time
+        self._thread: threading.Thread | None = None
+        self._running = False
+        self._status: SystemStatus | None = None
+        self._sampled_at = 0.0
+        self._rec_size = 0
+        self._next_rec_size = 0.0
+        self._published: dict | None = None
+        self._published_at = 0.0
+        self._subscribers: list[Callable[[SystemStatus, float], None]] = []
+
+    def subscribe(self, callback: Callable[[SystemStatus, float], None]):
+        """Register a callback for every sample (status, sample time)."""
+        self._subscribers.append(callback)
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._sample_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+
+    def snapshot(self) -> tuple[SystemStatus | None, float]:
+        """Latest status and its age in seconds."""
+        status = self._status
+        if status is None:
+            return None, 0.0
+        return status, time.time() - self._sampled_at
+
+    def _sample_loop(self):
+        import psutil
+        psutil.cpu_percent(interval=None)  # first call only sets the baseline
+        while self._running:
+            try:
+                self.sample(psutil)
+            except Exception as e:
+                logger.error(f"Status sample error: {e}")
+            time.sleep(SAMPLE_INTERVAL)
+
+    def sample(self, psutil):
+        from ..recording.storage import get_recordings_size_bytes
+        config = load_config()
+        now = time.time()
+        if now >= self._next_rec_size:
+            self._rec_size = get_recordings_size_bytes()
+            self._next_rec_size = now + RECORDINGS_SIZE_INTERVAL
+
+        disk = psutil.disk_usage(str(BASE_DIR))
+        tunnel = self._state.get("tunnel")
+        tunnel_active = bool(tunnel and tunnel.is_running())
+
+        recording_count = 0
+        online_count = 0
+        for cam in config.cameras:
+            if cam.status == CameraStatus.RECORDING:
+                recording_count += 1
+            if cam.status in (CameraStatus.ONLINE, CameraStatus.RECORDING):
+                online_count += 1
+
+        self._status = SystemStatus(
+            cameras_total=len(config.cameras),
+            cameras_recording=recording_count,
+            cameras_online=online_count,
+            disk_total_gb=round(disk.total / (1024**3), 1),
+            disk_used_gb=round(disk.used / (1024**3), 1),
+            disk_free_gb=round(disk.free / (1024**3), 1),
+            recordings_size_gb=round(self._rec_size / (1024**3), 2),
+            cpu_percent=psutil.cpu_percent(interval=None),
+            ram_percent=psutil.virtual_memory().percent,
+            cloud_connected=config.cloud.enabled,
+            tunnel_active=tunnel_active,
+            tunnel_url=tunnel.public_url if tunnel_active else None,
+            uptime_seconds=int(now - self._start_time),
+        )
+        self._sampled_at = now
+
+        # Push to browsers only when something other than the uptime changed
+        data = self._status.model_dump(exclude={"uptime_seconds", "age_seconds"})
+        if data != self._published or now - self._published_at >= PUBLISH_INTERVAL:
+            publish("status", self._status.model_dump())
+            self._published = data
+            self._published_at = now
+
+        for callback in self._subscribers:
+            try:
+                callback(self._status, now)
+            except Exception as e:
+                logger.error(f"Status subscriber error: {e}")
@@ -1,20 +1,24 @@
 """REST API routes."""
 
+import asyncio
 import os
 import time
 import logging
+from datetime import datetime
 from pathlib import Path
-from fastapi import APIRouter, HTTPException, Response, Request
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Query, Response, Request
 from ..models import (
     CameraAdd, CameraUpdate, CameraModel, CameraStatus,
-    RecordingSettings, CloudSettings, TunnelSettings, SystemSettings,
+    RecordingSettings, CloudSettings, CloudPrioritize, TunnelSettings, SystemSettings,
     SystemStatus, DiscoveredCamera,
 )
 from ..config import (
     load_config, save_config, get_camera, add_camera,
     remove_camera, update_camera, next_camera_id, BASE_DIR,
 )
+from .caching import etag_json
+from .jobs import jobs, run_blocking
+from .playback import RecordingResponse
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api")
@@ -26,56 +30,86 @@ START_TIME = time.time()
 
 @router.get("/status")
 async def system_status():
-    import psutil
-    config = load_config()
-    rec_path = BASE_DIR / config.recording.recordings_path
-
-    rec_size = 0
-    if rec_path.exists():
-        for f in rec_path.rglob("*"):
-            if f.is_file():
-                rec_size += f.stat().st_size
-
-    disk = psutil.disk_usage(str(BASE_DIR))
-    tunnel_url = None
-    tunnel_active = False
-    if hasattr(router, "app") and hasattr(router.app, "state"):
-        tunnel_mgr = getattr(router.app.state, "tunnel_manager", None)
-        if tunnel_mgr:
-            tunnel_active = tunnel_mgr.is_running()
-            tunnel_url = tunnel_mgr.public_url
-
-    recording_count = 0
-    online_count = 0
-    for cam in config.cameras:
-        if cam.status == CameraStatus.RECORDING:
-            recording_count += 1
-        if cam.status in (CameraStatus.ONLINE, CameraStatus.RECORDING):
-            online_count += 1
-
-    return SystemStatus(
-        cameras_total=len(config.cameras),
-        cameras_recording=recording_count,
-        cameras_online=online_count,
-        disk_total_gb=round(disk.total / (1024**3), 1),
-        disk_used_gb=round(disk.used / (1024**3), 1),
-        disk_free_gb=round(disk.free / (1024**3), 1),
-        recordings_size_gb=round(rec_size / (1024**3), 2),
-        cpu_percent=psutil.cpu_percent(interval=0.1),
-        ram_percent=psutil.virtual_memory().percent,
-        cloud_connected=config.cloud.enabled,
-        tunnel_active=tunnel_active,
-        tunnel_url=tunnel_url,
-        uptime_seconds=int(time.time() - START_TIME),
+    """Latest snapshot from the background StatusSampler."""
+    from ..server import get_app_state
+    state = get_app_state()
+    sampler = state.get("status") if state else None
+    if sampler is None:
+        raise HTTPException(503, "Status not available")
+    status, age = sampler.snapshot()
+    if status is None:
+        import psutil
+        await run_blocking(sampler.sample, psutil)
+        status, age = sampler.snapshot()
+    return status.model_copy(update={
+        "uptime_seconds": int(time.time() - START_TIME),
+        "age_seconds": round(age, 1),
+    })
+
+
+@router.get("/events")
+async def server_events(request: Request):
+    """Server-sent events: status, camera, probe, recorder, transcoder,
+    cloud, tunnel and job updates as they happen."""
+    from fastapi.responses import StreamingResponse
+    from ..events import broadcaster
+    return StreamingResponse(
+        broadcaster.stream(request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
+@router.get("/metrics/history")
+async def metrics_history(range: str = "hour", series: str = ""):
+    """CPU, RAM, disk, restarts and per-camera bitrate ("bitrate:<id>")
+    over the last hour (10 s), day (1 min) or month (1 h)."""
+    from ..server import get_app_state
+    from ..watchdog.metrics import RANGES
+    if range not in RANGES:
+        raise HTTPException(400, f"range must be one of: {', '.join(RANGES)}")
+    state = get_app_state()
+    if not state or not state.get("metrics"):
+        raise HTTPException(503, "Metrics not available")
+    names = [s for s in series.split(",") if s] or None
+    return state["metrics"].store.history(range, names)
+
+
 # ─── Cameras ──────────────────────────────────────────────────────────
 
 @router.get("/cameras")
-async def list_cameras():
+async def list_cameras(request: Request):
     config = load_config()
-    return config.cameras
+    return etag_json(request, config.cameras)
+
+
+@router.get("/cameras/health")
+async def cameras_health():
+    from ..server import get_app_state
+    state = get_app_state()
+    if state and state.get("prober"):
+        return state["prober"].get_status()
+    return {}
+
+
+@router.get("/watchdog/jobs")
+async def watchdog_jobs():
+    from ..server import get_app_state
+    state = get_app_state()
+    if state and state.get("watchdog"):
+        return state["watchdog"].get_jobs()
+    return []
+
+
+@router.post("/watchdog/jobs/{name}/run")
+async def run_watchdog_job(name: str):
+    from ..server import get_app_state
+    state = get_app_state()
+    if not state or not state.get("watchdog"):
+        raise HTTPException(503, "Watchdog not running")
+    if not state["watchdog"].trigger(name):
+        raise HTTPException(404, "Job not found")
+    return {"ok": True}
 
 
 @router.post("/cameras")
@@ -94,9 +128,14 @@ async def create_camera(data: CameraAdd):
 
     cam_id = next_camera_id(config)
     camera = CameraModel(id=cam_id, **data.model_dump())
-    add_camera(config, camera)
+    await run_blocking(add_camera, config, camera)
+
+    # Starting the recorder and restarting MediaMTX take seconds
+    job_id = jobs.submit(f"camera.add:{cam_id}", _start_camera_services, camera)
+    return {**camera.model_dump(mode="json"), "job_id": job_id}
 
-    # Start recording if recorder is available
+
+def _start_camera_services(camera: CameraModel):
     from ..server import get_app_state
     state = get_app_state()
     if state and state.get("recorder"):
@@ -104,7 +143,25 @@ async def create_camera(data: CameraAdd):
     if state and state.get("mediamtx"):
         state["mediamtx"].add_camera(camera)
 
-    return camera
+
+def _stop_camera_services(camera_id: str):
+    from ..server import get_app_state
+    state = get_app_state()
+    if state and state.get("recorder"):
+        state["recorder"].stop_camera(camera_id)
+    if state and state.get("mediamtx"):
+        state["mediamtx"].remove_camera(camera_id)
+
+
+def _toggle_recording(camera: CameraModel):
+    from ..server import get_app_state
+    state = get_app_state()
+    if not state or not state.get("recorder"):
+        return
+    if camera.enabled:
+        state["recorder"].start_camera(camera)
+    else:
+        state["recorder"].stop_camera(camera.id)
 
 
 @router.put("/cameras/{camera_id}")
@@ -113,7 +170,7 @@ async def edit_camera(camera_id: str, data: CameraUpdate):
     cam = get_camera(config, camera_id)
     if not cam:
         raise HTTPException(404, "Camera not found")
-    update_camera(config, camera_id, data.model_dump(exclude_unset=True))
+    await run_blocking(update_camera, config, camera_id, data.model_dump(exclude_unset=True))
     return get_camera(load_config(), camera_id)
 
 
@@ -124,15 +181,10 @@ async def delete_camera(camera_id: str):
     if not cam:
         raise HTTPException(404, "Camera not found")
 
-    from ..server import get_app_state
-    state = get_app_state()
-    if state and state.get("recorder"):
-        state["recorder"].stop_camera(camera_id)
-    if state and state.get("mediamtx"):
-        state["mediamtx"].remove_camera(camera_id)
-
-    remove_camera(config, camera_id)
-    return {"ok": True}
+    # Drop it from the config first so the watchdog won't restart it
+    await run_blocking(remove_camera, config, camera_id)
+    job_id = jobs.submit(f"camera.delete:{camera_id}", _stop_camera_services, camera_id)
+    return {"ok": True, "job_id": job_id}
 
 
 @router.post("/cameras/{camera_id}/toggle")
@@ -141,19 +193,36 @@ async def toggle_camera(camera_id: str):
     cam = get_camera(config, camera_id)
     if not cam:
         raise HTTPException(404, "Camera not found")
-    update_camera(config, camera_id, {"enabled": not cam.enabled})
+    await run_blocking(update_camera, config, camera_id, {"enabled": not cam.enabled})
 
-    from ..server import get_app_state
-    state = get_app_state()
     updated = get_camera(load_config(), camera_id)
-    if updated.enabled:
-        if state and state.get("recorder"):
-            state["recorder"].start_camera(updated)
-    else:
-        if state and state.get("recorder"):
-            state["recorder"].stop_camera(camera_id)
+    job_id = jobs.submit(f"camera.toggle:{camera_id}", _toggle_recording, updated)
+    return {**updated.model_dump(mode="json"), "job_id": job_id}
+
+
+# ─── Jobs ─────────────────────────────────────────────────────────────
 
-    return updated
+@router.get("/jobs")
+async def list_jobs():
+    return jobs.list()
+
+
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return job
+
+
+@router.post("/streaming/restart")
+async def restart_streaming():
+    """Restart MediaMTX and its transcoders in the background."""
+    from ..server import get_app_state
+    state = get_app_state()
+    if not state or not state.get("mediamtx"):
+        raise HTTPException(400, "MediaMTX not available")
+    return {"job_id": jobs.submit("mediamtx.restart", state["mediamtx"].restart)}
 
 
 # ─── Discovery ────────────────────────────────────────────────────────
@@ -303,46 +372,155 @@ async def configure_ble_device(address: str, ssid: str, password: str):
     except Exception as e:
         logger.error(f"BLE Config error: {e}")
         return {"ok": False, "error": str(e)}
+@router.get("/recordings")
+async def query_recordings(request: Request, cameras: str = "", start: datetime | None = None,
+                           end: datetime | None = None, min_duration: float = 0,
+                           cursor: str | None = None, limit: int = 100, order: str = "asc"):
+    """Segments of some cameras (comma-separated ids, empty for all) that
+    overlap [start, end), local time. Pass next_cursor back for the next page."""
+    from ..server import get_app_state
+    state = get_app_state()
+    index = state.get("index") if state else None
+    if index is None:
+        raise HTTPException(503, "Recordings index not available")
+    if order not in ("asc", "desc"):
+        raise HTTPException(400, "order must be asc or desc")
+    try:
+        page = await run_blocking(
+            index.query,
+            cameras=[c for c in cameras.split(",") if c] or None,
+            start=start.timestamp() if start else None,
+            end=end.timestamp() if end else None,
+            min_duration=min_duration,
+            cursor=cursor,
+            limit=limit,
+            descending=order == "desc",
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    names = {cam.id: cam.name for cam in load_config().cameras}
+    for item in page["items"]:
+        item["name"] = item["path"].rsplit("/", 1)[-1]
+        item["camera_name"] = names.get(item["camera_id"], item["camera_id"])
+        item["start"] = datetime.fromtimestamp(item["start"]).isoformat(timespec="seconds")
+        item["size_mb"] = round(item.pop("size") / (1024**2), 1)
+        item["url"] = f"/api/recordings/play/{item['path']}"
+    return etag_json(request, page)
+
+
+@router.get("/recordings/coverage")
+async def recording_coverage(date: str, request: Request, cameras: str = ""):
+    """Recorded intervals and gaps per camera over a day, as timestamps.
+
+    For today the day ends one segment before now, since the segment being
+    written is only indexed once it is closed."""
+    from ..server import get_app_state
+    from ..recording.index import day_bounds, find_gaps
+    state = get_app_state()
+    index = state.get("index") if state else None
+    if index is None:
+        raise HTTPException(503, "Recordings index not available")
+    try:
+        day_start, day_end = day_bounds(date)
+    except ValueError:
+        raise HTTPException(400, "date must be YYYY-MM-DD")
+
+    config = load_config()
+    end = min(day_end, time.time() - config.recording.segment_duration)
+    ids = [c for c in cameras.split(",") if c] or await run_blocking(index.cameras_on, date)
+    names = {cam.id: cam.name for cam in config.cameras}
+    result = []
+    for camera_id in ids:
+        intervals = await run_blocking(index.coverage, camera_id, date)
+        gaps = find_gaps(intervals, day_start, end) if end > day_start else []
+        result.append({
+            "id": camera_id,
+            "name": names.get(camera_id, camera_id),
+            "intervals": [[round(s, 1), round(e, 1)] for s, e in intervals],
+            "gaps": [[round(s, 1), round(e, 1)] for s, e in gaps],
+            "recorded_seconds": round(sum(e - s for s, e in intervals)),
+        })
+    return etag_json(request, {"date": date, "start": day_start, "end": day_end, "cameras": result})
+
+
 @router.get("/recordings/dates")
-async def recording_dates():
+async def recording_dates(request: Request):
+    return etag_json(request, await run_blocking(_recording_dates))
+
+
+def _recording_dates() -> list[str]:
     config = load_config()
     rec_path = BASE_DIR / config.recording.recordings_path
-    dates = []
+    dates = set()
     if rec_path.exists():
-        for d in sorted(rec_path.iterdir(), reverse=True):
+        for d in rec_path.iterdir():
             if d.is_dir() and len(d.name) == 10:
-                dates.append(d.name)
-    return dates
+                dates.add(d.name)
+    manifest = _cloud_manifest()
+    if manifest:
+        dates.update(manifest.dates())
+    return sorted(dates, reverse=True)
+
+
+def _cloud_manifest():
+    """Upload manifest, to list footage that only exists in the cloud."""
+    from ..server import get_app_state
+    state = get_app_state()
+    if state and state.get("cloud_sync"):
+        return state["cloud_sync"].manifest
+    return None
 
 
 @router.get("/recordings/{date}")
-async def recording_cameras(date: str):
+async def recording_cameras(date: str, request: Request):
+    return etag_json(request, await run_blocking(_recording_cameras, date))
+
+
+def _recording_cameras(date: str) -> list[dict]:
     config = load_config()
     rec_path = BASE_DIR / config.recording.recordings_path / date
-    if not rec_path.exists():
-        return []
-    cameras = []
-    for d in sorted(rec_path.iterdir()):
-        if d.is_dir():
-            files = []
-            for f in sorted(d.iterdir()):
-                if f.suffix == ".mp4":
-                    files.append({
-                        "name": f.name,
-                        "size_mb": round(f.stat().st_size / (1024**2), 1),
-                        "path": f"recordings/{date}/{d.name}/{f.name}",
-                    })
-            cam_config = get_camera(config, d.name)
-            cameras.append({
-                "id": d.name,
-                "name": cam_config.name if cam_config else d.name,
-                "files": files,
+    cam_files: dict[str, list[dict]] = {}
+    if rec_path.exists():
+        for d in sorted(rec_path.iterdir()):
+            if d.is_dir():
+                files = cam_files.setdefault(d.name, [])
+                for f in sorted(d.iterdir()):
+                    if f.suffix == ".mp4":
+                        files.append({
+                            "name": f.name,
+                            "size_mb": round(f.stat().st_size / (1024**2), 1),
+                            "path": f"recordings/{date}/{d.name}/{f.name}",
+                        })
+
+    # Segments pruned locally but still in the cloud
+    manifest = _cloud_manifest()
+    if manifest:
+        for entry in manifest.list_date(date):
+            files = cam_files.setdefault(entry["camera_id"], [])
+            name = entry["path"].rsplit("/", 1)[-1]
+            if any(f["name"] == name for f in files):
+                continue
+            files.append({
+                "name": name,
+                "size_mb": round(entry["size"] / (1024**2), 1),
+                "path": f"recordings/{entry['path']}",
+                "archived": True,
             })
+
+    cameras = []
+    for cam_id in sorted(cam_files):
+        cam_config = get_camera(config, cam_id)
+        cameras.append({
+            "id": cam_id,
+            "name": cam_config.name if cam_config else cam_id,
+            "files": sorted(cam_files[cam_id], key=lambda f: f["name"]),
+        })
     return cameras
 
 
 @router.get("/recordings/play/{date}/{camera_id}/{filename}")
-async def play_recording(date: str, camera_id: str, filename: str):
+async def play_recording(date: str, camera_id: str, filename: str, request: Request):
     # Sanitize path components
     for part in (date, camera_id, filename):
         if ".." in part or "/" in part or "\\" in part:
@@ -354,61 +532,295 @@ async def play_recording(date: str, camera_id: str, filename: str):
     if not str(file_path).startswith(str(rec_dir)):
         raise HTTPException(400, "Invalid path")
     if not file_path.exists():
+        return await _play_archived(f"{date}/{camera_id}/{filename}", config, request)
+    return RecordingResponse(file_path)
+
+
+async def _play_archived(rel_path: str, config, request: Request):
+    """Serve a segment that only exists in the cloud.
+
+    A cached copy is served like a local file. Otherwise the file is
+    fetched into the cache once, and the request (with its Range) is
+    answered from the download as the bytes arrive.
+    """
+    from fastapi.responses import StreamingResponse
+    from ..server import get_app_state
+    from .playback import CHUNK_SIZE, RangeNotSatisfiable, _parse_range
+
+    state = get_app_state()
+    cloud_sync = state.get("cloud_sync") if state else None
+    if not cloud_sync or not cloud_sync.manifest.get(rel_path):
+        raise HTTPException(404, "File not found")
+
+    archive = cloud_sync.archive
+    cached = archive.get(rel_path)
+    if cached:
+        return RecordingResponse(cached)
+
+    fs = f"{config.cloud.remote_name}:{config.cloud.remote_path}"
+    download = archive.fetch(fs, rel_path, config.cloud.archive_cache_mb * 1024**2)
+    try:
+        # The size comes with the response headers; without Content-Length, after the download
+        await _wait_archive(lambda: download.ready(0) and download.size is not None)
+    except (RuntimeError, TimeoutError) as e:
+        raise HTTPException(503, f"Nuvem indisponivel: {e}")
+
+    size = download.size
+    start, end, status = 0, size, 200
+    headers = {"accept-ranges": "bytes"}
+    if "range" in request.headers:
+        try:
+            start, end = _parse_range(request.headers["range"], size)
+            status = 206
+            headers["content-range"] = f"bytes {start}-{end - 1}/{size}"
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={"content-range": f"bytes */{size}"})
+        except ValueError:
+            pass  # not a single byte range: send the whole file
+    headers["content-length"] = str(end - start)
+
+    async def body():
+        offset = start
+        while offset < end:
+            length = min(CHUNK_SIZE, end - offset)
+            await _wait_archive(lambda: download.ready(offset + length))
+            chunk = await run_blocking(download.read, offset, length)
+            if not chunk:
+                break
+            offset += len(chunk)
+            yield chunk
+
+    return StreamingResponse(body(), status_code=status, media_type="video/mp4", headers=headers)
+
+
+async def _wait_archive(ready, timeout: float = 60.0):
+    """Poll a download until ready() holds; TimeoutError after timeout."""
+    deadline = time.monotonic() + timeout
+    while not ready():
+        if time.monotonic() > deadline:
+            raise TimeoutError("download parado")
+        await asyncio.sleep(0.1)
+
+
+# ─── HLS playback ─────────────────────────────────────────────────────
+
+@router.get("/hls/{camera_id}.m3u8")
+async def hls_playlist(camera_id: str, start: datetime | None = None, end: datetime | None = None):
+    """VOD playlist of a camera's recordings over [start, end), local time,
+    seamless across segment boundaries."""
+    from ..server import get_app_state
+    state = get_app_state()
+    index = state.get("index") if state else None
+    hls = state.get("hls") if state else None
+    if index is None or hls is None:
+        raise HTTPException(503, "HLS playback not available")
+    start_ts = start.timestamp() if start else None
+    end_ts = end.timestamp() if end else None
+    page = await run_blocking(index.query, cameras=[camera_id], start=start_ts, end=end_ts, limit=500)
+    if not page["items"]:
+        raise HTTPException(404, "Nenhuma gravacao no periodo")
+    playlist = await run_blocking(hls.playlist, page["items"], _recording_source, start_ts, end_ts)
+    return Response(playlist, media_type="application/vnd.apple.mpegurl",
+                    headers={"Cache-Control": "no-cache"})
+
+
+@router.get("/hls/media/{date}/{camera_id}/{filename}/{chunk}")
+async def hls_media(date: str, camera_id: str, filename: str, chunk: str):
+    """init.mp4 or <n>.m4s of a recording; the first request remuxes it."""
+    from ..server import get_app_state
+    for part in (date, camera_id, filename, chunk):
+        if ".." in part or "/" in part or "\\" in part:
+            raise HTTPException(400, "Invalid path")
+    state = get_app_state()
+    hls = state.get("hls") if state else None
+    if hls is None:
+        raise HTTPException(503, "HLS playback not available")
+    config = load_config()
+    try:
+        data = await run_blocking(
+            hls.chunk, f"{date}/{camera_id}/{filename}", chunk, _recording_source,
+            config.recording.hls_cache_mb * 1024**2,
+        )
+    except (OSError, RuntimeError) as e:
+        raise HTTPException(500, f"Falha ao preparar o video: {e}")
+    if data is None:
+        raise HTTPException(404, "File not found")
+    # A remux never changes once made; the browser may keep chunks for the session
+    return Response(data, media_type="video/mp4", headers={"Cache-Control": "private, max-age=3600"})
+
+
+# ─── Thumbnails ───────────────────────────────────────────────────────
+
+@router.get("/thumbnails/{date}/{camera_id}/{filename}")
+async def recording_thumbnails(date: str, camera_id: str, filename: str):
+    """Scrubbing thumbnails of a recording: <segment>.vtt maps times to
+    tiles of <segment>.jpg. The first request for an older recording
+    waits while its sheet is made."""
+    from ..server import get_app_state
+    for part in (date, camera_id, filename):
+        if ".." in part or "/" in part or "\\" in part:
+            raise HTTPException(400, "Invalid path")
+    stem, _, ext = filename.rpartition(".")
+    if ext not in ("vtt", "jpg"):
         raise HTTPException(404, "File not found")
-    return FileResponse(str(file_path), media_type="video/mp4")
+    state = get_app_state()
+    thumbnails = state.get("thumbnails") if state else None
+    index = state.get("index") if state else None
+    if thumbnails is None or index is None:
+        raise HTTPException(503, "Thumbnails not available")
+
+    rel_path = f"{date}/{camera_id}/{stem}.mp4"
+    vtt, sprite = thumbnails.files(rel_path)
+    if ext == "jpg":
+        return RecordingResponse(sprite, media_type="image/jpeg")
+    if not vtt.is_file():
+        if load_config().recording.thumbnail_cache_mb <= 0:
+            raise HTTPException(404, "Miniaturas desativadas")
+        item = await run_blocking(index.get, rel_path)
+        src = await run_blocking(_recording_source, rel_path) if item else None
+        if src is None:
+            raise HTTPException(404, "Recording not found")
+        try:
+            await asyncio.wrap_future(thumbnails.prepare(rel_path, src, item["duration"]))
+        except FileNotFoundError:
+            raise HTTPException(404, "Recording not found")
+        except Exception as e:
+            raise HTTPException(500, f"Falha ao gerar miniaturas: {e}")
+    return RecordingResponse(vtt, media_type="text/vtt")
+
+
+# ─── Export ───────────────────────────────────────────────────────────
+
+@router.get("/export")
+async def export_clip(camera: str, from_: datetime = Query(alias="from"),
+                      to: datetime = Query()):
+    """Footage of one camera between two local times as a single MP4,
+    streamed while ffmpeg joins and trims the segments."""
+    from fastapi.responses import StreamingResponse
+    from ..server import get_app_state
+    from ..recording.export import ClipExport, ExportBusy, MAX_EXPORT_SECONDS, concat_list
+    start, end = from_.timestamp(), to.timestamp()
+    if end <= start:
+        raise HTTPException(400, "'to' deve ser depois de 'from'")
+    if end - start > MAX_EXPORT_SECONDS:
+        raise HTTPException(400, f"Periodo maximo de exportacao: {MAX_EXPORT_SECONDS // 3600} h")
+    state = get_app_state()
+    index = state.get("index") if state else None
+    if index is None:
+        raise HTTPException(503, "Recordings index not available")
+
+    page = await run_blocking(index.query, cameras=[camera], start=start, end=end, limit=500)
+    items, paths = [], []
+    for item in page["items"]:
+        path = await run_blocking(_recording_source, item["path"])
+        if path is not None:
+            items.append(item)
+            paths.append(path)
+    if not items:
+        raise HTTPException(404, "Nenhuma gravacao local no periodo")
+
+    try:
+        export = await run_blocking(ClipExport, concat_list(items, start, end, paths))
+    except ExportBusy:
+        raise HTTPException(429, "Muitas exportacoes em andamento, tente novamente em instantes",
+                            headers={"Retry-After": "30"})
+
+    # Wait for the first bytes so a failing ffmpeg is still reported as an error
+    first = await export.read_async()
+    if not first:
+        await export.close_async()
+        raise HTTPException(500, f"Falha na exportacao: {export.error or 'ffmpeg nao produziu saida'}")
+
+    async def body():
+        try:
+            chunk = first
+            while chunk:
+                yield chunk
+                chunk = await export.read_async()
+        finally:
+            await export.close_async()
+
+    filename = f"{camera}_{from_.strftime('%Y-%m-%d_%H-%M-%S')}.mp4"
+    return StreamingResponse(body(), media_type="video/mp4", headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+    })
+
+
+def _recording_source(rel_path: str) -> Path | None:
+    """A readable copy of a recording: the local file or the archive cache."""
+    config = load_config()
+    path = BASE_DIR / config.recording.recordings_path / rel_path
+    if path.is_file():
+        return path
+    manifest = _cloud_manifest()
+    if manifest and manifest.get(rel_path):
+        from ..server import get_app_state
+        return get_app_state()["cloud_sync"].archive.get(rel_path)
+    return None
 
 
 # ─── Settings ─────────────────────────────────────────────────────────
 
 @router.get("/settings")
-async def get_settings():
+async def get_settings(request: Request):
     config = load_config()
-    return {
+    return etag_json(request, {
         "system": config.system.model_dump(),
         "recording": config.recording.model_dump(),
         "cloud": config.cloud.model_dump(),
         "tunnel": config.tunnel.model_dump(),
-    }
+    })
 
 
 @router.put("/settings/system")
 async def update_system_settings(data: SystemSettings):
     config = load_config()
     config.system = data
-    save_config(config)
+    await run_blocking(save_config, config)
     return config.system
 
 
 @router.put("/settings/recording")
 async def update_recording_settings(data: RecordingSettings):
     config = load_config()
-    config.recording = data
-    save_config(config)
+    config.recording = config.recording.model_copy(update=data.model_dump(exclude_unset=True))
+    await run_blocking(save_config, config)
     return config.recording
 
 
 @router.put("/settings/cloud")
 async def update_cloud_settings(data: CloudSettings):
     config = load_config()
-    config.cloud = data
-    save_config(config)
+    config.cloud = _merge_cloud_settings(config, data)
+    await run_blocking(save_config, config)
     return config.cloud
 
 
+def _merge_cloud_settings(config, data: CloudSettings) -> CloudSettings:
+    """Saved cloud settings updated with the fields the form sent; 422 if the
+    sync rules have times schedule.py can't parse or unknown cameras."""
+    from ..cloud.schedule import sync_rule_errors
+    # Keep fields the form doesn't send (e.g. retention) instead of resetting them;
+    # validated again so sync_rules come back as SyncRule objects, not dicts
+    cloud = CloudSettings.model_validate({**config.cloud.model_dump(), **data.model_dump(exclude_unset=True)})
+    errors = sync_rule_errors(cloud, {cam.id for cam in config.cameras})
+    if errors:
+        raise HTTPException(422, "; ".join(errors))
+    return cloud
+
+
 @router.put("/settings/tunnel")
 async def update_tunnel_settings(data: TunnelSettings):
     config = load_config()
     config.tunnel = data
-    save_config(config)
+    await run_blocking(save_config, config)
 
     from ..server import get_app_state
     state = get_app_state()
     if state and state.get("tunnel"):
         tunnel = state["tunnel"]
-        if data.mode == "disabled":
-            tunnel.stop()
-        else:
-            tunnel.stop()
+        await run_blocking(tunnel.stop)
+        if data.mode != "disabled":
             tunnel.start(data.mode, data.hostname)
 
     return config.tunnel
@@ -418,7 +830,7 @@ async def update_tunnel_settings(data: TunnelSettings):
 async def wizard_complete():
     config = load_config()
     config.system.first_run = False
-    save_config(config)
+    await run_blocking(save_config, config)
     return {"ok": True}
 
 
@@ -434,15 +846,58 @@ async def trigger_cloud_sync():
     raise HTTPException(400, "Cloud sync not configured")
 
 
+@router.post("/cloud/prioritize")
+async def prioritize_cloud_upload(data: CloudPrioritize):
+    from ..server import get_app_state
+    state = get_app_state()
+    if state and state.get("cloud_sync"):
+        bumped = state["cloud_sync"].prioritize(data.camera_id, data.start, data.end)
+        return {"ok": True, "queued": bumped}
+    raise HTTPException(400, "Cloud sync not configured")
+
+
+@router.post("/cloud/dry-run")
+async def cloud_dry_run(data: CloudSettings | None = None):
+    """Bytes the sync rules would upload; optionally with unsaved settings."""
+    from ..server import get_app_state
+    state = get_app_state()
+    if state and state.get("cloud_sync"):
+        cloud = None
+        if data is not None:
+            cloud = _merge_cloud_settings(load_config(), data)
+        return await run_blocking(state["cloud_sync"].dry_run, cloud)
+    raise HTTPException(400, "Cloud sync not configured")
+
+
+@router.post("/cloud/cancel")
+async def cancel_cloud_sync():
+    from ..server import get_app_state
+    state = get_app_state()
+    if state and state.get("cloud_sync"):
+        await run_blocking(state["cloud_sync"].cancel)
+        return {"ok": True}
+    raise HTTPException(400, "Cloud sync not configured")
+
+
 @router.get("/cloud/status")
 async def cloud_sync_status():
     from ..server import get_app_state
     state = get_app_state()
     if state and state.get("cloud_sync"):
-        return state["cloud_sync"].get_status()
+        return await run_blocking(state["cloud_sync"].get_status)
     return {"running": False, "last_sync": None, "error": None}
 
 
+@router.get("/cloud/metrics")
+async def cloud_sync_metrics():
+    from ..server import get_app_state
+    state = get_app_state()
+    if state and state.get("cloud_sync"):
+        metrics = await run_blocking(state["cloud_sync"].metrics)
+        return Response(content=metrics, media_type="text/plain; version=0.0.4")
+    raise HTTPException(400, "Cloud sync not configured")
+
+
 @router.post("/cloud/setup")
 async def cloud_setup():
     from ..server import get_app_state
@@ -498,7 +953,7 @@ async def tunnel_start():
     state = get_app_state()
     if state and state.get("tunnel"):
         t = state["tunnel"]
-        t.start(config.tunnel.mode or "quick", config.tunnel.hostname)
+        await run_blocking(t.start, config.tunnel.mode or "quick", config.tunnel.hostname)
         return {"ok": True, "url": t.public_url}
     raise HTTPException(400, "Tunnel manager not available")
 
@@ -508,23 +963,63 @@ async def tunnel_stop():
     from ..server import get_app_state
     state = get_app_state()
     if state and state.get("tunnel"):
-        state["tunnel"].stop()
+        await run_blocking(state["tunnel"].stop)
         return {"ok": True}
     raise HTTPException(400, "Tunnel manager not available")
 
 
 # ─── WHEP Proxy (for tunnel/HTTPS access) ─────────────────────────────
 
+# Remote WHEP offers are proxied one at a time, so the MediaMTX session
+# that appears during an offer is the one it created
+_whep_remote_lock = asyncio.Lock()
+
+
+def _is_remote_client(request: Request) -> bool:
+    """True for viewers outside the local network. Behind the tunnel the
+    peer is cloudflared on this machine and the viewer is in its headers."""
+    import ipaddress
+
+    host = request.client.host if request.client else ""
+    try:
+        peer = ipaddress.ip_address(host)
+        if peer.is_loopback:
+            forwarded = (request.headers.get("cf-connecting-ip")
+                         or request.headers.get("x-forwarded-for", "").split(",")[0]).strip()
+            if not forwarded:
+                return False
+            peer = ipaddress.ip_address(forwarded)
+        return not (peer.is_private or peer.is_loopback)
+    except ValueError:
+        return False
+
+
 @router.post("/whep/{camera_id}")
 async def whep_proxy(camera_id: str, request: Request):
     """Proxy WHEP requests to local MediaMTX for tunnel/HTTPS compatibility."""
+    from ..server import get_app_state
+    state = get_app_state()
+    mediamtx = state.get("mediamtx") if state else None
+    body = await request.body()
+    if mediamtx is None or not _is_remote_client(request):
+        return await _whep_offer(camera_id, body)
+
+    # Remote viewers throttle cloud uploads (cloud.viewer_bandwidth_limit)
+    async with _whep_remote_lock:
+        before = await run_blocking(mediamtx.proxied_session_ids, camera_id)
+        response = await _whep_offer(camera_id, body)
+        if response.status_code < 300:
+            after = await run_blocking(mediamtx.proxied_session_ids, camera_id)
+            mediamtx.add_remote_viewers(after - before)
+    return response
+
+
+async def _whep_offer(camera_id: str, body: bytes) -> Response:
     import httpx
 
     config = load_config()
     whep_url = f"http://127.0.0.1:{config.system.mediamtx_webrtc_port}/{camera_id}/whep"
 
-    body = await request.body()
-
     try:
         async with httpx.AsyncClient() as client:
             resp = await client.post(
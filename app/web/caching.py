@@ -0,0 +1,191 @@
+"""HTTP caching and compression: ETags for API reads, hashed static URLs,
+and gzip/brotli response compression."""
+
+import hashlib
+import json
+import os
+import zlib
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers, MutableHeaders
+from ..config import BASE_DIR
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = BASE_DIR / "static"
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Only text-like bodies are worth compressing; video, images and the
+# event stream (which must not be buffered) pass through untouched.
+COMPRESSIBLE_TYPES = (
+    "application/json", "application/javascript", "text/html", "text/css",
+    "text/javascript", "text/plain", "text/vtt", "image/svg+xml", "application/vnd.apple.mpegurl",
+)
+MIN_COMPRESS_SIZE = 500  # bytes; smaller bodies gain nothing
+
+
+# ─── ETags ────────────────────────────────────────────────────────────
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def etag_json(request: Request, content) -> Response:
+    """JSON response with an ETag; 304 when the client already has it.
+
+    Browsers revalidate automatically (Cache-Control: no-cache), so the
+    front-end keeps using plain fetch() and unchanged data costs a 304.
+    """
+    body = json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")
+    ).encode()
+    etag = f'W/"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+# ─── Static files ─────────────────────────────────────────────────────
+
+_static_hashes: dict[str, tuple[int, int, str]] = {}  # path -> (mtime_ns, size, hash)
+
+
+def static_url(path: str) -> str:
+    """URL of a static file with its content hash, e.g. /static/js/app.js?v=3f2a9c01.
+
+    The hash changes whenever the file does, so these URLs can be cached
+    forever. Hashes are recomputed only when mtime or size change.
+    """
+    path = path.lstrip("/")
+    try:
+        st = os.stat(STATIC_DIR / path)
+    except OSError:
+        return f"/static/{path}"
+    cached = _static_hashes.get(path)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        digest = cached[2]
+    else:
+        digest = hashlib.blake2b((STATIC_DIR / path).read_bytes(), digest_size=4).hexdigest()
+        _static_hashes[path] = (st.st_mtime_ns, st.st_size, digest)
+    return f"/static/{path}?v={digest}"
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles with cache headers: versioned URLs (?v=) are immutable,
+    anything else is revalidated with the ETag StaticFiles already sends."""
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        versioned = b"v=" in scope.get("query_string", b"")
+        response.headers["Cache-Control"] = IMMUTABLE if versioned else "no-cache"
+        return response
+
+
+# ─── Compression ──────────────────────────────────────────────────────
+
+class _Gzip:
+    def __init__(self):
+        self._z = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        return self._z.compress(data)
+
+    def flush(self) -> bytes:
+        return self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._z.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        self._b = brotli.Compressor(quality=5)  # fast enough for per-request use
+
+    def compress(self, data: bytes) -> bytes:
+        return self._b.process(data)
+
+    def flush(self) -> bytes:
+        return self._b.flush()
+
+    def finish(self) -> bytes:
+        return self._b.finish()
+
+
+class CompressionMiddleware:
+    """Compress text responses with brotli (if installed) or gzip.
+
+    The decision is made on the response headers: only COMPRESSIBLE_TYPES
+    are touched, never partial (206) or already-encoded responses, so
+    video playback, Range requests and the SSE stream go out as-is.
+    """
+
+    def __init__(self, app, minimum_size: int = MIN_COMPRESS_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = Headers(scope=scope).get("accept-encoding", "")
+        if brotli is not None and "br" in accept:
+            encoding, factory = "br", _Brotli
+        elif "gzip" in accept:
+            encoding, factory = "gzip", _Gzip
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            if passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                content_type = headers.get("content-type", "").split(";")[0].strip()
+                if (start_message["status"] != 200
+                        or "content-encoding" in headers
+                        or content_type not in COMPRESSIBLE_TYPES
+                        or (not more_body and len(body) < self.minimum_size)):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                compressor = factory()
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if "content-length" in headers:
+                    del headers["content-length"]
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["ETag"] = f"W/{etag}"  # body bytes differ from the identity one
+                await send(start_message)
+
+            data = compressor.compress(body)
+            data += compressor.flush() if more_body else compressor.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
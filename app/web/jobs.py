@@ -0,0 +1,82 @@
+"""Off-loop execution for API handlers: a blocking executor and background jobs."""
+
+import asyncio
+import functools
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from ..events import publish
+
+logger = logging.getLogger(__name__)
+
+# Short blocking calls (config writes, directory listings, process stops)
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="api-io")
+
+
+async def run_blocking(func: Callable, *args, **kwargs):
+    """Run a blocking call on the API executor and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+class JobManager:
+    """Slow actions (MediaMTX restarts, recorder start/stop) run as jobs.
+
+    The request returns a job id right away; GET /api/jobs/{id} reports
+    pending/running/done/error. Jobs run one at a time, in order, since
+    most of them restart the same MediaMTX process. Only the last MAX_JOBS
+    are kept.
+    """
+
+    MAX_JOBS = 100
+
+    def __init__(self):
+        self._jobs: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="api-job")
+
+    def submit(self, name: str, func: Callable, *args) -> str:
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "id": job_id,
+            "name": name,
+            "status": "pending",
+            "created": time.time(),
+            "finished": None,
+            "error": None,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            while len(self._jobs) > self.MAX_JOBS:
+                self._jobs.popitem(last=False)
+        self._pool.submit(self._run, job, func, args)
+        return job_id
+
+    def _run(self, job: dict, func: Callable, args: tuple):
+        job["status"] = "running"
+        publish("job", dict(job), retain=False, key=f"job:{job['id']}")
+        try:
+            func(*args)
+            job["status"] = "done"
+        except Exception as e:
+            logger.error(f"Job {job['name']} failed: {e}")
+            job["status"] = "error"
+            job["error"] = str(e)
+        job["finished"] = time.time()
+        publish("job", dict(job), retain=False, key=f"job:{job['id']}")
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list(self) -> list[dict]:
+        with self._lock:
+            return [dict(job) for job in reversed(self._jobs.values())]
+
+
+jobs = JobManager()
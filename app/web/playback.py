@@ -0,0 +1,175 @@
+"""Recording playback: byte ranges, conditional requests and bounded disk reads."""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from starlette.datastructures import Headers
+from starlette.responses import Response
+
+CHUNK_SIZE = 512 * 1024
+READ_WORKERS = 4  # disk reads in flight across all playbacks
+SETTLED_AFTER = 30  # seconds without writes before a segment counts as closed
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+# Every playback reads through this pool, so however many browsers are
+# seeking, at most READ_WORKERS reads compete with the recorders' writes.
+_read_pool = ThreadPoolExecutor(max_workers=READ_WORKERS, thread_name_prefix="playback")
+
+
+class RecordingResponse(Response):
+    """Serve a recording file with Range, If-Range, If-None-Match and
+    If-Modified-Since support.
+
+    Opening the file and every CHUNK_SIZE block read run on the shared read
+    pool, never on the event loop, keeping exactly one block of read-ahead
+    in flight while the previous one is sent.
+    """
+
+    def __init__(self, path: str | Path, media_type: str = "video/mp4"):
+        super().__init__(media_type=media_type)
+        self.path = str(path)
+
+    async def __call__(self, scope, receive, send):
+        request_headers = Headers(scope=scope)
+        loop = asyncio.get_running_loop()
+        try:
+            fd, st = await loop.run_in_executor(_read_pool, _open, self.path)
+        except OSError:
+            await Response("File not found", status_code=404)(scope, receive, send)
+            return
+        try:
+            size = st.st_size
+            etag = f'"{st.st_mtime_ns:x}-{size:x}"'
+            last_modified = formatdate(st.st_mtime, usegmt=True)
+            settled = time.time() - st.st_mtime > SETTLED_AFTER
+            headers = {
+                "accept-ranges": "bytes",
+                "etag": etag,
+                "last-modified": last_modified,
+                # A closed segment never changes; the one being written does
+                "cache-control": "private, max-age=86400" if settled else "no-cache",
+                "content-type": self.media_type,
+            }
+
+            if _not_modified(request_headers, etag, st.st_mtime):
+                await self._start(send, 304, headers)
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+            start, end, status = 0, size, 200
+            http_range = request_headers.get("range")
+            if_range = request_headers.get("if-range")
+            if http_range and (if_range is None or if_range in (etag, last_modified)):
+                try:
+                    start, end = _parse_range(http_range, size)
+                    status = 206
+                    headers["content-range"] = f"bytes {start}-{end - 1}/{size}"
+                except RangeNotSatisfiable:
+                    headers["content-range"] = f"bytes */{size}"
+                    headers["content-length"] = "0"
+                    await self._start(send, 416, headers)
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+                except ValueError:
+                    pass  # not a single byte range: send the whole file (RFC 9110 allows it)
+            headers["content-length"] = str(end - start)
+            await self._start(send, status, headers)
+
+            if scope["method"] == "HEAD" or start == end:
+                await send({"type": "http.response.body", "body": b""})
+            else:
+                await self._send_chunks(send, fd, start, end)
+        finally:
+            os.close(fd)
+
+    async def _start(self, send, status: int, headers: dict):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()],
+        })
+
+    async def _send_chunks(self, send, fd: int, start: int, end: int):
+        loop = asyncio.get_running_loop()
+        if hasattr(os, "posix_fadvise"):
+            try:
+                os.posix_fadvise(fd, start, end - start, os.POSIX_FADV_SEQUENTIAL)
+            except OSError:
+                pass
+        offset = start
+        pending = loop.run_in_executor(_read_pool, _pread, fd, min(CHUNK_SIZE, end - offset), offset)
+        while pending is not None:
+            chunk = await pending
+            offset += len(chunk)
+            more = bool(chunk) and offset < end
+            # Read the next block while this one is being sent
+            pending = (
+                loop.run_in_executor(_read_pool, _pread, fd, min(CHUNK_SIZE, end - offset), offset)
+                if more else None
+            )
+            try:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more})
+            except BaseException:
+                if pending is not None:
+                    await asyncio.wait([pending])  # don't close the fd under a running read
+                raise
+
+
+def _open(path: str) -> tuple[int, os.stat_result]:
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        return fd, os.fstat(fd)
+    except OSError:
+        os.close(fd)
+        raise
+
+
+def _pread(fd: int, size: int, offset: int) -> bytes:
+    if hasattr(os, "pread"):
+        return os.pread(fd, size, offset)
+    # Windows has no pread; safe because a response has one read in flight at a time
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, size)
+
+
+def _not_modified(headers: Headers, etag: str, mtime: float) -> bool:
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _parse_range(value: str, size: int) -> tuple[int, int]:
+    """(start, end) of a single "bytes=" range, end exclusive.
+
+    Raises ValueError for anything else (multiple ranges, other units)
+    and RangeNotSatisfiable if the range lies outside the file.
+    """
+    unit, _, spec = value.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        raise ValueError(f"Unsupported range: {value}")
+    first, _, last = spec.strip().partition("-")
+    if not first:
+        length = int(last)
+        if length <= 0:
+            raise RangeNotSatisfiable(value)
+        return max(size - length, 0), size
+    start = int(first)
+    end = min(int(last) + 1, size) if last else size
+    if start >= size or end <= start:
+        raise RangeNotSatisfiable(value)
+    return start, end
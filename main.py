@@ -68,8 +68,23 @@ def main():
     import uvicorn
     from app.server import create_app
 
+    from app.events import broadcaster
+
     app = create_app()
-    uvicorn.run(app, host="0.0.0.0", port=port, log_level="warning")
+    # Open responses delay the lifespan shutdown (recorders, rclone), so
+    # end the event streams as soon as a stop is requested and don't wait
+    # on anything else for long
+    server = uvicorn.Server(uvicorn.Config(
+        app, host="0.0.0.0", port=port, log_level="warning", timeout_graceful_shutdown=10,
+    ))
+    handle_exit = server.handle_exit
+
+    def stop(sig, frame):
+        broadcaster.close()
+        handle_exit(sig, frame)
+
+    server.handle_exit = stop
+    server.run()
 
 
 if __name__ == "__main__":
@@ -7,10 +7,65 @@ document.addEventListener('DOMContentLoaded', () => {
     if (toggle && links) {
         toggle.addEventListener('click', () => links.classList.toggle('open'));
     }
-    updateStatusBar();
-    setInterval(updateStatusBar, 10000);
+    onServerEvent('status', renderStatusBar, updateStatusBar, 10000);
+    connectServerEvents();
 });
 
+// ─── Server events (SSE) with polling fallback ───────────────────────
+// Pages register handlers with onServerEvent(type, handler, poll, ms).
+// poll() runs every ms only while the event stream is down.
+const serverEvents = { source: null, handlers: {}, polls: [], timers: [] };
+
+function onServerEvent(type, handler, poll = null, interval = 10000) {
+    if (!serverEvents.handlers[type]) {
+        serverEvents.handlers[type] = [];
+        if (serverEvents.source) listenServerEvent(type);
+    }
+    serverEvents.handlers[type].push(handler);
+    if (poll) {
+        serverEvents.polls.push([poll, interval]);
+        if (serverEvents.timers.length) {
+            poll();
+            serverEvents.timers.push(setInterval(poll, interval));
+        }
+    }
+}
+
+function listenServerEvent(type) {
+    serverEvents.source.addEventListener(type, (e) => {
+        const data = JSON.parse(e.data);
+        serverEvents.handlers[type].forEach(h => h(data));
+    });
+}
+
+function connectServerEvents() {
+    if (!window.EventSource) return startPolling();
+    const source = new EventSource('/api/events');
+    serverEvents.source = source;
+    Object.keys(serverEvents.handlers).forEach(listenServerEvent);
+    source.onopen = stopPolling;
+    source.onerror = () => {
+        // The browser retries on its own; poll meanwhile
+        startPolling();
+        if (source.readyState === EventSource.CLOSED) {
+            setTimeout(connectServerEvents, 10000);
+        }
+    };
+}
+
+function startPolling() {
+    if (serverEvents.timers.length) return;
+    serverEvents.polls.forEach(([poll, interval]) => {
+        poll();
+        serverEvents.timers.push(setInterval(poll, interval));
+    });
+}
+
+function stopPolling() {
+    serverEvents.timers.forEach(clearInterval);
+    serverEvents.timers = [];
+}
+
 // ─── API helper ──────────────────────────────────────────────────────
 async function api(url, method = 'GET', body = null) {
     const opts = { method, headers: { 'Content-Type': 'application/json' } };
@@ -26,21 +81,24 @@ async function api(url, method = 'GET', body = null) {
 // ─── Status bar ──────────────────────────────────────────────────────
 async function updateStatusBar() {
     try {
-        const s = await api('/api/status');
-        const bar = document.getElementById('statusBar');
-        if (bar) {
-            const parts = [];
-            parts.push(`${s.cameras_recording}/${s.cameras_total} gravando`);
-            parts.push(`Disco: ${s.disk_free_gb} GB livre`);
-            if (s.tunnel_active) parts.push(`Remoto: ativo`);
-            bar.textContent = parts.join(' | ');
-        }
+        renderStatusBar(await api('/api/status'));
     } catch (e) {
         const bar = document.getElementById('statusBar');
         if (bar) bar.textContent = 'Sem conexao';
     }
 }
 
+function renderStatusBar(s) {
+    const bar = document.getElementById('statusBar');
+    if (bar) {
+        const parts = [];
+        parts.push(`${s.cameras_recording}/${s.cameras_total} gravando`);
+        parts.push(`Disco: ${s.disk_free_gb} GB livre`);
+        if (s.tunnel_active) parts.push(`Remoto: ativo`);
+        bar.textContent = parts.join(' | ');
+    }
+}
+
 // ─── Modal helper ────────────────────────────────────────────────────
 function openModal(id) {
     const el = document.getElementById(id);
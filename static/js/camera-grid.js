@@ -4,30 +4,63 @@ let webrtcConnections = {};
 
 document.addEventListener('DOMContentLoaded', () => {
     loadDashboard();
-    setInterval(loadStats, 10000);
+    onServerEvent('status', renderStats, loadStats, 10000);
+    onServerEvent('camera', updateCameraBadge);
+    setInterval(loadHistory, 60000);
 });
 
 async function loadDashboard() {
     await loadStats();
+    loadHistory();
     await loadCameraGrid();
 }
 
+// ─── Metrics history (last hour) ─────────────────────────────────────
+
+async function loadHistory() {
+    try {
+        const h = await api('/api/metrics/history?range=hour&series=cpu,ram');
+        renderSparkline('sparkCpu', 'statCpu', h.series.cpu || []);
+        renderSparkline('sparkRam', 'statRam', h.series.ram || []);
+    } catch (e) { /* ignore */ }
+}
+
+function renderSparkline(svgId, valueId, points) {
+    if (!points.length) return;
+    const t0 = points[0][0];
+    const span = Math.max(points[points.length - 1][0] - t0, 1);
+    const coords = points.map(([t, v]) =>
+        `${((t - t0) / span * 100).toFixed(1)},${(24 - Math.min(v, 100) * 0.24).toFixed(1)}`);
+    document.getElementById(svgId).innerHTML = `<polyline points="${coords.join(' ')}"/>`;
+    document.getElementById(valueId).textContent = Math.round(points[points.length - 1][1]) + '%';
+}
+
 async function loadStats() {
     try {
-        const s = await api('/api/status');
-        document.getElementById('statCameras').textContent = s.cameras_total;
-        document.getElementById('statRecording').textContent = s.cameras_recording;
-        document.getElementById('statDisk').textContent = s.disk_free_gb + ' GB';
-        document.getElementById('statRecSize').textContent = s.recordings_size_gb + ' GB';
-        document.getElementById('statUptime').textContent = formatUptime(s.uptime_seconds);
-
-        if (s.tunnel_active && s.tunnel_url) {
-            document.getElementById('tunnelStat').style.display = '';
-            document.getElementById('statTunnel').textContent = 'Ativo';
-        }
+        renderStats(await api('/api/status'));
     } catch (e) { /* ignore */ }
 }
 
+function renderStats(s) {
+    document.getElementById('statCameras').textContent = s.cameras_total;
+    document.getElementById('statRecording').textContent = s.cameras_recording;
+    document.getElementById('statDisk').textContent = s.disk_free_gb + ' GB';
+    document.getElementById('statRecSize').textContent = s.recordings_size_gb + ' GB';
+    document.getElementById('statUptime').textContent = formatUptime(s.uptime_seconds);
+
+    if (s.tunnel_active && s.tunnel_url) {
+        document.getElementById('tunnelStat').style.display = '';
+        document.getElementById('statTunnel').textContent = 'Ativo';
+    }
+}
+
+function updateCameraBadge(e) {
+    const el = document.querySelector(`#cam-${e.camera_id} .camera-status`);
+    if (el) {
+        el.innerHTML = e.enabled ? statusBadgeHtml(e.status) : '<span class="badge badge-offline">Desabilitada</span>';
+    }
+}
+
 // ─── Aspect Ratio & Order Persistence ────────────────────────────────────────
 
 const ASPECT_RATIOS = {
@@ -1,8 +1,22 @@
 /* Sentinela - Recordings Browser & Player */
 
-let currentCameras = [];
+const ROW_HEIGHT = 44;  // px, must match .rec-row
+const PAGE_SIZE = 200;
+const OVERSCAN = 10;
+const HLS_WINDOW = 3600;  // seconds of continuous playback from a timeline click
 
-document.addEventListener('DOMContentLoaded', loadDates);
+// Current query: rows are fetched page by page as the list scrolls
+let recQuery = null;
+let recItems = [];
+let recTotal = 0;
+let recCursor = null;
+let recLoading = false;
+let recRenderQueued = false;
+
+document.addEventListener('DOMContentLoaded', () => {
+    loadDates();
+    loadCameraOptions();
+});
 
 async function loadDates() {
     try {
@@ -24,95 +38,330 @@ async function loadDates() {
     } catch (e) { /* ignore */ }
 }
 
-async function loadDate() {
-    const date = document.getElementById('dateSelect').value;
-    if (!date) return;
-
+async function loadCameraOptions() {
     try {
-        currentCameras = await api(`/api/recordings/${date}`);
+        const cameras = await api('/api/cameras');
         const camSel = document.getElementById('cameraSelect');
-        camSel.style.display = '';
         camSel.innerHTML = '<option value="">Todas as cameras</option>';
-        for (const cam of currentCameras) {
+        for (const cam of cameras) {
             const opt = document.createElement('option');
             opt.value = cam.id;
             opt.textContent = cam.name;
             camSel.appendChild(opt);
         }
-        renderFiles();
+    } catch (e) { /* ignore */ }
+}
+
+function loadDate() {
+    const date = document.getElementById('dateSelect').value;
+    if (!date) return;
+    document.getElementById('cameraSelect').style.display = '';
+    document.getElementById('exportBar').classList.remove('hidden');
+    loadFiles();
+}
+
+async function loadFiles() {
+    const date = document.getElementById('dateSelect').value;
+    if (!date) return;
+    const camera = document.getElementById('cameraSelect').value;
+
+    const next = new Date(`${date}T00:00:00`);
+    next.setDate(next.getDate() + 1);
+    const params = new URLSearchParams({
+        start: `${date}T00:00:00`,
+        end: `${localDate(next)}T00:00:00`,
+        limit: PAGE_SIZE,
+    });
+    if (camera) params.set('cameras', camera);
+
+    recQuery = params.toString();
+    recItems = [];
+    recTotal = 0;
+    recCursor = null;
+    recLoading = false;
+    loadCoverage(date, camera);
+    await loadMore(recQuery);
+}
+
+// ─── Coverage timeline ───
+
+let coverageDay = null;
+
+async function loadCoverage(date, camera) {
+    const el = document.getElementById('coverage');
+    try {
+        const params = new URLSearchParams({ date });
+        if (camera) params.set('cameras', camera);
+        coverageDay = await api(`/api/recordings/coverage?${params}`);
     } catch (e) {
-        document.getElementById('fileList').innerHTML =
-            `<div class="alert alert-danger">Erro: ${escR(e.message)}</div>`;
+        el.innerHTML = '';
+        return;
+    }
+    if (coverageDay.cameras.length === 0) {
+        el.innerHTML = '';
+        return;
     }
+
+    const span = coverageDay.end - coverageDay.start;
+    const pos = (s, e) => {
+        const left = (s - coverageDay.start) / span * 100;
+        return `left:${left.toFixed(3)}%;width:${((e - s) / span * 100).toFixed(3)}%`;
+    };
+    const ticks = [0, 3, 6, 9, 12, 15, 18, 21, 24]
+        .map(h => `<span style="left:${h / 24 * 100}%">${String(h).padStart(2, '0')}h</span>`).join('');
+
+    el.innerHTML = `
+        <div class="card mb-2">
+            <div class="card-header">
+                <h3 class="card-title">Linha do tempo</h3>
+                <span class="text-muted text-sm">Clique na barra para assistir a partir daquele horario</span>
+            </div>
+            <div class="timeline">
+                ${coverageDay.cameras.map(cam => `
+                    <div class="timeline-row">
+                        <span class="timeline-label" title="${escR(cam.name)}">${escR(cam.name)}</span>
+                        <div class="timeline-bar" onclick="seekTimeline(event, '${escR(cam.id)}')"
+                             title="${formatDuration(cam.recorded_seconds)} gravados, ${cam.gaps.length} falha(s)">
+                            ${cam.intervals.map(([s, e]) => `<span class="timeline-on" style="${pos(s, e)}"></span>`).join('')}
+                            ${cam.gaps.map(([s, e]) => `<span class="timeline-gap" style="${pos(s, e)}"></span>`).join('')}
+                        </div>
+                    </div>
+                `).join('')}
+                <div class="timeline-row">
+                    <span class="timeline-label"></span>
+                    <div class="timeline-axis">${ticks}</div>
+                </div>
+            </div>
+        </div>
+    `;
 }
 
-function loadFiles() {
-    renderFiles();
+async function seekTimeline(event, cameraId) {
+    // Play continuously from the clicked moment (or the next recording after a gap)
+    const rect = event.currentTarget.getBoundingClientRect();
+    const fraction = (event.clientX - rect.left) / rect.width;
+    const t = coverageDay.start + fraction * (coverageDay.end - coverageDay.start);
+    const cam = coverageDay.cameras.find(c => c.id === cameraId);
+    const title = `${cam ? cam.name : cameraId} - ${localIso(t).slice(11)}`;
+
+    if (document.getElementById('videoPlayer').canPlayType('application/vnd.apple.mpegurl')) {
+        // Native HLS: one playlist spanning segment boundaries
+        const params = new URLSearchParams({ start: localIso(t), end: localIso(t + HLS_WINDOW) });
+        playFile(`/api/hls/${encodeURIComponent(cameraId)}.m3u8?${params}`, title);
+        return;
+    }
+    await playFrom(cameraId, t, title);
 }
 
-function renderFiles() {
-    const filter = document.getElementById('cameraSelect').value;
-    const date = document.getElementById('dateSelect').value;
-    const el = document.getElementById('fileList');
+async function playFrom(cameraId, t, title) {
+    // Without HLS, chain the segment files: each one starts the next when it ends
+    const params = new URLSearchParams({ cameras: cameraId, start: localIso(t), limit: 1 });
+    try {
+        const page = await api(`/api/recordings?${params}`);
+        const f = page.items[0];
+        if (!f) return;
+        const begin = new Date(f.start).getTime() / 1000;
+        playFile(f.url, title || `${f.camera_name} - ${f.start.slice(11)}`, Math.max(0, t - begin));
+        loadThumbnails(f.path);
+        document.getElementById('videoPlayer').onended = () => playFrom(cameraId, begin + f.duration + 1);
+    } catch (e) { /* ignore */ }
+}
 
-    const cameras = filter
-        ? currentCameras.filter(c => c.id === filter)
-        : currentCameras;
+async function loadMore(query) {
+    if (recLoading) return;
+    recLoading = true;
+    try {
+        const cursor = recCursor ? `&cursor=${encodeURIComponent(recCursor)}` : '';
+        const page = await api(`/api/recordings?${query}${cursor}`);
+        if (query !== recQuery) return;  // filter changed while loading
+        if (page.total !== null) {
+            recTotal = page.total;
+            renderList();
+        }
+        recItems.push(...page.items);
+        recCursor = page.next_cursor;
+        if (!recCursor && recTotal !== recItems.length) {
+            // Files deleted since the count was taken
+            recTotal = recItems.length;
+            const spacer = document.getElementById('recSpacer');
+            if (spacer) spacer.style.height = `${recTotal * ROW_HEIGHT}px`;
+        }
+    } catch (e) {
+        document.getElementById('fileList').innerHTML =
+            `<div class="alert alert-danger">Erro: ${escR(e.message)}</div>`;
+        return;
+    } finally {
+        recLoading = false;
+    }
+    renderRows();
+}
 
-    if (cameras.length === 0 || cameras.every(c => c.files.length === 0)) {
+function renderList() {
+    const el = document.getElementById('fileList');
+    if (recTotal === 0) {
         el.innerHTML = '<div class="empty-state"><h3>Nenhuma gravacao encontrada</h3></div>';
         return;
     }
 
-    el.innerHTML = cameras.map(cam => `
+    el.innerHTML = `
         <div class="card mb-2">
             <div class="card-header">
-                <h3 class="card-title">${escR(cam.name)}</h3>
-                <span class="text-muted">${cam.files.length} arquivo(s)</span>
+                <h3 class="card-title">${formatDate(document.getElementById('dateSelect').value)}</h3>
+                <span class="text-muted">${recTotal} arquivo(s)</span>
+            </div>
+            <div class="rec-row rec-row-head">
+                <span>Horario</span><span>Camera</span><span>Duracao</span><span>Tamanho</span><span>Acoes</span>
             </div>
-            <div class="table-wrap">
-                <table>
-                    <thead>
-                        <tr>
-                            <th>Horario</th>
-                            <th>Tamanho</th>
-                            <th>Acoes</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-                        ${cam.files.map(f => `
-                            <tr>
-                                <td>${formatTime(f.name)}</td>
-                                <td>${f.size_mb} MB</td>
-                                <td>
-                                    <button class="btn btn-sm btn-primary"
-                                            onclick="playFile('${date}', '${cam.id}', '${escR(f.name)}', '${escR(cam.name)}')">
-                                        Assistir
-                                    </button>
-                                    <a class="btn btn-sm btn-secondary"
-                                       href="/api/recordings/play/${date}/${cam.id}/${f.name}" download>
-                                        Baixar
-                                    </a>
-                                </td>
-                            </tr>
-                        `).join('')}
-                    </tbody>
-                </table>
+            <div class="rec-list" id="recList">
+                <div id="recSpacer" style="height:${recTotal * ROW_HEIGHT}px"></div>
+                <div class="rec-rows" id="recRows"></div>
             </div>
         </div>
-    `).join('');
+    `;
+    document.getElementById('recList').addEventListener('scroll', queueRender, { passive: true });
+}
+
+function queueRender() {
+    if (recRenderQueued) return;
+    recRenderQueued = true;
+    requestAnimationFrame(() => {
+        recRenderQueued = false;
+        renderRows();
+    });
+}
+
+function renderRows() {
+    // Only the rows in view (plus OVERSCAN) exist in the DOM
+    const list = document.getElementById('recList');
+    const rows = document.getElementById('recRows');
+    if (!list || !rows) return;
+
+    const first = Math.max(0, Math.floor(list.scrollTop / ROW_HEIGHT) - OVERSCAN);
+    const last = Math.min(recTotal, Math.ceil((list.scrollTop + list.clientHeight) / ROW_HEIGHT) + OVERSCAN);
+    if (last > recItems.length && recCursor) loadMore(recQuery);
+
+    let html = '';
+    for (let i = first; i < last; i++) {
+        const f = recItems[i];
+        if (!f) {
+            html += '<div class="rec-row text-muted">Carregando...</div>';
+            continue;
+        }
+        html += `
+            <div class="rec-row">
+                <span>${f.start.slice(11)}${f.archived ? ' <span class="text-muted text-sm">(nuvem)</span>' : ''}</span>
+                <span>${escR(f.camera_name)}</span>
+                <span>${formatDuration(f.duration)}</span>
+                <span>${f.size_mb} MB</span>
+                <span>
+                    <button class="btn btn-sm btn-primary" onclick="playItem(${i})">Assistir</button>
+                    <a class="btn btn-sm btn-secondary" href="${f.url}" download>Baixar</a>
+                </span>
+            </div>
+        `;
+    }
+    rows.style.transform = `translateY(${first * ROW_HEIGHT}px)`;
+    rows.innerHTML = html;
+}
+
+async function exportClip() {
+    // One MP4 for the selected camera, streamed by the server while it is cut
+    const date = document.getElementById('dateSelect').value;
+    const camera = document.getElementById('cameraSelect').value;
+    const from = document.getElementById('exportFrom').value;
+    const to = document.getElementById('exportTo').value;
+    if (!camera) return showToast('Selecione uma camera para exportar', 'danger');
+    if (!from || !to || to <= from) return showToast('Informe um intervalo valido', 'danger');
+
+    const start = `${date}T${from.length === 5 ? from + ':00' : from}`;
+    const end = `${date}T${to.length === 5 ? to + ':00' : to}`;
+    try {
+        const found = await api(`/api/recordings?${new URLSearchParams({ cameras: camera, start, end, limit: 1 })}`);
+        if (found.items.length === 0) return showToast('Nenhuma gravacao no intervalo', 'warning');
+    } catch (e) { /* let the export report it */ }
+    window.location.href = `/api/export?${new URLSearchParams({ camera, from: start, to: end })}`;
+    showToast('Exportacao iniciada', 'success');
 }
 
-function playFile(date, cameraId, filename, cameraName) {
+function playItem(i) {
+    const f = recItems[i];
+    if (!f) return;
+    playFile(f.url, `${f.camera_name} - ${f.start.slice(11)}`);
+    loadThumbnails(f.path);
+}
+
+// ─── Scrubbing thumbnails ───
+
+async function loadThumbnails(path) {
+    // Filmstrip of the recording's keyframes; click a tile to jump there
+    const strip = document.getElementById('thumbStrip');
+    const base = `/api/thumbnails/${path.replace(/\.mp4$/, '')}`;
+    strip.dataset.path = path;
+    let text;
+    try {
+        const res = await fetch(`${base}.vtt`);
+        if (!res.ok) return;
+        text = await res.text();
+    } catch (e) { return; }
+    if (strip.dataset.path !== path) return;  // another recording started meanwhile
+
+    const dir = base.slice(0, base.lastIndexOf('/') + 1);
+    const toSeconds = t => t.split(':').reduce((acc, v) => acc * 60 + parseFloat(v), 0);
+    let html = '';
+    for (const block of text.split('\n\n').slice(1)) {
+        const [times, ref] = block.trim().split('\n');
+        if (!ref) continue;
+        const start = toSeconds(times.split(' --> ')[0]);
+        const [file, xywh] = ref.split('#xywh=');
+        const [x, y] = xywh.split(',');
+        html += `<div class="thumb" data-t="${start}" title="${formatDuration(start)}"
+                      style="background:url('${dir}${file}') -${x}px -${y}px"
+                      onclick="seekThumbnail(${start})"></div>`;
+    }
+    strip.innerHTML = html;
+}
+
+function seekThumbnail(t) {
+    const player = document.getElementById('videoPlayer');
+    player.currentTime = t;
+    player.play();
+}
+
+function highlightThumbnail() {
+    // Tile of the current position; the strip only scrolls when it changes
+    const t = document.getElementById('videoPlayer').currentTime;
+    let current = null;
+    for (const el of document.querySelectorAll('#thumbStrip .thumb')) {
+        if (parseFloat(el.dataset.t) > t) break;
+        current = el;
+    }
+    const previous = document.querySelector('#thumbStrip .thumb.active');
+    if (current === previous) return;
+    if (previous) previous.classList.remove('active');
+    if (current) {
+        current.classList.add('active');
+        const strip = current.parentElement;
+        strip.scrollLeft = current.offsetLeft - strip.clientWidth / 2;
+    }
+}
+
+function playFile(url, title, offset = 0) {
     const container = document.getElementById('playerContainer');
     const player = document.getElementById('videoPlayer');
-    const title = document.getElementById('playerTitle');
     const download = document.getElementById('downloadLink');
 
-    const url = `/api/recordings/play/${date}/${cameraId}/${filename}`;
+    player.onended = null;
+    player.ontimeupdate = highlightThumbnail;
     player.src = url;
-    title.textContent = `${cameraName} - ${formatTime(filename)}`;
+    const strip = document.getElementById('thumbStrip');
+    strip.innerHTML = '';
+    delete strip.dataset.path;
+    if (offset > 0) {
+        player.addEventListener('loadedmetadata', () => { player.currentTime = offset; }, { once: true });
+    }
+    document.getElementById('playerTitle').textContent = title;
     download.href = url;
+    download.style.display = url.includes('.m3u8') ? 'none' : '';
     container.classList.remove('hidden');
     player.play();
 
@@ -125,11 +374,22 @@ function formatDate(d) {
     return `${day}/${m}/${y}`;
 }
 
-function formatTime(filename) {
-    // rec_14-30-00.mp4 -> 14:30:00
-    const match = filename.match(/rec_(\d{2})-(\d{2})-(\d{2})/);
-    if (match) return `${match[1]}:${match[2]}:${match[3]}`;
-    return filename;
+function localDate(date) {
+    const pad = n => String(n).padStart(2, '0');
+    return `${date.getFullYear()}-${pad(date.getMonth() + 1)}-${pad(date.getDate())}`;
+}
+
+function localIso(timestamp) {
+    // YYYY-MM-DDTHH:MM:SS in local time, as the API expects
+    const d = new Date(timestamp * 1000);
+    const pad = n => String(n).padStart(2, '0');
+    return `${localDate(d)}T${pad(d.getHours())}:${pad(d.getMinutes())}:${pad(d.getSeconds())}`;
+}
+
+function formatDuration(seconds) {
+    const total = Math.round(seconds);
+    if (total >= 3600) return `${Math.floor(total / 3600)}h${String(Math.floor(total % 3600 / 60)).padStart(2, '0')}`;
+    return `${Math.floor(total / 60)}:${String(total % 60).padStart(2, '0')}`;
 }
 
 function escR(s) {
@@ -4,7 +4,8 @@ document.addEventListener('DOMContentLoaded', () => {
     loadSettings();
     loadTunnelStatus();
     loadSystemInfo();
-    setInterval(loadTunnelStatus, 10000);
+    onServerEvent('tunnel', renderTunnelStatus, loadTunnelStatus, 10000);
+    onServerEvent('status', renderSystemInfo);
 });
 
 async function loadSettings() {
@@ -14,6 +15,9 @@ async function loadSettings() {
         // Recording
         document.getElementById('segDuration').value = s.recording.segment_duration;
         document.getElementById('retDays').value = s.recording.retention_days;
+        document.getElementById('offloadUploaded').checked = s.recording.offload_uploaded;
+        document.getElementById('stallTimeout').value = s.recording.stall_timeout;
+        document.getElementById('recFormat').value = s.recording.format;
 
         // System
         document.getElementById('webPort').value = s.system.web_port;
@@ -35,6 +39,9 @@ async function saveRecording(e) {
         await api('/api/settings/recording', 'PUT', {
             segment_duration: parseInt(document.getElementById('segDuration').value),
             retention_days: parseInt(document.getElementById('retDays').value),
+            offload_uploaded: document.getElementById('offloadUploaded').checked,
+            stall_timeout: parseInt(document.getElementById('stallTimeout').value),
+            format: document.getElementById('recFormat').value,
             recordings_path: 'recordings',
         });
         showToast('Configuracoes de gravacao salvas!', 'success');
@@ -105,38 +112,44 @@ async function toggleTunnel() {
 
 async function loadTunnelStatus() {
     try {
-        const s = await api('/api/tunnel/status');
-        const statusEl = document.getElementById('tunnelStatus');
-        const btn = document.getElementById('tunnelToggle');
-        const urlEl = document.getElementById('tunnelUrl');
-        const link = document.getElementById('tunnelLink');
+        renderTunnelStatus(await api('/api/tunnel/status'));
+    } catch (e) { /* ignore */ }
+}
 
-        if (s.active) {
-            statusEl.innerHTML = '<span class="text-success">Tunnel ativo</span>';
-            btn.textContent = 'Parar';
-            btn.className = 'btn btn-danger';
-            if (s.url) {
-                urlEl.classList.remove('hidden');
-                link.href = s.url;
-                link.textContent = s.url;
-            }
-        } else {
-            statusEl.innerHTML = '<span class="text-muted">Tunnel inativo</span>';
-            btn.textContent = 'Iniciar';
-            btn.className = 'btn btn-secondary';
-            urlEl.classList.add('hidden');
+function renderTunnelStatus(s) {
+    const statusEl = document.getElementById('tunnelStatus');
+    const btn = document.getElementById('tunnelToggle');
+    const urlEl = document.getElementById('tunnelUrl');
+    const link = document.getElementById('tunnelLink');
+
+    if (s.active) {
+        statusEl.innerHTML = '<span class="text-success">Tunnel ativo</span>';
+        btn.textContent = 'Parar';
+        btn.className = 'btn btn-danger';
+        if (s.url) {
+            urlEl.classList.remove('hidden');
+            link.href = s.url;
+            link.textContent = s.url;
         }
-    } catch (e) { /* ignore */ }
+    } else {
+        statusEl.innerHTML = '<span class="text-muted">Tunnel inativo</span>';
+        btn.textContent = 'Iniciar';
+        btn.className = 'btn btn-secondary';
+        urlEl.classList.add('hidden');
+    }
 }
 
 async function loadSystemInfo() {
     try {
-        const s = await api('/api/status');
-        document.getElementById('sysInfo').innerHTML = `
-            <p class="text-muted">CPU: ${s.cpu_percent}% | RAM: ${s.ram_percent}%</p>
-            <p class="text-muted">Disco: ${s.disk_used_gb} / ${s.disk_total_gb} GB</p>
-            <p class="text-muted">Gravacoes: ${s.recordings_size_gb} GB</p>
-            <p class="text-muted">Uptime: ${formatUptime(s.uptime_seconds)}</p>
-        `;
+        renderSystemInfo(await api('/api/status'));
     } catch (e) { /* ignore */ }
 }
+
+function renderSystemInfo(s) {
+    document.getElementById('sysInfo').innerHTML = `
+        <p class="text-muted">CPU: ${s.cpu_percent}% | RAM: ${s.ram_percent}%</p>
+        <p class="text-muted">Disco: ${s.disk_used_gb} / ${s.disk_total_gb} GB</p>
+        <p class="text-muted">Gravacoes: ${s.recordings_size_gb} GB</p>
+        <p class="text-muted">Uptime: ${formatUptime(s.uptime_seconds)}</p>
+    `;
+}
@@ -0,0 +1,103 @@
+"""Direct S3 multipart upload against a local moto server."""
+
+import hashlib
+import json
+import os
+import socket
+
+import pytest
+
+boto3 = pytest.importorskip("boto3")
+moto_server = pytest.importorskip("moto.server")
+
+from app.cloud.s3 import S3Uploader, S3UploadError, MIN_PART_SIZE
+from app.models import CloudSettings
+
+BUCKET = "footage"
+REL_PATH = "2026-10-19/camera-1/rec_2026-10-19_10-00-00.mp4"
+
+
+class FakeRclone:
+    """Answers config/get for the S3 remote like the rclone daemon would."""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+
+    def call(self, method: str, **params) -> dict:
+        assert method == "config/get"
+        return {"type": "s3", "endpoint": self.endpoint, "region": "us-east-1",
+                "access_key_id": "test", "secret_access_key": "test"}
+
+
+@pytest.fixture(scope="module")
+def endpoint():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    yield f"http://127.0.0.1:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def cloud():
+    return CloudSettings(remote_name="s3", remote_path=f"{BUCKET}/cameras",
+                         s3_part_size_mb=MIN_PART_SIZE // 1024**2, s3_concurrency=1)
+
+
+def test_multipart_upload_resumes_after_interruption(endpoint, cloud, tmp_path, monkeypatch):
+    data = os.urandom(2 * MIN_PART_SIZE + 1024**2)  # three parts, the last one short
+    local = tmp_path / "segment.mp4"
+    local.write_bytes(data)
+    state_path = tmp_path / "s3_uploads.json"
+
+    first = S3Uploader(FakeRclone(endpoint), state_path)
+    client = first._get_client(cloud)
+    client.create_bucket(Bucket=BUCKET)
+
+    # First attempt: the connection drops while sending part 3
+    upload_part = client.upload_part
+    def interrupted(**kwargs):
+        if kwargs["PartNumber"] == 3:
+            raise S3UploadError("conexao perdida")
+        return upload_part(**kwargs)
+    monkeypatch.setattr(client, "upload_part", interrupted)
+    with pytest.raises(S3UploadError):
+        first.upload(local, REL_PATH, cloud)
+
+    state = json.loads(state_path.read_text())[REL_PATH]
+    listed = client.list_parts(Bucket=BUCKET, Key=state["key"], UploadId=state["upload_id"])
+    assert [p["PartNumber"] for p in listed["Parts"]] == [1, 2]
+
+    # Second attempt, as after a restart: only the missing part is sent
+    second = S3Uploader(FakeRclone(endpoint), state_path)
+    client = second._get_client(cloud)
+    sent = []
+    upload_part = client.upload_part
+    def counting(**kwargs):
+        sent.append(kwargs["PartNumber"])
+        assert kwargs["UploadId"] == state["upload_id"]
+        return upload_part(**kwargs)
+    monkeypatch.setattr(client, "upload_part", counting)
+    second.upload(local, REL_PATH, cloud)
+    assert sent == [3]
+    assert json.loads(state_path.read_text()) == {}
+
+    obj = client.get_object(Bucket=BUCKET, Key=f"cameras/{REL_PATH}")
+    assert obj["Body"].read() == data
+    parts = [data[i:i + MIN_PART_SIZE] for i in range(0, len(data), MIN_PART_SIZE)]
+    digest = hashlib.md5(b"".join(hashlib.md5(p).digest() for p in parts)).hexdigest()
+    assert obj["ETag"].strip('"') == f"{digest}-{len(parts)}"
+
+
+def test_small_file_is_a_single_put(endpoint, cloud, tmp_path):
+    local = tmp_path / "segment.mp4"
+    local.write_bytes(b"x" * 1024)
+    uploader = S3Uploader(FakeRclone(endpoint), tmp_path / "s3_uploads.json")
+    client = uploader._get_client(cloud)
+    client.create_bucket(Bucket=BUCKET)
+    uploader.upload(local, REL_PATH, cloud)
+    obj = client.get_object(Bucket=BUCKET, Key=f"cameras/{REL_PATH}")
+    assert obj["Body"].read() == b"x" * 1024
+    assert obj["ETag"].strip('"') == hashlib.md5(b"x" * 1024).hexdigest()